@@ -1,7 +1,7 @@
 # backend-exp/admin.py
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Body, Response
 from fastapi.responses import HTMLResponse # RedirectResponse not used directly here
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, or_
@@ -12,7 +12,6 @@ from datetime import datetime
 from .models import (
     User, Job, Internship, CareerFair, Hackathon, UserIssue,
     UnverifiedJob, UnverifiedInternship, UnverifiedCareerFair, UnverifiedHackathon,
-    get_db, # Database session dependency
     UserResponse, UserIssueResponse, # Pydantic models for responses
     UnverifiedJobOut, UnverifiedInternshipOut, UnverifiedCareerFairOut, UnverifiedHackathonOut,
     JobOut, InternshipOut, CareerFairOut, HackathonOut, # For potential direct admin CRUD responses
@@ -21,7 +20,21 @@ from .models import (
 )
 
 # Import shared utilities from auth_utils.py
-from .auth_utils import require_admin, templates, logger as shared_root_logger
+from .auth_utils import require_admin, templates, session_store, identity_cache, otp_store, logger as shared_root_logger
+from .password_hashing import password_pool
+from .db_executor import run_db, threadpool_stats
+from .sql_instrumentation import SQL_REPEAT_WARN_THRESHOLD, route_summary
+from .counter_buffer import counter_buffer
+from .notification_fanout import enqueue_announcement
+from .thumbnails import enqueue_job_image_thumbnails, thumbnail_pool
+from . import search_index
+from .username_index import username_index
+from .task_queue import task_queue
+from .pubsub import hub
+from .file_storage import storage_stats, sweep_unreferenced
+from .response_cache import response_cache
+from .pagination import PageParams, page_params, paginate
+from .database import get_db, pool_status, sqlite_report # Database session dependency + pool/PRAGMA stats
 
 # Use a child logger for admin-specific messages, or use shared_root_logger directly
 logger = logging.getLogger("exp.admin")
@@ -39,11 +52,7 @@ admin_api_router = APIRouter(
     dependencies=[Depends(require_admin)] # Protect all admin API endpoints
 )
 
-# --- Mock Notification Helpers (or import your actual implementations) ---
-def create_new_job_notifications(db: Session, job: Job): logger.info(f"ADMIN: Simulating notification for job: {job.title}")
-def create_new_internship_notifications(db: Session, internship: Internship): logger.info(f"ADMIN: Simulating notification for internship: {internship.title}")
-def create_new_career_fair_notifications(db: Session, career_fair: CareerFair): logger.info(f"ADMIN: Simulating notification for career fair: {career_fair.name}")
-def create_new_hackathon_notifications(db: Session, hackathon: Hackathon): logger.info(f"ADMIN: Simulating notification for hackathon: {hackathon.name}")
+# --- Mock Email Helper (or import your actual implementation) ---
 def send_email_to_user(email: str, subject: str, body: str): logger.info(f"ADMIN: Simulating email to {email} | Subject: {subject}")
 
 
@@ -71,8 +80,10 @@ async def admin_feedback_page_html(request: Request, admin_user: User = Depends(
 
 # === Admin API: Submission Management ===
 @admin_api_router.get("/unverified-items", response_model=List[Any], summary="Get Unverified Submissions")
-async def get_unverified_items_admin_api(
+def get_unverified_items_admin_api(
+    response: Response,
     type: str = Query(..., description="Type: job, internship, career-fair, hackathon"),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin)
 ):
@@ -83,17 +94,17 @@ async def get_unverified_items_admin_api(
     }
     if type not in model_map: raise HTTPException(status_code=400, detail="Invalid item type")
     DbModel, PydanticOutModel = model_map[type]
-    items_orm = db.query(DbModel).filter(DbModel.status == 'pending').order_by(desc(DbModel.submitted_at)).all()
+    items_orm = paginate(db.query(DbModel).filter(DbModel.status == 'pending'),
+                         [(DbModel.submitted_at, True), (DbModel.id, True)], page, response)
     return [PydanticOutModel.model_validate(item) for item in items_orm]
 
 @admin_api_router.post("/unverified-items/{item_id}/approve", summary="Approve Submission")
-async def approve_submission_admin_api(
+def approve_submission_admin_api(
     item_id: int, type: str = Query(...), db: Session = Depends(get_db), admin_user: User = Depends(require_admin)
 ):
     logger.info(f"Admin '{admin_user.username}' approving {type} ID: {item_id}")
     unverified_model_map = {"job": UnverifiedJob, "internship": UnverifiedInternship, "career-fair": UnverifiedCareerFair, "hackathon": UnverifiedHackathon}
     verified_model_map = {"job": Job, "internship": Internship, "career-fair": CareerFair, "hackathon": Hackathon}
-    notification_map = {"job": create_new_job_notifications, "internship": create_new_internship_notifications, "career-fair": create_new_career_fair_notifications, "hackathon": create_new_hackathon_notifications}
 
     if type not in unverified_model_map: raise HTTPException(status_code=400, detail="Invalid item type")
     UnverifiedDbModel = unverified_model_map[type]; VerifiedDbModel = verified_model_map[type]
@@ -107,14 +118,17 @@ async def approve_submission_admin_api(
     unverified_item.status = 'approved'; unverified_item.updated_at = datetime.utcnow()
     try:
         db.add(new_verified_item); db.add(unverified_item)
-        if type in notification_map: notification_map[type](db, new_verified_item)
+        db.flush() # Assigns the new item's id for the announcement job
+        enqueue_announcement(db, type, new_verified_item.id) # Committed with the approval; a worker notifies users
+        if type == "job":
+            enqueue_job_image_thumbnails(db, new_verified_item) # Previews of a local /static/ image, rendered by a worker
         db.commit()
         logger.info(f"{type.capitalize()} ID {unverified_item.id} approved. New verified ID: {new_verified_item.id}")
         return {"message": f"{type.capitalize()} (ID: {unverified_item.id}) approved successfully."}
     except Exception as e: db.rollback(); logger.error(f"Error approving {type} ID {item_id}: {e}", exc_info=True); raise HTTPException(500, f"Could not approve {type}")
 
 @admin_api_router.post("/unverified-items/{item_id}/reject", summary="Reject Submission")
-async def reject_submission_admin_api(
+def reject_submission_admin_api(
     item_id: int, type: str = Query(...), db: Session = Depends(get_db), admin_user: User = Depends(require_admin)
 ):
     logger.info(f"Admin '{admin_user.username}' rejecting {type} ID: {item_id}")
@@ -136,7 +150,7 @@ async def reject_submission_admin_api(
 # === Admin API: Direct Creation of Verified Items ===
 
 @admin_api_router.post("/jobs", response_model=JobOut, status_code=status.HTTP_201_CREATED, summary="Admin Create New Job")
-async def admin_create_job_api( # Renamed to avoid conflict
+def admin_create_job_api( # Renamed to avoid conflict
     job_data: JobCreate,
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin)
@@ -147,17 +161,18 @@ async def admin_create_job_api( # Renamed to avoid conflict
     new_job = Job(**job_data.model_dump(exclude_unset=True)) # Use exclude_unset for optional fields
     try:
         db.add(new_job)
+        db.flush()
+        enqueue_announcement(db, "job", new_job.id) # Users are notified by a queue worker once this commits
+        enqueue_job_image_thumbnails(db, new_job)
         db.commit()
         db.refresh(new_job)
-        create_new_job_notifications(db, new_job) # Notify users after successful commit
-        db.commit() # Commit again if notifications made DB changes (usually not if just logging)
         return new_job
     except Exception as e:
         db.rollback()
         logger.error(f"Admin error creating job: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create job.")
 @admin_api_router.post("/internships", response_model=InternshipOut, status_code=status.HTTP_201_CREATED, summary="Admin Create New Internship")
-async def admin_create_internship_api(
+def admin_create_internship_api(
     internship_data: InternshipCreate,
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin)
@@ -166,10 +181,10 @@ async def admin_create_internship_api(
     new_internship = Internship(**internship_data.model_dump(exclude_unset=True))
     try:
         db.add(new_internship)
+        db.flush()
+        enqueue_announcement(db, "internship", new_internship.id) # Users are notified by a queue worker once this commits
         db.commit()
         db.refresh(new_internship)
-        create_new_internship_notifications(db, new_internship)
-        db.commit()
         return new_internship
     except Exception as e:
         db.rollback()
@@ -177,7 +192,7 @@ async def admin_create_internship_api(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create internship.")
 
 @admin_api_router.post("/career-fairs", response_model=CareerFairOut, status_code=status.HTTP_201_CREATED, summary="Admin Create New Career Fair")
-async def admin_create_career_fair_api(
+def admin_create_career_fair_api(
     career_fair_data: CareerFairCreate,
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin)
@@ -186,10 +201,10 @@ async def admin_create_career_fair_api(
     new_career_fair = CareerFair(**career_fair_data.model_dump(exclude_unset=True))
     try:
         db.add(new_career_fair)
+        db.flush()
+        enqueue_announcement(db, "career-fair", new_career_fair.id) # Users are notified by a queue worker once this commits
         db.commit()
         db.refresh(new_career_fair)
-        create_new_career_fair_notifications(db, new_career_fair)
-        db.commit()
         return new_career_fair
     except Exception as e:
         db.rollback()
@@ -197,7 +212,7 @@ async def admin_create_career_fair_api(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create career fair.")
 
 @admin_api_router.post("/hackathons", response_model=HackathonOut, status_code=status.HTTP_201_CREATED, summary="Admin Create New Hackathon")
-async def admin_create_hackathon_api(
+def admin_create_hackathon_api(
     hackathon_data: HackathonCreate,
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin)
@@ -206,10 +221,10 @@ async def admin_create_hackathon_api(
     new_hackathon = Hackathon(**hackathon_data.model_dump(exclude_unset=True))
     try:
         db.add(new_hackathon)
+        db.flush()
+        enqueue_announcement(db, "hackathon", new_hackathon.id) # Users are notified by a queue worker once this commits
         db.commit()
         db.refresh(new_hackathon)
-        create_new_hackathon_notifications(db, new_hackathon)
-        db.commit()
         return new_hackathon
     except Exception as e:
         db.rollback()
@@ -227,9 +242,9 @@ async def admin_create_hackathon_api(
 
 # === Admin API: User Management ===
 @admin_api_router.get("/users", response_model=List[UserResponse], summary="List Users (Admin)")
-async def list_users_admin_api(
-    skip: int = 0,
-    limit: int = 100,
+def list_users_admin_api(
+    response: Response,
+    page: PageParams = Depends(page_params), # limit + cursor (keyset, replaces skip/OFFSET)
     search: Optional[str] = None,
     include_inactive: bool = Query(False, description="Set to true to include deactivated users"), # New filter
     db: Session = Depends(get_db),
@@ -240,11 +255,11 @@ async def list_users_admin_api(
         query = query.filter(User.is_active == True) # Default to only active users
     if search:
         query = query.filter(or_(User.username.ilike(f"%{search}%"), User.email.ilike(f"%{search}%")))
-    users = query.order_by(User.username).offset(skip).limit(limit).all()
+    users = paginate(query, [(User.username, False), (User.id, False)], page, response)
     return users
 
 @admin_api_router.put("/users/{user_id}/status", response_model=UserResponse, summary="Approve User as Student/Alumni")
-async def update_user_status_admin_api(
+def update_user_status_admin_api(
     user_id: int,
     status_update: UserStatusUpdate,
     db: Session = Depends(get_db),
@@ -272,13 +287,14 @@ async def update_user_status_admin_api(
     try:
         db.commit()
         db.refresh(user_to_update)
+        identity_cache.invalidate_user(user_id)
         return user_to_update
     except Exception as e:
         db.rollback(); logger.error(f"Error updating user status ID {user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Could not update user status.")
 
 @admin_api_router.put("/users/{user_id}/role", response_model=UserResponse, summary="Update User Admin Role")
-async def update_user_role_admin_api(
+def update_user_role_admin_api(
     user_id: int,
     role_update: UserRoleUpdate,
     db: Session = Depends(get_db),
@@ -302,6 +318,7 @@ async def update_user_role_admin_api(
     user_to_update.updated_at = datetime.utcnow()
     try:
         db.commit(); db.refresh(user_to_update)
+        identity_cache.invalidate_user(user_id)
         logger.info(f"Admin '{admin_user.username}' updated admin role for user ID {user_id} to is_admin={user_to_update.is_admin}")
         return user_to_update
     except Exception as e:
@@ -309,7 +326,7 @@ async def update_user_role_admin_api(
         raise HTTPException(status_code=500, detail="Could not update user role.")
 
 @admin_api_router.put("/users/{user_id}/activity", response_model=UserResponse, summary="Activate or Deactivate User")
-async def update_user_activity_admin_api(
+def update_user_activity_admin_api(
     user_id: int,
     activity_update: UserActivityUpdate, # Expects {"is_active": true/false}
     db: Session = Depends(get_db),
@@ -340,6 +357,7 @@ async def update_user_activity_admin_api(
     action = "activated" if activity_update.is_active else "deactivated"
     try:
         db.commit(); db.refresh(user_to_update)
+        identity_cache.invalidate_user(user_id)
         logger.info(f"Admin '{admin_user.username}' {action} user ID {user_id} (Username: {user_to_update.username})")
         return user_to_update
     except Exception as e:
@@ -355,15 +373,15 @@ async def update_user_activity_admin_api(
 # ... (rest of your admin.py: submission management, feedback management, etc.)
 # === Admin API: Feedback (User Issues) Management ===
 @admin_api_router.get("/issues", response_model=List[UserIssueResponse], summary="Get User Issues")
-async def get_all_issues_admin_api(status_filter: Optional[str] = Query(None), db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
+def get_all_issues_admin_api(response: Response, status_filter: Optional[str] = Query(None), page: PageParams = Depends(page_params), db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
     query = db.query(UserIssue)
     if status_filter:
         query = query.filter(UserIssue.status == status_filter)
-    issues = query.order_by(desc(UserIssue.submitted_at)).all()
+    issues = paginate(query, [(UserIssue.submitted_at, True), (UserIssue.id, True)], page, response)
     return issues
 
 @admin_api_router.put("/issues/{issue_id}/status", response_model=UserIssueResponse, summary="Update Issue Status")
-async def update_issue_status_admin_api(
+def update_issue_status_admin_api(
     issue_id: int,
     new_status: str = Body(..., embed=True, description="New status (e.g., pending, investigating, resolved, completed)"),
     db: Session = Depends(get_db),
@@ -384,4 +402,126 @@ async def update_issue_status_admin_api(
         return issue
     except Exception as e:
         db.rollback(); logger.error(f"Error updating issue status ID {issue_id}: {e}", exc_info=True)
-        raise HTTPException(500, "Could not update issue status.")
\ No newline at end of file
+        raise HTTPException(500, "Could not update issue status.")
+
+# === Admin API: Runtime Stats ===
+@admin_api_router.get("/sessions/stats", summary="Session Store Stats")
+async def get_session_store_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns session store counters (LRU hits/misses/evictions, expiries)."""
+    return session_store.stats()
+
+@admin_api_router.get("/identity-cache/stats", summary="Identity Cache Stats")
+async def get_identity_cache_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns cookie-auth identity cache counters."""
+    return identity_cache.stats()
+
+@admin_api_router.get("/password-hashing/stats", summary="Password Hashing Pool Stats")
+async def get_password_hashing_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns hashing pool size, in-flight/rejected counts and per-operation latency."""
+    return password_pool.stats()
+
+@admin_api_router.get("/otp/stats", summary="OTP Store Stats")
+async def get_otp_store_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns OTP store size and expiry/lockout/throttling counters (plus memory footprint for the memory backend)."""
+    return await run_db(otp_store.stats)
+
+@admin_api_router.get("/db-executor/stats", summary="DB Thread Pool Stats")
+async def get_db_executor_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns DB worker-thread occupancy and run_db queue-wait/run-time percentiles."""
+    return {**threadpool_stats(), "connection_pool": pool_status()}
+
+@admin_api_router.get("/db/sqlite", summary="SQLite Settings Report")
+def get_sqlite_report_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns the active PRAGMA profile, the effective connection settings and the last WAL checkpoint."""
+    return sqlite_report()
+
+@admin_api_router.get("/sql/stats", summary="Per-Route SQL Stats")
+async def get_sql_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns statements, DB time and ORM rows per route (heaviest first) and N+1 warning counts."""
+    return {"repeat_warn_threshold": SQL_REPEAT_WARN_THRESHOLD, "routes": route_summary.snapshot()}
+
+@admin_api_router.get("/response-cache/stats", summary="Response Cache Stats")
+async def get_response_cache_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns response cache size, hit/miss counters and the cached routes with their table tags."""
+    return response_cache.stats()
+
+@admin_api_router.post("/response-cache/clear", summary="Clear Response Cache")
+async def clear_response_cache_admin_api(admin_user: User = Depends(require_admin)):
+    """Drops every cached response (e.g. after editing the database by hand)."""
+    removed = response_cache.clear()
+    logger.info(f"Admin '{admin_user.username}' cleared the response cache ({removed} entries).")
+    return {"cleared": removed}
+
+@admin_api_router.get("/counters/stats", summary="Write-Behind Counter Stats")
+async def get_counter_buffer_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns buffered like/vote increments not yet written, and flush counters."""
+    return counter_buffer.stats()
+
+@admin_api_router.post("/counters/flush", summary="Flush Write-Behind Counters")
+def flush_counter_buffer_admin_api(admin_user: User = Depends(require_admin)):
+    """Writes buffered like/vote increments to the database now."""
+    flushed = counter_buffer.flush()
+    logger.info(f"Admin '{admin_user.username}' flushed {flushed} buffered counters.")
+    return {"flushed": flushed}
+
+@admin_api_router.get("/tasks/stats", summary="Background Task Queue Stats")
+def get_task_queue_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns queue depth and lag, job counts per status/task, and worker success/retry counters."""
+    return task_queue.stats()
+
+@admin_api_router.get("/tasks/failed", summary="Failed Background Jobs")
+def get_failed_tasks_admin_api(limit: int = Query(50, ge=1, le=500), admin_user: User = Depends(require_admin)):
+    """Returns the most recent jobs that used up their attempts, with the last error."""
+    return task_queue.failed_jobs(limit)
+
+@admin_api_router.post("/tasks/{job_id}/retry", summary="Retry Failed Background Job")
+def retry_failed_task_admin_api(job_id: int, admin_user: User = Depends(require_admin)):
+    """Requeues a failed job with a fresh attempt budget."""
+    if not task_queue.retry(job_id):
+        raise HTTPException(status_code=404, detail="Failed job not found")
+    logger.info(f"Admin '{admin_user.username}' requeued background job {job_id}.")
+    return {"message": f"Job {job_id} requeued."}
+
+@admin_api_router.get("/pubsub/stats", summary="Push Hub Stats")
+async def get_pubsub_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns open push subscriptions (notification streams) and publish/delivery/drop counters."""
+    return hub.stats()
+
+@admin_api_router.get("/files/stats", summary="Upload Storage Stats")
+def get_file_storage_stats_admin_api(db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
+    """Returns stored file count/bytes, references and the bytes deduplication saved."""
+    return storage_stats(db)
+
+@admin_api_router.post("/files/sweep", summary="Sweep Unreferenced Uploads")
+def sweep_unreferenced_files_admin_api(db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
+    """Deletes uploaded files that nothing has referenced for the grace period, and abandoned partial uploads."""
+    result = sweep_unreferenced(db)
+    logger.info(f"Admin '{admin_user.username}' swept uploads: {result}")
+    return result
+
+@admin_api_router.get("/thumbnails/stats", summary="Image Preview Pool Stats")
+def get_thumbnail_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns whether previews are enabled (Pillow installed), the render pool's load and render counters."""
+    return thumbnail_pool.stats()
+
+@admin_api_router.get("/search/stats", summary="Search Index Stats")
+def get_search_index_stats_admin_api(db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
+    """Returns the number of indexed rows, in total and per searchable type."""
+    return search_index.index_stats(db)
+
+@admin_api_router.post("/search/rebuild", summary="Rebuild Search Index")
+def rebuild_search_index_admin_api(db: Session = Depends(get_db), admin_user: User = Depends(require_admin)):
+    """Repopulates the full-text search index from the users, fairs, hackathons, jobs and internships tables."""
+    try:
+        indexed = search_index.rebuild(db.connection())
+        db.commit()
+    except Exception as e:
+        db.rollback(); logger.error(f"Error rebuilding search index: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not rebuild search index")
+    logger.info(f"Admin '{admin_user.username}' rebuilt the search index ({indexed} rows).")
+    return {"indexed": indexed}
+
+@admin_api_router.get("/usernames/stats", summary="Username Index Stats")
+def get_username_index_stats_admin_api(admin_user: User = Depends(require_admin)):
+    """Returns the in-memory username index size and the exclusion-set cache hit ratio."""
+    return username_index.stats()
@@ -9,8 +9,12 @@ from typing import Optional, Annotated, Dict, Any # Keep Dict, Any
 from urllib.parse import urlencode
 import os # For path joining
 
-# Import User and get_db from models.py
-from .models import User, get_db
+# Import User from models.py, get_db from database.py
+from .database import get_db
+from .models import User
+from .session_store import SessionStore, build_session_store
+from .identity_cache import IdentityCache, UserIdentity
+from .otp_store import build_otp_store
 
 # --- Centralized Logger ---
 logger = logging.getLogger("exp") # Use a common root logger name
@@ -31,40 +35,50 @@ else:
 
 # --- !!!!!!! CENTRALIZED SESSION AND OTP STORAGE !!!!!!! ---
 # --- !!!!!!! DEFINED HERE - SINGLE INSTANCE FOR THE WHOLE APP !!!!!!! ---
-session_storage: Dict[str, int] = {}
-otp_storage: Dict[str, Dict[str, Any]] = {}
+# Sessions live in a shared store (see session_store.py) so several uvicorn workers can serve the same logins.
+session_store: SessionStore = build_session_store()
+# Lean per-token user snapshots so cookie auth doesn't load the full User row on every request.
+identity_cache = IdentityCache()
+# Password-reset OTPs and per-email throttling, shared between workers like sessions (see otp_store.py).
+otp_store = build_otp_store()
 # --- !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ---
 
 # --- Authentication Functions ---
-async def get_current_user_from_cookie(
+def get_current_user_from_cookie(
     session_token: Annotated[str | None, Cookie()] = None,
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[UserIdentity]:
     # logger.debug(f"get_current_user_from_cookie called. Token: '{session_token}'")
     if session_token is None:
         return None
-    
-    # Now uses the session_storage defined in THIS auth_utils.py file
-    user_id = session_storage.get(session_token) 
+
+    user_id = session_store.get_user_id(session_token)
     if user_id is None:
-        # logger.debug(f"Session token '{session_token}' not found in session_storage (auth_utils).")
+        # logger.debug(f"Session token '{session_token[:8]}...' not found or expired in session_store.")
+        identity_cache.invalidate_token(session_token)
         return None
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        logger.warning(f"User ID {user_id} from session token '{session_token}' not found in DB. Cleaning session from auth_utils storage.")
-        if session_token in session_storage:
-            try:
-                del session_storage[session_token]
-            except KeyError:
-                pass
+
+    identity = identity_cache.get(session_token)
+    if identity is not None and identity.id == user_id:
+        return identity
+
+    # Only the columns needed for auth decisions, not the wide profile row
+    row = db.query(
+        User.id, User.username, User.is_admin, User.is_alumni, User.is_student, User.is_active
+    ).filter(User.id == user_id).first()
+    if row is None:
+        logger.warning(f"User ID {user_id} from session token '{session_token[:8]}...' not found in DB. Removing session.")
+        session_store.delete(session_token)
+        identity_cache.invalidate_token(session_token)
         return None
-    # logger.debug(f"User '{user.username}' (ID: {user.id}) authenticated from cookie (auth_utils).")
-    return user
+    identity = UserIdentity.from_row(row)
+    identity_cache.put(session_token, identity)
+    # logger.debug(f"User '{identity.username}' (ID: {identity.id}) authenticated from cookie (auth_utils).")
+    return identity
 
 async def require_user_from_cookie(
-    user: Annotated[Optional[User], Depends(get_current_user_from_cookie)]
-) -> User:
+    user: Annotated[Optional[UserIdentity], Depends(get_current_user_from_cookie)]
+) -> UserIdentity:
     if user is None:
         # logger.warning("require_user_from_cookie (auth_utils): No authenticated user. Redirecting.")
         query_params = urlencode({"error": "Session expired. Please log in."})
@@ -75,9 +89,19 @@ async def require_user_from_cookie(
         )
     return user
 
-async def require_admin(
-    current_user: User = Depends(require_user_from_cookie)
+def require_user_record_from_cookie(
+    identity: UserIdentity = Depends(require_user_from_cookie),
+    db: Session = Depends(get_db)
 ) -> User:
+    """Loads the full User row for routes that return or edit the whole profile."""
+    user = db.query(User).filter(User.id == identity.id).first()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
+
+async def require_admin(
+    current_user: UserIdentity = Depends(require_user_from_cookie)
+) -> UserIdentity:
     if not current_user.is_admin:
         # logger.warning(f"User '{current_user.username}' (ID: {current_user.id}) not admin. Denied by require_admin (auth_utils).")
         raise HTTPException(
@@ -0,0 +1,36 @@
+# backend-exp/benchmarks/_scratch_app.py
+"""Shared helper: import the app from a throwaway copy so benchmarks never touch explore.db."""
+
+import importlib
+import os
+import shutil
+import sys
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(HERE)
+EXPLORE_DIR = os.path.dirname(BACKEND_DIR)
+
+
+def copy_app(workdir):
+    """Copies backend + frontend into workdir/explore and returns the backend copy's path."""
+    explore_copy = os.path.join(workdir, "explore")
+    backend_copy = os.path.join(explore_copy, "backend_exp")
+    shutil.copytree(BACKEND_DIR, backend_copy,
+                    ignore=shutil.ignore_patterns("benchmarks", "__pycache__", ".venv", "uploads"))
+    shutil.copytree(os.path.join(EXPLORE_DIR, "frontend-exp"), os.path.join(explore_copy, "frontend-exp"))
+    return backend_copy
+
+
+def import_app_module(backend_copy, name="exp"):
+    """Imports a backend module from the copy (the real dir has a hyphen, so it is aliased as a package)."""
+    os.chdir(os.path.dirname(backend_copy))  # exp.py resolves its templates relative to the working directory
+    os.environ.setdefault("DB_AUTO_MIGRATE", "1")  # It's a throwaway copy, so bring its schema up to date at startup
+    package = types.ModuleType("backend_exp")
+    package.__path__ = [backend_copy]
+    sys.modules["backend_exp"] = package
+    return importlib.import_module(f"backend_exp.{name}")
+
+
+def load_app(workdir):
+    return import_app_module(copy_app(workdir)).app
@@ -0,0 +1,90 @@
+# backend-exp/benchmarks/bench_concurrency.py
+"""
+Latency under mixed concurrent load, measured in-process through the ASGI app.
+
+Heavy DB readers (/api/search, /api/jobs) run alongside cheap requests (/api/features and the
+login page). When handlers block the event loop the cheap requests queue behind every query and
+their p99 tracks the heavy ones; with DB work in worker threads it stays close to their own cost.
+Run it on a checkout from before the threadpool change to get the "before" numbers.
+
+The app is loaded from a temporary copy of the backend and frontend, so explore.db is never touched.
+
+Usage (from explore/backend-exp):
+    python benchmarks/bench_concurrency.py [--seconds 10] [--heavy 16] [--light 8]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _scratch_app import load_app  # noqa: E402
+
+HEAVY_PATHS = ["/api/search?term=a", "/api/jobs"]
+LIGHT_PATHS = ["/api/features", "/"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def worker(client, paths, deadline, results):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        response = await client.get(path)
+        results.setdefault(path, []).append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 500:
+            results.setdefault("errors", []).append(path)
+
+
+async def run(app, seconds, heavy, light):
+    import httpx
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in HEAVY_PATHS + LIGHT_PATHS:  # Warm caches and connections
+                await client.get(path)
+            deadline = time.perf_counter() + seconds
+            await asyncio.gather(
+                *(worker(client, HEAVY_PATHS, deadline, results) for _ in range(heavy)),
+                *(worker(client, LIGHT_PATHS, deadline, results) for _ in range(light)),
+            )
+
+    errors = results.pop("errors", [])
+    print(f"{heavy} heavy + {light} light clients for {seconds}s")
+    print(f"{'path':<22} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for path in HEAVY_PATHS + LIGHT_PATHS:
+        samples = results.get(path, [])
+        if samples:
+            print(f"{path:<22} {len(samples):>9} {percentile(samples, 0.5):>9.1f} "
+                  f"{percentile(samples, 0.99):>9.1f} {max(samples):>9.1f}")
+    if errors:
+        print(f"5xx responses: {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--heavy", type=int, default=16, help="concurrent clients on heavy DB endpoints")
+    parser.add_argument("--light", type=int, default=8, help="concurrent clients on cheap endpoints")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        app = load_app(workdir)
+        asyncio.run(run(app, args.seconds, args.heavy, args.light))
+
+
+if __name__ == "__main__":
+    main()
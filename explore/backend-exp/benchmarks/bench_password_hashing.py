@@ -0,0 +1,79 @@
+# backend-exp/benchmarks/bench_password_hashing.py
+"""
+Event-loop lag while a burst of logins verifies bcrypt passwords.
+
+Compares verifying inline on the event loop (the old behaviour) with the process pool in
+password_hashing.py. A ticker coroutine sleeps TICK_MS at a time and records how late it wakes up;
+that lateness is what every other request on the worker would see.
+
+Usage (from explore/backend-exp):
+    python benchmarks/bench_password_hashing.py [--logins 40] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import password_hashing  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+TICK_MS = 5
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_MS / 1000
+        await asyncio.sleep(TICK_MS / 1000)
+        lags.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+async def run(mode, logins, hashed, pool):
+    lags, stop = [], asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.05)
+
+    async def one_login():
+        if mode == "inline":
+            return password_hashing.verify_password("password123", hashed)
+        try:
+            return await pool.verify("password123", hashed)
+        except HTTPException:
+            return None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_login() for _ in range(logins)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await tick_task
+
+    lags.sort()
+    print(f"{mode:>7}: {logins} logins in {wall:6.2f}s | loop lag p50 {statistics.median(lags):7.1f} ms"
+          f" p99 {lags[int(len(lags) * 0.99) - 1]:7.1f} ms max {lags[-1]:7.1f} ms"
+          f" | rejected (503) {sum(r is None for r in results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=password_hashing.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=None, help="defaults to --logins (no rejections)")
+    args = parser.parse_args()
+
+    hashed = password_hashing.hash_password("password123")
+    pool = password_hashing.PasswordHasherPool(workers=args.workers, max_pending=args.max_pending or args.logins)
+    pool.start()
+    try:
+        asyncio.run(run("inline", args.logins, hashed, pool))
+        asyncio.run(run("pool", args.logins, hashed, pool))
+        print(pool.stats())
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# backend-exp/benchmarks/bench_sqlite_profiles.py
+"""
+Read/write concurrency under each SQLite PRAGMA profile in database.py.
+
+For every profile a fresh temporary database is seeded, then reader threads (point lookups and
+small range scans) and writer threads (single-row UPDATE + commit, like a like/upvote) run for a
+fixed time against an engine built by database.create_app_engine(). Reports throughput, p99
+latency and "database is locked" errors per profile.
+
+Usage (from explore/backend-exp):
+    python benchmarks/bench_sqlite_profiles.py [--seconds 5] [--readers 8] [--writers 2]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+ROWS = 20000
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, counter INTEGER NOT NULL, payload TEXT)")
+        conn.exec_driver_sql(
+            "INSERT INTO items (id, counter, payload) VALUES (?, 0, ?)",
+            [(i, "x" * 200) for i in range(1, ROWS + 1)],
+        )
+
+
+def reader(engine, deadline, latencies, errors):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                if rng.random() < 0.8:
+                    conn.exec_driver_sql("SELECT * FROM items WHERE id = ?", (rng.randint(1, ROWS),)).fetchall()
+                else:
+                    low = rng.randint(1, ROWS - 50)
+                    conn.exec_driver_sql("SELECT id, counter FROM items WHERE id BETWEEN ? AND ?", (low, low + 50)).fetchall()
+        except OperationalError:
+            errors.append(1)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+def writer(engine, deadline, latencies, errors):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql("UPDATE items SET counter = counter + 1 WHERE id = ?", (rng.randint(1, ROWS),))
+        except OperationalError:
+            errors.append(1)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+def p99(samples):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def run_profile(profile, seconds, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+        seed(engine)
+        read_lat, write_lat, read_err, write_err = [], [], [], []
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=reader, args=(engine, deadline, read_lat, read_err)) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(engine, deadline, write_lat, write_err)) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+    print(f"{profile:<11} {len(read_lat) / seconds:>9.0f} {p99(read_lat):>10.2f} "
+          f"{len(write_lat) / seconds:>9.0f} {p99(write_lat):>10.2f} {len(read_err) + len(write_err):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--profiles", default=",".join(database.SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers + {args.writers} writers, {args.seconds}s per profile, {ROWS} rows")
+    print(f"{'profile':<11} {'reads/s':>9} {'read p99':>10} {'writes/s':>9} {'write p99':>10} {'locked':>7}")
+    for profile in args.profiles.split(","):
+        run_profile(profile, args.seconds, args.readers, args.writers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# backend-exp/benchmarks/bench_startup.py
+"""
+Cold-start cost of the app: module import, startup hooks, and how many SQLAlchemy engines exist.
+
+Each run is a fresh interpreter importing exp.py from a scratch copy of the backend, so import
+caches don't carry over and explore.db is never touched. Run it on a checkout from before the
+shared database runtime to get the "before" numbers.
+
+Usage (from explore/backend-exp):
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import asyncio, gc, json, logging, sys, time
+logging.disable(logging.CRITICAL)
+sys.path.insert(0, sys.argv[1])
+from _scratch_app import import_app_module
+t0 = time.perf_counter()
+exp = import_app_module(sys.argv[2])
+t1 = time.perf_counter()
+
+async def lifespan():
+    async with exp.app.router.lifespan_context(exp.app):
+        return time.perf_counter()
+
+t2 = asyncio.run(lifespan())
+from sqlalchemy.engine import Engine
+engines = sum(1 for o in gc.get_objects() if isinstance(o, Engine))
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "startup_ms": (t2 - t1) * 1000, "engines": engines}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    from _scratch_app import copy_app
+
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        backend_copy = copy_app(workdir)
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, "-c", CHILD, HERE, backend_copy],
+                                 capture_output=True, text=True, check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in ("import_ms", "startup_ms"):
+        values = [s[key] for s in samples]
+        print(f"{key:<11} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+    print(f"engines     {samples[-1]['engines']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# backend-exp/chat.py
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import and_, desc, func, select
+from sqlalchemy.orm import Session, aliased
+
+from .database import SessionLocal
+from .db_executor import run_db
+from .file_storage import StoredUpload, add_reference
+from .identity_cache import UserIdentity
+from .models import ChatContact, ChatContactInfo, ChatMessage, ChatMessageOut, ChatParticipant, StoredFile, User
+from .pubsub import hub
+from .thumbnails import enqueue_upload_thumbnails
+
+logger = logging.getLogger("exp.chat")
+
+# --- Configuration ---
+# How often an idle chat socket re-checks its session (sends re-check it every time)
+CHAT_SESSION_RECHECK_SECONDS = int(os.environ.get("CHAT_SESSION_RECHECK_SECONDS", 60))
+
+# WebSocket close codes (RFC 6455 / IANA registry; 4000-4999 are application-defined)
+WS_POLICY_VIOLATION = 1008  # Not logged in, not a participant of the chat, or a foreign Origin
+WS_SESSION_ENDED = 4401     # Session logged out, expired or reassigned while the socket was open
+
+def chat_topic(contact_id: int) -> str:
+    return f"chat:{contact_id}"
+
+
+# --- Participation ---
+def get_chat_contact_for(db: Session, contact_id: int, user: UserIdentity, action: str = "access") -> ChatContact:
+    """The chat contact if `user` is one of its participants, else 404/403 (one primary-key join)."""
+    row = db.query(ChatContact, ChatParticipant.user_id)\
+        .outerjoin(ChatParticipant, and_(ChatParticipant.contact_id == ChatContact.id, ChatParticipant.user_id == user.id))\
+        .filter(ChatContact.id == contact_id).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat contact not found")
+    contact, participant_id = row
+    if participant_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Forbidden: You cannot {action} this chat.")
+    return contact
+
+def open_direct_chat(db: Session, user_id: int, other_user_id: int) -> ChatContact:
+    """The 1-on-1 chat between two users, created (with both participant rows) if they don't have one yet. Commits."""
+    me, other = aliased(ChatParticipant), aliased(ChatParticipant)
+    contact = db.query(ChatContact)\
+        .join(me, and_(me.contact_id == ChatContact.id, me.user_id == user_id))\
+        .join(other, and_(other.contact_id == ChatContact.id, other.user_id == other_user_id))\
+        .first()
+    if contact:
+        return contact
+    low, high = sorted((user_id, other_user_id))
+    contact = ChatContact(name=f"chat_users_{low}_{high}")  # Name kept for readability in the admin/DB tools
+    db.add(contact)
+    db.flush()
+    db.add_all([ChatParticipant(contact_id=contact.id, user_id=low), ChatParticipant(contact_id=contact.id, user_id=high)])
+    db.commit(); db.refresh(contact)
+    return contact
+
+
+# --- Contact list ---
+CHAT_PREVIEW_LENGTH = 80  # Characters of the last message shown in the contact list
+
+def chat_contacts_query(db: Session, user_id: int):
+    """
+    The user's chats in one query: the other participant's id and username plus the newest message,
+    most recently active first. The newest message is a per-contact max(id) lookup on (contact_id, id).
+    """
+    me, other, last = aliased(ChatParticipant), aliased(ChatParticipant), aliased(ChatMessage)
+    last_id = select(func.max(ChatMessage.id)).where(ChatMessage.contact_id == me.contact_id)\
+        .correlate(me).scalar_subquery()
+    activity = func.coalesce(last.timestamp, ChatContact.updated_at)
+    return db.query(me.contact_id, other.user_id, User.username, last.text, last.file_path, last.timestamp)\
+        .join(ChatContact, ChatContact.id == me.contact_id)\
+        .join(other, and_(other.contact_id == me.contact_id, other.user_id != me.user_id))\
+        .join(User, User.id == other.user_id)\
+        .outerjoin(last, last.id == last_id)\
+        .filter(me.user_id == user_id)\
+        .order_by(desc(activity), desc(me.contact_id))
+
+def list_chat_contacts(db: Session, user: UserIdentity) -> List[ChatContactInfo]:
+    contacts = []
+    for contact_id, other_id, other_username, text, file_path, timestamp in chat_contacts_query(db, user.id).all():
+        preview = (f"[file] {text}" if text else "[file]") if file_path else text
+        if preview and len(preview) > CHAT_PREVIEW_LENGTH:
+            preview = preview[:CHAT_PREVIEW_LENGTH - 1] + "…"
+        contacts.append(ChatContactInfo(contact_id=contact_id, other_user_username=other_username, other_user_id=other_id,
+                                        last_message_preview=preview, last_message_timestamp=timestamp))
+    return contacts
+
+
+# --- History ---
+CHAT_HISTORY_PAGE_SIZE = 50  # Messages per history request by default
+CHAT_HISTORY_MAX_PAGE = 200
+
+def chat_history_query(db: Session, contact_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None,
+                       limit: int = CHAT_HISTORY_PAGE_SIZE):
+    """
+    One page of a chat by message id, a range seek on (contact_id, id). With after_id: the oldest messages
+    newer than it, ascending (incremental sync). Otherwise: the newest messages older than before_id (or
+    the newest overall), descending (the caller reverses them).
+    """
+    query = db.query(ChatMessage).filter(ChatMessage.contact_id == contact_id)
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    if after_id is not None:
+        return query.filter(ChatMessage.id > after_id).order_by(ChatMessage.id.asc()).limit(limit)
+    return query.order_by(ChatMessage.id.desc()).limit(limit)
+
+def chat_history(db: Session, contact_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None,
+                 limit: int = CHAT_HISTORY_PAGE_SIZE) -> List[ChatMessage]:
+    """A page of messages, always oldest first. A full page means there may be more in that direction."""
+    messages = chat_history_query(db, contact_id, before_id, after_id, limit).all()
+    if after_id is None:
+        messages.reverse()
+    return messages
+
+
+# --- Sending ---
+def post_chat_message(db: Session, contact_id: int, user: UserIdentity, text: Optional[str]) -> ChatMessageOut:
+    """
+    Checks participation, stores the message and publishes it to the chat's connected participants.
+    Shared by POST /api/send-message and the chat WebSocket, so both paths behave the same.
+    """
+    text = (text or "").strip()
+    if not text:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message text cannot be empty")
+    get_chat_contact_for(db, contact_id, user, action="send messages to")
+    return _store_message(db, ChatMessage(contact_id=contact_id, sender=user.username, text=text, timestamp=datetime.utcnow()))
+
+def get_chat_file_for(db: Session, contact_id: int, digest: str, user: UserIdentity) -> StoredFile:
+    """A file posted in a chat the user takes part in (same rule as reading the chat's messages), else 404/403."""
+    get_chat_contact_for(db, contact_id, user)
+    stored = chat_file_query(db, contact_id, digest).first()
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in this chat")
+    return stored
+
+def chat_file_query(db: Session, contact_id: int, digest: str):
+    return db.query(StoredFile).join(ChatMessage, ChatMessage.file_path == StoredFile.sha256)\
+        .filter(ChatMessage.file_path == digest, ChatMessage.contact_id == contact_id).limit(1)
+
+def post_chat_file(db: Session, contact_id: int, user: UserIdentity, upload: StoredUpload) -> ChatMessageOut:
+    """
+    Stores a message pointing at an uploaded file (file_path = its digest), taking a reference on it, and publishes it.
+    Images also get their previews queued, committed with the message.
+    """
+    get_chat_contact_for(db, contact_id, user, action="send files to")
+    add_reference(db, upload)
+    enqueue_upload_thumbnails(db, upload)
+    return _store_message(db, ChatMessage(contact_id=contact_id, sender=user.username, text=upload.original_name,
+                                          file_path=upload.sha256, timestamp=datetime.utcnow()))
+
+def _store_message(db: Session, db_message: ChatMessage) -> ChatMessageOut:
+    try:
+        db.add(db_message); db.commit(); db.refresh(db_message)
+    except Exception as e:
+        db.rollback(); logger.error(f"[CHAT] DB error storing message from '{db_message.sender}' in chat {db_message.contact_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not send message.")
+    message = ChatMessageOut.model_validate(db_message)
+    hub.publish(chat_topic(db_message.contact_id), {"type": "message", "message": message.model_dump(mode="json")})
+    return message
+
+
+# --- WebSocket session ---
+def _with_session(fn, *args, **kwargs):
+    with SessionLocal() as db:
+        return fn(db, *args, **kwargs)
+
+def is_allowed_origin(websocket: WebSocket, allowed_origins: Sequence[str]) -> bool:
+    """
+    Browsers send the page's Origin on every WebSocket handshake (and the session cookie with it, from
+    any site), so only our own host and the configured CORS origins may open a socket. Clients that
+    send no Origin aren't browsers and can't ride someone else's cookie.
+    """
+    origin = websocket.headers.get("origin")
+    if origin is None:
+        return True
+    own_origin = f"{'https' if websocket.url.scheme == 'wss' else 'http'}://{websocket.headers.get('host', '')}"
+    return origin == own_origin or origin in allowed_origins
+
+async def serve_chat_socket(websocket: WebSocket, contact_id: int, user: Optional[UserIdentity],
+                            recheck_session: Callable[[], Optional[UserIdentity]],
+                            allowed_origins: Sequence[str] = ()) -> None:
+    """
+    One participant's live connection to a chat. Client frames are {"text": "..."}; server frames are
+    {"type": "message", "message": {...}} for every message in the chat (the sender's own included, as
+    the acknowledgement), {"type": "error", "detail": "..."} for rejected sends, and {"type": "resync"}
+    when messages were dropped for a slow connection (reload the history over REST).
+
+    `recheck_session` resolves the socket's session cookie again (blocking; run on the DB pool). It runs
+    before every send and every CHAT_SESSION_RECHECK_SECONDS while idle; once the session is gone
+    (logout, expiry) the socket is closed with WS_SESSION_ENDED.
+    """
+    if not is_allowed_origin(websocket, allowed_origins):
+        logger.warning(f"[CHAT] Rejected WebSocket for chat {contact_id} from origin '{websocket.headers.get('origin')}'.")
+        await websocket.close(code=WS_POLICY_VIOLATION, reason="Origin not allowed")
+        return
+    if user is None:
+        await websocket.close(code=WS_POLICY_VIOLATION, reason="Not authenticated")
+        return
+    try:
+        await run_db(_with_session, get_chat_contact_for, contact_id, user)
+    except HTTPException as e:
+        await websocket.close(code=WS_POLICY_VIOLATION, reason=str(e.detail)[:120])
+        return
+
+    await websocket.accept()
+    subscription = hub.subscribe(chat_topic(contact_id))
+    logger.info(f"[CHAT] '{user.username}' connected to chat {contact_id}.")
+
+    async def forward():
+        # Hub -> socket; runs beside the receive loop below
+        while True:
+            message = await subscription.get()
+            if subscription.overflowed:
+                subscription.overflowed = False
+                await websocket.send_json({"type": "resync"})
+            await websocket.send_json(message)
+
+    async def session_valid() -> bool:
+        current = await run_db(recheck_session)
+        return current is not None and current.id == user.id
+
+    async def end_session():
+        logger.info(f"[CHAT] Session of '{user.username}' ended; closing socket for chat {contact_id}.")
+        await websocket.close(code=WS_SESSION_ENDED, reason="Session ended")
+
+    async def watch_session():
+        # Idle sockets are checked here; the pending receive below then ends with a disconnect
+        while True:
+            await asyncio.sleep(CHAT_SESSION_RECHECK_SECONDS)
+            if not await session_valid():
+                await end_session()
+                return
+
+    forwarder = asyncio.create_task(forward())
+    watcher = asyncio.create_task(watch_session())
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            if not await session_valid():
+                await end_session()
+                break
+            text = frame.get("text") if isinstance(frame, dict) else None
+            try:
+                await run_db(_with_session, post_chat_message, contact_id, user, text)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Client went away (RuntimeError: the forwarder's send found the socket already closed)
+    except ValueError:
+        await websocket.close(code=1003, reason="Expected JSON frames")  # 1003: unsupported data
+    finally:
+        forwarder.cancel()
+        watcher.cancel()
+        hub.unsubscribe(subscription)
+        logger.info(f"[CHAT] '{user.username}' disconnected from chat {contact_id}.")
@@ -0,0 +1,181 @@
+# backend-exp/counter_buffer.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, case, event, func
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .database import engine
+from .models import DailySparkAnswer, ExpertQAAnswer, Question, User
+from .response_cache import response_cache
+
+logger = logging.getLogger("exp.counters")
+
+# --- Configuration ---
+COUNTER_FLUSH_INTERVAL_SECONDS = float(os.environ.get("COUNTER_FLUSH_INTERVAL_SECONDS", 2))
+COUNTER_FLUSH_MAX_PENDING = int(os.environ.get("COUNTER_FLUSH_MAX_PENDING", 500))  # Distinct (counter, id) keys before an early flush
+
+
+@dataclass(frozen=True)
+class CounterSpec:
+    """One integer column that clicks increment, e.g. users.likes."""
+    model: Any
+    column: str
+    min_value: Optional[int] = None  # Clamp applied in the UPDATE (question likes never go below 0)
+
+    @property
+    def name(self) -> str:
+        return f"{self.model.__tablename__}.{self.column}"
+
+
+# Counters written through the buffer
+ALUMNI_LIKES = CounterSpec(User, "likes")
+QUESTION_LIKES = CounterSpec(Question, "likes", min_value=0)
+EXPERTQA_ANSWER_LIKES = CounterSpec(ExpertQAAnswer, "likes")
+DAILY_SPARK_ANSWER_VOTES = CounterSpec(DailySparkAnswer, "votes")
+COUNTERS = (ALUMNI_LIKES, QUESTION_LIKES, EXPERTQA_ANSWER_LIKES, DAILY_SPARK_ANSWER_VOTES)
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer for click counters.
+
+    add() merges deltas per (counter, row id) in memory; flush() applies them in one transaction as
+    `SET col = COALESCE(col, 0) + :delta`, so concurrent clicks are never lost and a burst of clicks costs
+    one write instead of one per click. Until then, ORM loads of the affected rows get the pending delta
+    folded in (see install_read_merge), so a user sees their click immediately.
+    """
+
+    def __init__(self, bind=engine, max_pending: int = COUNTER_FLUSH_MAX_PENDING):
+        self.bind = bind
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[CounterSpec, int], int] = {}
+        self._inflight: Dict[Tuple[CounterSpec, int], int] = {}  # Being written by the current flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time
+        # Counters
+        self.events = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.last_flush_ms: Optional[float] = None
+
+    def add(self, spec: CounterSpec, entity_id: int, delta: int = 1) -> None:
+        with self._lock:
+            key = (spec, entity_id)
+            self._pending[key] = self._pending.get(key, 0) + delta
+            self.events += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()  # Callers are sync handlers in worker threads, so flushing inline is fine
+
+    def pending_delta(self, spec: CounterSpec, entity_id: int) -> int:
+        """
+        Delta not yet visible in the database (queued or mid-flush). flush() commits and clears _inflight
+        under the same lock, so a caller sees the in-flight delta only while it isn't committed; a row
+        read just before a commit and merged just after it may briefly miss that delta, never count it twice.
+        """
+        key = (spec, entity_id)
+        with self._lock:
+            return self._pending.get(key, 0) + self._inflight.get(key, 0)
+
+    def flush(self) -> int:
+        """Writes all pending deltas in one transaction. Returns the number of rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            started = time.perf_counter()
+            by_counter: Dict[CounterSpec, list] = {}
+            for (spec, entity_id), delta in batch.items():
+                if delta:
+                    by_counter.setdefault(spec, []).append({"_id": entity_id, "_delta": delta})
+            try:
+                with self.bind.connect() as conn:
+                    transaction = conn.begin()
+                    for spec, params in by_counter.items():
+                        table = spec.model.__table__
+                        column = table.c[spec.column]
+                        new_value = func.coalesce(column, 0) + bindparam("_delta")
+                        if spec.min_value is not None:
+                            new_value = case((new_value < spec.min_value, spec.min_value), else_=new_value)
+                        stmt = table.update().where(table.c.id == bindparam("_id")).values({spec.column: new_value})
+                        conn.execute(stmt, params)  # executemany
+                    # Commit and stop reporting the batch as in flight atomically for readers (see pending_delta)
+                    with self._lock:
+                        transaction.commit()
+                        self._inflight = {}
+            except Exception as e:
+                # Put the batch back so the next flush retries it
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending[key] = self._pending.get(key, 0) + delta
+                    self._inflight = {}
+                    self.flush_errors += 1
+                logger.error(f"Counter flush of {len(batch)} keys failed, will retry: {e}", exc_info=True)
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.rows_flushed += len(batch)
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        # Core UPDATEs bypass the ORM session events, so tell the response cache directly
+        response_cache.invalidate_tags({spec.model.__tablename__ for spec in by_counter})
+        return len(batch)
+
+    async def run_flusher(self, interval_seconds: float = COUNTER_FLUSH_INTERVAL_SECONDS) -> None:
+        """Background task: flushes buffered counters every interval until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Counter flusher error: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_by_counter: Dict[str, int] = {}
+            for spec, _ in self._pending:
+                pending_by_counter[spec.name] = pending_by_counter.get(spec.name, 0) + 1
+            return {
+                "pending_keys": len(self._pending),
+                "pending_by_counter": pending_by_counter,
+                "max_pending": self.max_pending,
+                "flush_interval_seconds": COUNTER_FLUSH_INTERVAL_SECONDS,
+                "events": self.events,
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": self.last_flush_ms,
+            }
+
+
+counter_buffer = CounterBuffer()
+
+
+# --- Read merge ---
+def _merge_pending(spec: CounterSpec):
+    def on_load(target, context, attrs=None):
+        if attrs is not None and spec.column not in attrs:
+            return
+        delta = counter_buffer.pending_delta(spec, target.id)
+        if delta:
+            value = (getattr(target, spec.column) or 0) + delta
+            if spec.min_value is not None:
+                value = max(spec.min_value, value)
+            set_committed_value(target, spec.column, value)  # Doesn't mark the row dirty
+    return on_load
+
+def install_read_merge() -> None:
+    """Folds pending deltas into every ORM load/refresh of a buffered counter's row (call once at import)."""
+    for spec in COUNTERS:
+        handler = _merge_pending(spec)
+        event.listen(spec.model, "load", handler)
+        event.listen(spec.model, "refresh", handler)
@@ -0,0 +1,162 @@
+# backend-exp/database.py
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+logger = logging.getLogger("exp.database")
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_URL = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'explore.db')}")
+# Pool defaults add up to the DB worker-thread limit (DB_THREADPOOL_SIZE, 40) so a busy thread never waits on a connection
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("DB_POOL_RECYCLE_SECONDS", 1800))
+DB_POOL_TIMEOUT_SECONDS = int(os.environ.get("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_ECHO = os.environ.get("DB_ECHO", "0") == "1"
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "production").lower()
+SQLITE_CHECKPOINT_INTERVAL_SECONDS = int(os.environ.get("SQLITE_CHECKPOINT_INTERVAL_SECONDS", 300))
+
+# --- SQLite PRAGMA Profiles ---
+# Applied to every new pooled connection. Order matters: journal_mode first, since synchronous=NORMAL is only safe under WAL.
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Stock SQLite behaviour (rollback journal, readers block behind writers)
+    "default": {},
+    # WAL so readers don't wait on writers; NORMAL sync is durable against app crashes (an OS crash may lose the last commits)
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,  # Bytes of the file mapped for reads
+        "cache_size": -64 * 1024,         # Negative = KiB, i.e. 64 MiB page cache per connection
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,             # ms to wait on a lock before raising "database is locked"
+    },
+    # WAL concurrency but fsync on every commit
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    logger.warning(f"Unknown SQLITE_PROFILE '{SQLITE_PROFILE}', falling back to 'default'.")
+    SQLITE_PROFILE = "default"
+
+
+def apply_sqlite_profile(dbapi_connection, profile: str) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PROFILES[profile].items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def create_app_engine(url: str = DATABASE_URL, profile: str = SQLITE_PROFILE):
+    """Builds an engine with the configured pool and, for SQLite, the named PRAGMA profile on every connection."""
+    is_sqlite = url.startswith("sqlite")
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        echo=DB_ECHO,
+    )
+    if is_sqlite and SQLITE_PROFILES[profile]:
+        @event.listens_for(new_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            apply_sqlite_profile(dbapi_connection, profile)
+    return new_engine
+
+
+# --- Engine / Session Factory (the only ones in the app) ---
+engine = create_app_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+
+# --- Database Dependency ---
+def get_db():
+    """Dependency to get a DB session."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# --- Lifecycle ---
+# Schema is managed by migrations.py (startup only checks schema_version).
+
+# --- WAL Checkpointing ---
+_last_checkpoint: Optional[Dict[str, Any]] = None
+_checkpoint_lock = threading.Lock()
+
+def uses_wal() -> bool:
+    return engine.dialect.name == "sqlite" and SQLITE_PROFILES[SQLITE_PROFILE].get("journal_mode", "").upper() == "WAL"
+
+def checkpoint_wal(mode: str = "PASSIVE") -> Dict[str, Any]:
+    """Folds the WAL back into the main file so it doesn't grow without bound under steady writes."""
+    global _last_checkpoint
+    with engine.connect() as conn:
+        busy, log_frames, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    result = {"mode": mode, "busy": busy, "log_frames": log_frames, "checkpointed_frames": checkpointed,
+              "at": datetime.utcnow().isoformat()}
+    with _checkpoint_lock:
+        _last_checkpoint = result
+    return result
+
+async def run_wal_checkpointer(interval_seconds: int = SQLITE_CHECKPOINT_INTERVAL_SECONDS) -> None:
+    """Background task: periodic passive WAL checkpoints until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(checkpoint_wal)
+            if result["busy"]:
+                logger.info(f"WAL checkpoint could not finish (readers active): {result}")
+        except Exception as e:
+            logger.error(f"WAL checkpoint failed: {e}", exc_info=True)
+
+def sqlite_report() -> Dict[str, Any]:
+    """Active profile, what it asks for, and what the connection actually reports."""
+    report: Dict[str, Any] = {"dialect": engine.dialect.name, "profile": SQLITE_PROFILE,
+                              "requested": SQLITE_PROFILES[SQLITE_PROFILE]}
+    if engine.dialect.name != "sqlite":
+        return report
+    pragmas = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store",
+               "busy_timeout", "page_size", "wal_autocheckpoint", "foreign_keys")
+    with engine.connect() as conn:
+        report["effective"] = {p: conn.exec_driver_sql(f"PRAGMA {p}").scalar() for p in pragmas}
+        report["sqlite_version"] = conn.exec_driver_sql("select sqlite_version()").scalar()
+    report["checkpoint_interval_seconds"] = SQLITE_CHECKPOINT_INTERVAL_SECONDS if uses_wal() else None
+    with _checkpoint_lock:
+        report["last_checkpoint"] = _last_checkpoint
+    return report
+
+def dispose_db() -> None:
+    """Closes pooled connections. Called from the app's shutdown event."""
+    engine.dispose()
+    logger.info("Database connection pool disposed.")
+
+def pool_status() -> Dict[str, Any]:
+    """Connection pool occupancy for the admin stats endpoint."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__, "url": engine.url.render_as_string(hide_password=True)}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, name, None)
+        if callable(getter):
+            status[name] = getter()
+    status["max_overflow"] = DB_MAX_OVERFLOW
+    status["recycle_seconds"] = DB_POOL_RECYCLE_SECONDS
+    return status
@@ -0,0 +1,105 @@
+# backend-exp/db_executor.py
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, TypeVar
+
+import anyio
+import anyio.to_thread
+
+logger = logging.getLogger("exp.db_executor")
+
+T = TypeVar("T")
+
+# --- Configuration ---
+# All blocking DB work runs in anyio's worker threads: plain `def` route handlers and sync dependencies
+# (FastAPI dispatches those there itself) and anything an `async def` handler passes to run_db().
+# They share one limiter, so this is the single bound on concurrent DB work per process.
+DB_THREADPOOL_SIZE = int(os.environ.get("DB_THREADPOOL_SIZE", 40))
+DB_EXECUTOR_LATENCY_WINDOW = 1000  # Recent run_db samples kept for percentiles
+
+
+class DBExecutorMetrics:
+    """Counters for run_db calls: how long they waited for a worker thread and how long they ran."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self._wait_ms: Deque[float] = deque(maxlen=DB_EXECUTOR_LATENCY_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=DB_EXECUTOR_LATENCY_WINDOW)
+
+    def record(self, wait_ms: float, run_ms: float, failed: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if failed:
+                self.errors += 1
+            self._wait_ms.append(wait_ms)
+            self._run_ms.append(run_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        def summarize(samples):
+            if not samples:
+                return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+            ordered = sorted(samples)
+            return {
+                "p50_ms": round(ordered[len(ordered) // 2], 2),
+                "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "queue_wait": summarize(list(self._wait_ms)),
+                "run_time": summarize(list(self._run_ms)),
+            }
+
+
+metrics = DBExecutorMetrics()
+
+
+def configure_threadpool(size: int = DB_THREADPOOL_SIZE) -> None:
+    """Sizes the shared worker-thread limiter. Call from the app's startup event (needs the running loop)."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = size
+    logger.info(f"DB thread pool limited to {size} concurrent workers.")
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Runs blocking DB code in a worker thread so `async def` handlers never block the event loop."""
+    queued = time.perf_counter()
+    started = None
+
+    def call():
+        nonlocal started
+        started = time.perf_counter()
+        return fn(*args, **kwargs)
+
+    failed = False
+    try:
+        return await anyio.to_thread.run_sync(call)
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        finished = time.perf_counter()
+        if started is None:  # Cancelled before a worker picked it up
+            started = finished
+        metrics.record((started - queued) * 1000, (finished - started) * 1000, failed)
+
+
+def threadpool_stats() -> Dict[str, Any]:
+    """Limiter occupancy plus run_db latency (must be called from the event loop)."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        "capacity": limiter.total_tokens,
+        "in_use": stats.borrowed_tokens,
+        "waiting": stats.tasks_waiting,
+        "run_db": metrics.snapshot(),
+    }
@@ -0,0 +1,245 @@
+# backend-exp/file_storage.py
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Response, UploadFile, status
+from fastapi.responses import FileResponse
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import BASE_DIR, SessionLocal
+from .db_executor import run_db
+from .models import StoredFile
+
+logger = logging.getLogger("exp.files")
+
+# --- Configuration ---
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 25 * 1024 * 1024))  # Per file; enforced while copying
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 1024 * 1024))  # Read/hash/write unit: peak memory per upload
+UPLOAD_ORPHAN_GRACE_SECONDS = int(os.environ.get("UPLOAD_ORPHAN_GRACE_SECONDS", 24 * 3600))  # Unreferenced files kept this long
+
+# Layout: objects/<2 hex>/<2 hex>/<sha256>; partial uploads live in incoming/ until they're hashed;
+# resized image previews are cached as thumbs/<2 hex>/<sha256>_<size>.webp (see thumbnails.py);
+# the sweep moves an object to sweeping/ while it decides whether it can really go
+OBJECTS_DIR = os.path.join(UPLOAD_DIR, "objects")
+INCOMING_DIR = os.path.join(UPLOAD_DIR, "incoming")
+THUMBS_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+SWEEPING_DIR = os.path.join(UPLOAD_DIR, "sweeping")
+
+def object_path(digest: str) -> str:
+    return os.path.join(OBJECTS_DIR, digest[:2], digest[2:4], digest)
+
+def thumbnail_path(digest: str, size: str) -> str:
+    return os.path.join(THUMBS_DIR, digest[:2], f"{digest}_{size}.webp")
+
+def is_content_key(value: Optional[str]) -> bool:
+    """True for a SHA-256 hex digest (content-addressed file), False for legacy file_path values."""
+    return bool(value) and len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    sha256: str
+    size: int
+    content_type: Optional[str]
+    original_name: str
+    deduplicated: bool  # The bytes were already stored; this upload wrote nothing new
+
+
+# --- Storing ---
+def _write_chunk(out, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    out.write(chunk)
+
+def _clean_filename(filename: Optional[str]) -> str:
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    return name[:255] or "file"
+
+def _claim(digest: str, size: int, content_type: Optional[str], original_name: str) -> None:
+    """
+    Upserts the file's row with a fresh last_referenced_at and commits, before the upload decides whether
+    the bytes are already on disk. From then on the sweep's DELETE (which re-checks the cutoff) leaves it alone.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.execute(sqlite_insert(StoredFile.__table__).values(
+            sha256=digest, size=size, content_type=content_type, original_name=original_name,
+            ref_count=0, created_at=now, last_referenced_at=now,
+        ).on_conflict_do_update(index_elements=["sha256"], set_={"last_referenced_at": now}))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def store_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """
+    Copies an upload into the content-addressed store in UPLOAD_CHUNK_BYTES pieces, hashing as it goes,
+    so memory stays constant whatever the file size. Rejects the file (413) as soon as it passes max_bytes.
+    Identical content is stored once: if the digest already exists the new copy is discarded.
+    The row is claimed first (see _claim), so a concurrent sweep can't delete the bytes this upload relies on.
+    """
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    temp_path = os.path.join(INCOMING_DIR, secrets.token_hex(16))
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail=f"File is too large (max {max_bytes // (1024 * 1024)} MB).")
+                await asyncio.to_thread(_write_chunk, out, hasher, chunk)  # Disk write + hash off the event loop
+        if size == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is empty.")
+        digest = hasher.hexdigest()
+        await run_db(_claim, digest, size, file.content_type, _clean_filename(file.filename))
+        final_path = object_path(digest)
+        deduplicated = os.path.exists(final_path)
+        if deduplicated:
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)  # Atomic; a concurrent upload of the same bytes writes identical content
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    logger.info(f"Stored upload '{file.filename}' as {digest[:12]}… ({size} bytes, {'deduplicated' if deduplicated else 'new'}).")
+    return StoredUpload(digest, size, file.content_type, _clean_filename(file.filename), deduplicated)
+
+
+# --- References (call inside the transaction that stores the referencing row; these don't commit) ---
+def add_reference(db: Session, upload: StoredUpload, references: int = 1) -> None:
+    """Records the file (first upload's name/type win) and adds `references` to its ref_count."""
+    now = datetime.utcnow()
+    db.execute(sqlite_insert(StoredFile.__table__).values(
+        sha256=upload.sha256, size=upload.size, content_type=upload.content_type, original_name=upload.original_name,
+        ref_count=0, created_at=now, last_referenced_at=now,
+    ).on_conflict_do_nothing())
+    db.execute(update(StoredFile).where(StoredFile.sha256 == upload.sha256)
+               .values(ref_count=StoredFile.ref_count + references, last_referenced_at=now))
+
+def release_reference(db: Session, digest: str) -> None:
+    """Drops one reference (e.g. a deleted message); the bytes go once the sweep finds it unreferenced."""
+    db.execute(update(StoredFile).where(StoredFile.sha256 == digest, StoredFile.ref_count > 0)
+               .values(ref_count=StoredFile.ref_count - 1, last_referenced_at=datetime.utcnow()))
+
+
+# --- Serving ---
+# Content under a digest never changes, so clients may cache it for good (private: downloads need a login).
+FILE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Shown in the browser; anything else (HTML, SVG, scripts, archives, ...) is served as a download
+INLINE_CONTENT_TYPES = {
+    "image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf",
+    "video/mp4", "video/webm", "audio/mpeg", "audio/ogg", "audio/wav", "text/plain",
+}
+
+class StoredFileResponse(FileResponse):
+    """FileResponse (Range, HEAD, chunked reads from disk) whose ETag is derived from the content digest, also for If-Range."""
+
+    def __init__(self, path: str, etag: str, content_type: Optional[str], filename: str, headers: Dict[str, str]):
+        self.digest_etag = etag
+        content_type = content_type or "application/octet-stream"
+        inline = content_type in INLINE_CONTENT_TYPES
+        super().__init__(
+            path,
+            media_type=content_type if inline else "application/octet-stream",
+            filename=filename,
+            content_disposition_type="inline" if inline else "attachment",
+            headers=headers,
+        )
+
+    def _should_use_range(self, http_if_range, stat_result) -> bool:
+        return http_if_range == self.digest_etag or super()._should_use_range(http_if_range, stat_result)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def stored_file_response(stored: StoredFile, if_none_match: Optional[str] = None,
+                         cache_control: str = FILE_CACHE_CONTROL) -> Response:
+    """304 if the client already has it (If-None-Match), else the file with long-lived cache headers."""
+    etag = f'"{stored.sha256}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "X-Content-Type-Options": "nosniff"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if not os.path.isfile(object_path(stored.sha256)):
+        logger.error(f"Stored file {stored.sha256} has a row but no content on disk.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return StoredFileResponse(object_path(stored.sha256), etag, stored.content_type, stored.original_name or stored.sha256, headers)
+
+
+# --- Maintenance ---
+def sweep_unreferenced(db: Session, grace_seconds: int = UPLOAD_ORPHAN_GRACE_SECONDS) -> Dict[str, int]:
+    """Deletes files nobody has referenced for `grace_seconds`, and abandoned partial uploads. Commits."""
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    digests = [row[0] for row in db.query(StoredFile.sha256)
+               .filter(StoredFile.ref_count <= 0, StoredFile.last_referenced_at < cutoff).all()]
+    freed = removed = 0
+    os.makedirs(SWEEPING_DIR, exist_ok=True)
+    for digest in digests:
+        # Move the bytes aside first: an upload that checks for them from now on writes its own copy,
+        # and one that already found them has claimed the row, which makes the DELETE below a no-op.
+        parked = os.path.join(SWEEPING_DIR, f"{digest}.{secrets.token_hex(4)}")
+        try:
+            os.replace(object_path(digest), parked)
+        except FileNotFoundError:
+            parked = None
+        # Re-check both conditions in the DELETE itself, so a file referenced or claimed since the SELECT survives
+        deleted = db.query(StoredFile).filter(StoredFile.sha256 == digest, StoredFile.ref_count <= 0,
+                                              StoredFile.last_referenced_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        if not deleted:
+            if parked:
+                os.replace(parked, object_path(digest))  # Still wanted: put it back (same bytes if re-uploaded meanwhile)
+            continue
+        removed += 1
+        if parked:
+            freed += os.path.getsize(parked)
+            os.remove(parked)
+        for thumbnail in glob.glob(thumbnail_path(digest, "*")):  # Its cached previews go with it
+            os.remove(thumbnail)
+    partials = 0
+    if os.path.isdir(INCOMING_DIR):
+        stale_before = time.time() - grace_seconds
+        for entry in os.scandir(INCOMING_DIR):
+            if entry.is_file() and entry.stat().st_mtime < stale_before:
+                os.remove(entry.path)
+                partials += 1
+    logger.info(f"Upload sweep: removed {removed} unreferenced files ({freed} bytes) and {partials} partial uploads.")
+    return {"files_removed": removed, "bytes_freed": freed, "partial_uploads_removed": partials}
+
+def storage_stats(db: Session) -> Dict[str, Any]:
+    files, stored_bytes, references, logical_bytes = db.query(
+        func.count(StoredFile.sha256), func.coalesce(func.sum(StoredFile.size), 0),
+        func.coalesce(func.sum(StoredFile.ref_count), 0), func.coalesce(func.sum(StoredFile.size * StoredFile.ref_count), 0),
+    ).one()
+    unreferenced = db.query(func.count(StoredFile.sha256)).filter(StoredFile.ref_count <= 0).scalar()
+    return {
+        "files": files,
+        "stored_bytes": stored_bytes,
+        "references": references,
+        "referenced_bytes": logical_bytes,  # What storing every attachment separately would take
+        "unreferenced_files": unreferenced,
+        "max_upload_bytes": UPLOAD_MAX_BYTES,
+    }
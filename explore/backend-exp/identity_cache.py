@@ -0,0 +1,107 @@
+# backend-exp/identity_cache.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger("exp.identity")
+
+IDENTITY_CACHE_TTL_SECONDS = int(os.environ.get("IDENTITY_CACHE_TTL_SECONDS", 60))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get("IDENTITY_CACHE_MAX_ENTRIES", 10000))
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """
+    Lean snapshot of the logged-in user returned by the cookie auth dependencies.
+    Carries only what authorization and logging need; routes that need the full
+    profile row load it with require_user_record_from_cookie or their own query.
+    """
+    id: int
+    username: str
+    is_admin: bool
+    is_alumni: bool
+    is_student: bool
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, row) -> "UserIdentity":
+        return cls(
+            id=row.id,
+            username=row.username,
+            is_admin=bool(row.is_admin),
+            is_alumni=bool(row.is_alumni),
+            is_student=bool(row.is_student),
+            is_active=bool(row.is_active),
+        )
+
+
+class IdentityCache:
+    """Session token -> UserIdentity with a short TTL and explicit per-user invalidation."""
+
+    def __init__(self, ttl_seconds: int = IDENTITY_CACHE_TTL_SECONDS, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[UserIdentity, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _drop(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[0].id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[0].id]
+
+    def get(self, token: str) -> Optional[UserIdentity]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._drop(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, identity: UserIdentity) -> None:
+        with self._lock:
+            self._drop(token)
+            self._entries[token] = (identity, time.monotonic() + self.ttl_seconds)
+            self._tokens_by_user.setdefault(identity.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest_token = next(iter(self._entries))
+                self._drop(oldest_token)
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._drop(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops every cached identity for the user (call after changing their name, roles or status)."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._drop(token)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+            }
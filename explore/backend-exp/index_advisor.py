@@ -0,0 +1,278 @@
+# backend-exp/index_advisor.py
+"""
+EXPLAIN QUERY PLAN for the app's hot endpoint queries.
+
+Builds a throwaway database (all migrations + seed.sql), runs EXPLAIN QUERY PLAN for every
+query registered below and flags full-table scans ("SCAN <table>" with no index) and
+"USE TEMP B-TREE" sorts. Exit code 1 if anything is flagged that isn't listed as expected.
+
+Run from explore/:
+    python -m backend-exp.index_advisor                    # fresh seeded temp database
+    python -m backend-exp.index_advisor --verbose          # print every plan, not just the flagged ones
+    python -m backend-exp.index_advisor --database sqlite:////path/to/copy.db   # an existing (migrated) copy
+
+When an endpoint query changes, update its entry here so the plan that gets checked is the one that ships.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import and_, desc, func
+from sqlalchemy.orm import Query, Session
+
+from .database import create_app_engine
+from .migrate import load_seed
+from .migrations import upgrade
+from .pagination import PAGE_SIZE_DEFAULT, keyset_regions
+from .notification_feed import broadcast_visible_to
+from .chat import chat_contacts_query, chat_file_query, chat_history_query
+from .search_index import match_expression, search_query
+from .username_index import exclusions_query
+from .models import (
+    BackgroundJob, BroadcastNotification, BroadcastRead, CareerFair, DailySparkAnswer, DailySparkQuestion, Hackathon, Internship, Job,
+    Notification, Question, SearchHistory, UnverifiedJob, User,
+)
+
+SAMPLE_USER_ID = 1
+SAMPLE_CONTACT_ID = 1
+PAGE = PAGE_SIZE_DEFAULT + 1  # paginate() fetches one extra row to know whether there's a next page
+JOB_KEYS = [(Job.date_posted, True), (Job.created_at, True), (Job.id, True)]
+
+
+@dataclass
+class EndpointQuery:
+    endpoint: str
+    build: Callable[[Session], Query]
+    # Plan details that are acceptable for this query (prefix match), e.g. a sort on an aggregate
+    expected: Tuple[str, ...] = ()
+    note: str = ""
+
+
+@dataclass
+class PlanReport:
+    endpoint: str
+    sql: str
+    plan: List[str]
+    flags: List[str] = field(default_factory=list)
+    expected_flags: List[str] = field(default_factory=list)
+    note: str = ""
+
+
+REGISTRY: List[EndpointQuery] = []
+
+def endpoint_query(endpoint: str, expected: Tuple[str, ...] = (), note: str = ""):
+    """Registers a function that returns the (unexecuted) query an endpoint runs."""
+    def decorator(build):
+        REGISTRY.append(EndpointQuery(endpoint, build, expected, note))
+        return build
+    return decorator
+
+
+# --- Registered endpoint queries (mirror the handlers in exp.py / admin.py) ---
+@endpoint_query("GET /api/notifications")
+def _notifications(db):
+    return db.query(Notification).filter(Notification.user_id == SAMPLE_USER_ID)\
+        .order_by(desc(Notification.created_at)).limit(50)
+
+@endpoint_query("GET /api/notifications?only_unread=true")
+def _notifications_unread(db):
+    return db.query(Notification).filter(Notification.user_id == SAMPLE_USER_ID, Notification.is_read == False)\
+        .order_by(desc(Notification.created_at)).limit(50)
+
+@endpoint_query("GET /api/notifications (broadcasts)")
+def _notifications_broadcasts(db):
+    return db.query(BroadcastNotification, BroadcastRead.broadcast_id)\
+        .outerjoin(BroadcastRead, and_(BroadcastRead.user_id == SAMPLE_USER_ID, BroadcastRead.broadcast_id == BroadcastNotification.id))\
+        .filter(broadcast_visible_to(SAMPLE_USER_ID))\
+        .order_by(desc(BroadcastNotification.created_at), desc(BroadcastNotification.id)).limit(50)
+
+@endpoint_query("GET /api/chat/{contact_id}")
+def _chat_messages(db):
+    return chat_history_query(db, SAMPLE_CONTACT_ID)
+
+@endpoint_query("GET /api/chat/{contact_id}?before_id=...")
+def _chat_messages_before(db):
+    return chat_history_query(db, SAMPLE_CONTACT_ID, before_id=100)
+
+@endpoint_query("GET /api/chat/{contact_id}?after_id=...")
+def _chat_messages_after(db):
+    return chat_history_query(db, SAMPLE_CONTACT_ID, after_id=100)
+
+@endpoint_query("GET /api/chat/{contact_id}/files/{digest}")
+def _chat_file(db):
+    return chat_file_query(db, SAMPLE_CONTACT_ID, "0" * 64)
+
+@endpoint_query("GET /api/chat/my-contacts", expected=("USE TEMP B-TREE FOR ORDER BY",),
+                note="sorted by last activity (newest message per contact); a user's chat count is small")
+def _my_chat_contacts(db):
+    return chat_contacts_query(db, SAMPLE_USER_ID)
+
+@endpoint_query("GET /api/search?term=...", note="FTS5 MATCH; ordered by bm25 over the matching rows only")
+def _search(db):
+    return search_query(db, match_expression("python dev"))
+
+@endpoint_query("GET /api/users/searchable (exclusion set, on cache miss)")
+def _connection_exclusions(db):
+    return exclusions_query(db, SAMPLE_USER_ID)
+
+@endpoint_query("GET /api/search-history")
+def _search_history(db):
+    return db.query(SearchHistory).filter(SearchHistory.user_id == SAMPLE_USER_ID)\
+        .order_by(desc(SearchHistory.timestamp)).limit(50)
+
+@endpoint_query("GET /api/leaderboard")
+def _leaderboard(db):
+    return db.query(User).filter(User.is_alumni == True)\
+        .order_by(User.activity_score.desc(), User.alumni_gems.desc()).limit(100)
+
+@endpoint_query("GET /api/alumni/top-liked")
+def _top_liked_alumni(db):
+    return db.query(User).filter(User.is_alumni == True).order_by(desc(User.likes)).limit(25)
+
+@endpoint_query("GET /api/alumni")
+def _all_alumni(db):
+    return db.query(User).filter(User.is_alumni == True).order_by(User.username.asc(), User.id.asc()).limit(PAGE)
+
+@endpoint_query("GET /api/users/{username}/questions")
+def _user_questions(db):
+    return db.query(Question).filter(Question.user_id == SAMPLE_USER_ID)\
+        .order_by(desc(Question.created_at), desc(Question.id)).limit(PAGE)
+
+@endpoint_query("GET /api/questions/popular")
+def _popular_questions(db):
+    return db.query(Question).order_by(desc(Question.likes)).limit(10)
+
+@endpoint_query("GET /api/expertqa/selected-questions")
+def _top_liked_questions(db):
+    return db.query(Question).order_by(desc(Question.likes), desc(Question.created_at)).limit(5)
+
+@endpoint_query("GET /api/jobs")
+def _jobs(db):
+    return db.query(Job).order_by(desc(Job.date_posted), desc(Job.created_at), desc(Job.id)).limit(PAGE)
+
+@endpoint_query("GET /api/jobs?cursor=... (later pages)")
+def _jobs_next_page(db):
+    # First keyset region of a page that starts mid-list; it must seek, not scan from the top
+    region = keyset_regions(JOB_KEYS, ["2024-01-01", None, 100])[0]
+    return db.query(Job).filter(region).order_by(desc(Job.date_posted), desc(Job.created_at), desc(Job.id)).limit(PAGE)
+
+@endpoint_query("GET /api/hackathons?upcoming_only=true")
+def _hackathons_upcoming(db):
+    today = date.today()
+    return db.query(Hackathon).filter(Hackathon.start_date != None, Hackathon.start_date >= today)\
+        .order_by(Hackathon.start_date.asc(), Hackathon.id.asc()).limit(PAGE)
+
+@endpoint_query("GET /api/career_fairs?upcoming_only=true")
+def _career_fairs_upcoming(db):
+    return db.query(CareerFair).filter(CareerFair.start_date >= date.today())\
+        .order_by(CareerFair.start_date.asc(), CareerFair.id.asc()).limit(PAGE)
+
+@endpoint_query("GET /api/internships?upcoming_only=true", expected=("SCAN internships", "USE TEMP B-TREE FOR ORDER BY"),
+                note="OR across start_date/end_date matches most rows, so a scan + sort beats three index lookups")
+def _internships_upcoming(db):
+    today = date.today()
+    return db.query(Internship)\
+        .filter((Internship.start_date >= today) | (Internship.end_date == None) | (Internship.end_date >= today))\
+        .order_by(Internship.start_date.asc(), Internship.id.asc()).limit(PAGE)
+
+@endpoint_query("GET /api/daily-spark/top-liked", expected=("SCAN daily_spark_questions", "USE TEMP B-TREE FOR ORDER BY"),
+                note="orders by an aggregate (sum of votes), which no index can provide")
+def _daily_spark_top_liked(db):
+    return db.query(DailySparkQuestion, func.sum(DailySparkAnswer.votes).label("total_votes"))\
+        .outerjoin(DailySparkAnswer, DailySparkQuestion.id == DailySparkAnswer.question_id)\
+        .group_by(DailySparkQuestion.id).order_by(desc("total_votes")).limit(5)
+
+@endpoint_query("GET /api/admin/users")
+def _admin_users(db):
+    return db.query(User).filter(User.is_active == True).order_by(User.username.asc(), User.id.asc()).limit(PAGE)
+
+@endpoint_query("task queue: claim next due job")
+def _task_queue_claim(db):
+    return db.query(BackgroundJob.id).filter(BackgroundJob.status == "pending", BackgroundJob.run_after <= datetime(2030, 1, 1))\
+        .order_by(BackgroundJob.run_after, BackgroundJob.id).limit(1)
+
+@endpoint_query("GET /api/admin/unverified-items?type=job")
+def _admin_unverified(db):
+    return db.query(UnverifiedJob).filter(UnverifiedJob.status == "pending")\
+        .order_by(desc(UnverifiedJob.submitted_at), desc(UnverifiedJob.id)).limit(PAGE)
+
+
+# --- Plan analysis ---
+def flag_plan(plan: List[str]) -> List[str]:
+    """Full-table scans (SCAN without USING ... INDEX) and temp B-tree sorts/groupings."""
+    flags = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and " INDEX " not in f"{detail} ":
+            flags.append(detail)
+        elif detail.startswith("USE TEMP B-TREE"):
+            flags.append(detail)
+    return flags
+
+def explain(conn, query: Query) -> Tuple[str, List[str]]:
+    # Literal binds so the plan is for concrete values (and the SQL can be pasted into sqlite3)
+    sql = str(query.statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return sql, [row[3] for row in rows]
+
+def analyze(bind) -> List[PlanReport]:
+    reports = []
+    with Session(bind=bind) as db, bind.connect() as conn:
+        for entry in REGISTRY:
+            sql, plan = explain(conn, entry.build(db))
+            report = PlanReport(entry.endpoint, sql, plan, note=entry.note)
+            for flag in flag_plan(plan):
+                if any(flag.startswith(allowed) for allowed in entry.expected):
+                    report.expected_flags.append(flag)
+                else:
+                    report.flags.append(flag)
+            reports.append(report)
+    return reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend-exp.index_advisor",
+                                     description="Flag full scans and temp B-tree sorts in endpoint query plans.")
+    parser.add_argument("--database", default=None, help="database URL to inspect (default: fresh seeded temp database)")
+    parser.add_argument("--verbose", action="store_true", help="print the SQL and plan for every query")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    url = args.database
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="index-advisor-")
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'advisor.db')}"
+    bind = create_app_engine(url, profile="default")
+    try:
+        if tmpdir is not None:
+            upgrade(bind)
+            load_seed(bind)
+        reports = analyze(bind)
+    finally:
+        bind.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    flagged = 0
+    for report in reports:
+        status = "FLAG" if report.flags else "ok"
+        print(f"[{status:>4}] {report.endpoint}")
+        if report.flags or args.verbose:
+            if args.verbose:
+                print(f"         {report.sql}".replace("\n", " "))
+                if report.note:
+                    print(f"         note: {report.note}")
+            for detail in report.plan:
+                marker = "!!" if detail in report.flags else ("~" if detail in report.expected_flags else " ")
+                print(f"      {marker:>2} {detail}")
+        flagged += bool(report.flags)
+    print(f"{len(reports)} queries checked, {flagged} flagged.")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
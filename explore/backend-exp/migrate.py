@@ -0,0 +1,105 @@
+# backend-exp/migrate.py
+"""
+Schema migration CLI.
+
+Run from explore/ (the backend directory isn't an importable name on its own):
+    python -m backend-exp.migrate status
+    python -m backend-exp.migrate upgrade [--to VERSION]
+    python -m backend-exp.migrate verify      # exit code 1 if the database doesn't match the models
+    python -m backend-exp.migrate seed        # load seed.sql sample data into a fresh database
+    python -m backend-exp.migrate rebuild-search   # repopulate the full-text search index from its tables
+
+Set DATABASE_URL to target a database other than backend-exp/explore.db.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from .database import DATABASE_URL, engine
+from .migrations import LATEST_VERSION, MIGRATIONS, applied_migrations, current_version, upgrade, verify
+from . import search_index
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed.sql")
+
+
+def cmd_status(args) -> int:
+    applied = {row["version"]: row for row in applied_migrations()}
+    print(f"Database: {DATABASE_URL}")
+    print(f"Version:  {current_version()} (latest {LATEST_VERSION})")
+    for migration in MIGRATIONS:
+        row = applied.get(migration.version)
+        state = f"applied {row['applied_at']}" if row else "pending"
+        print(f"  {migration.version:04d}_{migration.name:<30} {state}")
+    return 0
+
+
+def cmd_upgrade(args) -> int:
+    applied = upgrade(target=args.to)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Nothing to apply.")
+    print(f"Schema version: {current_version()}")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    problems = verify()
+    if not problems:
+        print(f"OK: schema at version {LATEST_VERSION} and matches the models.")
+        return 0
+    for problem in problems:
+        print(f"  - {problem}")
+    return 1
+
+
+def load_seed(bind=None) -> None:
+    """Runs seed.sql against the database (sqlite3 executescript, so the file stays plain SQL)."""
+    with open(SEED_FILE, encoding="utf-8") as f:
+        script = f.read()
+    raw = (bind or engine).raw_connection()
+    try:
+        raw.executescript(script)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cmd_seed(args) -> int:
+    if current_version() < LATEST_VERSION:
+        print("Run `upgrade` before seeding.")
+        return 1
+    load_seed()
+    print(f"Loaded {os.path.basename(SEED_FILE)} into {DATABASE_URL}")
+    return 0
+
+
+def cmd_rebuild_search(args) -> int:
+    if current_version() < LATEST_VERSION:
+        print("Run `upgrade` before rebuilding the search index.")
+        return 1
+    with engine.begin() as conn:
+        indexed = search_index.rebuild(conn)
+    print(f"Search index rebuilt: {indexed} rows.")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend-exp.migrate", description="Apply or verify schema migrations.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show applied and pending migrations").set_defaults(func=cmd_status)
+    up = sub.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", type=int, default=None, help="stop at this version (default: latest)")
+    up.set_defaults(func=cmd_upgrade)
+    sub.add_parser("verify", help="check the version and that every model table/column exists").set_defaults(func=cmd_verify)
+    sub.add_parser("seed", help="load seed.sql sample data").set_defaults(func=cmd_seed)
+    sub.add_parser("rebuild-search", help="repopulate the full-text search index").set_defaults(func=cmd_rebuild_search)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
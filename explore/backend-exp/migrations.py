@@ -0,0 +1,327 @@
+# backend-exp/migrations.py
+
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base, DATABASE_URL, engine as default_engine
+from . import models  # noqa: F401  (registers every table on Base.metadata)
+from . import search_index
+
+logger = logging.getLogger("exp.migrations")
+
+# Apply pending migrations at boot. On by default for the SQLite dev database; for anything else
+# (DB_AUTO_MIGRATE=0) startup refuses to run on an outdated schema and the CLI applies migrations.
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "1" if DATABASE_URL.startswith("sqlite") else "0") == "1"
+
+# How long a worker waits for another one's migration step to finish (each step holds the write lock)
+DB_MIGRATION_LOCK_TIMEOUT_SECONDS = int(os.environ.get("DB_MIGRATION_LOCK_TIMEOUT_SECONDS", 300))
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+# --- Helpers for migration scripts ---
+def create_tables(conn: Connection, table_names: List[str]) -> None:
+    """Creates the given model tables (and their declared indexes) if they don't exist yet."""
+    tables = [Base.metadata.tables[name] for name in table_names]
+    Base.metadata.create_all(bind=conn, tables=tables, checkfirst=True)
+
+def add_missing_columns(conn: Connection, table_names: List[str]) -> None:
+    """
+    ALTER TABLE ... ADD COLUMN for model columns an older database doesn't have
+    (e.g. databases built from the old hand-written schema.sql).
+    """
+    inspector = inspect(conn)
+    for name in table_names:
+        table = Base.metadata.tables[name]
+        existing = {col["name"] for col in inspector.get_columns(name)}
+        for column in table.columns:
+            if column.name in existing or column.primary_key:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            ddl = f'ALTER TABLE {name} ADD COLUMN "{column.name}" {column_type}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if column.server_default is not None and isinstance(column.server_default.arg, str):
+                ddl += " DEFAULT '" + column.server_default.arg.replace("'", "''") + "'"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            elif isinstance(default, bool):
+                ddl += f" DEFAULT {int(default)}"
+            elif isinstance(default, (int, float)):
+                ddl += f" DEFAULT {default}"
+            elif isinstance(default, str):
+                ddl += " DEFAULT '" + default.replace("'", "''") + "'"
+            logger.info(f"Adding missing column {name}.{column.name}")
+            conn.exec_driver_sql(ddl)
+
+def create_indexes(conn: Connection, index_names: List[str]) -> None:
+    """Creates model-declared indexes (looked up by name) that the database doesn't have yet."""
+    declared = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    for name in index_names:
+        declared[name].create(bind=conn, checkfirst=True)
+
+# --- Migration scripts (append only; never edit one that has shipped) ---
+# The baseline builds missing tables from the *current* models, so later scripts must be
+# idempotent (IF NOT EXISTS / add_missing_columns) to work on both fresh and existing databases.
+BASELINE_TABLES = [
+    "users", "user_connections", "career_fairs", "internships", "hackathons", "questions",
+    "chat_contacts", "chat_messages", "daily_spark_questions", "daily_spark_answers", "jobs",
+    "search_history", "features", "notifications", "applied_hackathons", "user_issues",
+    "alumni_likes", "expert_qa_answers", "unverified_jobs", "unverified_internships",
+    "unverified_career_fairs", "unverified_hackathons", "question_likes",
+]
+
+def _0001_baseline(conn: Connection) -> None:
+    # Tables as of the move off schema.sql, plus any columns an older database is missing
+    create_tables(conn, BASELINE_TABLES)
+    add_missing_columns(conn, BASELINE_TABLES)
+    # Indexes that only ever existed in schema.sql
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+        "CREATE INDEX IF NOT EXISTS idx_users_name ON users (username)",
+        "CREATE INDEX IF NOT EXISTS idx_questions_user_id ON questions (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_chat_messages_contact_id ON chat_messages (contact_id)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_spark_posted_date ON daily_spark_questions (posted_date)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_spark_answers_question_id ON daily_spark_answers (question_id)",
+        "CREATE INDEX IF NOT EXISTS idx_search_history_user_id ON search_history (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_applied_hackathons_user_id ON applied_hackathons (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_applied_hackathons_hackathon_id ON applied_hackathons (hackathon_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_issues_user_id ON user_issues (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_expert_qa_answers_question ON expert_qa_answers (question_id)",
+        "CREATE INDEX IF NOT EXISTS idx_expert_qa_answers_user ON expert_qa_answers (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_question_likes_user ON question_likes (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_question_likes_question ON question_likes (question_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_connections_receiver_status ON user_connections (receiver_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_user_connections_requester_status ON user_connections (requester_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_user_connections_status ON user_connections (status)",
+    ):
+        conn.exec_driver_sql(ddl)
+    for table in ("unverified_jobs", "unverified_internships", "unverified_career_fairs", "unverified_hackathons"):
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table} (status)")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_{table}_submitter ON {table} (submitted_by_user_id)")
+
+def _0002_user_sessions(conn: Connection) -> None:
+    create_tables(conn, ["user_sessions"])
+
+# Composite/partial indexes for the hot list queries (see index_advisor.py). Each single-column
+# index below is a prefix of one of the new composites, so it's dropped rather than maintained twice.
+INDEX_PACK = [
+    "ix_users_alumni_score_gems", "ix_users_alumni_likes", "ix_users_alumni_username", "ix_users_active_username",
+    "ix_notifications_user_created", "ix_notifications_user_read_created",
+    "ix_chat_messages_contact_timestamp", "ix_search_history_user_timestamp",
+    "ix_questions_likes_created", "ix_questions_user_created", "ix_jobs_date_posted_created",
+    "ix_hackathons_start_date", "ix_career_fairs_start_date", "idx_daily_spark_answers_question_id",
+    "ix_unverified_jobs_status_submitted", "ix_unverified_internships_status_submitted",
+    "ix_unverified_career_fairs_status_submitted", "ix_unverified_hackathons_status_submitted",
+]
+SUPERSEDED_INDEXES = [
+    "idx_notifications_user_id", "idx_chat_messages_contact_id", "idx_search_history_user_id", "idx_questions_user_id",
+]
+
+def _0003_index_pack(conn: Connection) -> None:
+    create_indexes(conn, INDEX_PACK)
+    for name in SUPERSEDED_INDEXES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+def _0004_broadcast_notifications(conn: Connection) -> None:
+    # Announcements stored once and merged per user at read time, with per-user read watermarks
+    create_tables(conn, ["broadcast_notifications", "notification_watermarks", "broadcast_reads"])
+
+def _0005_background_jobs(conn: Connection) -> None:
+    # Durable queue for post-commit side effects (task_queue.py)
+    create_tables(conn, ["background_jobs"])
+
+def _0006_chat_participants(conn: Connection) -> None:
+    # Participants as rows instead of encoded in chat_contacts.name; backfilled from the existing 1-on-1 names
+    create_tables(conn, ["chat_participants"])
+    user_ids = {row[0] for row in conn.exec_driver_sql("SELECT id FROM users")}
+    rows = []
+    for contact_id, name, created_at in conn.exec_driver_sql(
+            "SELECT id, name, created_at FROM chat_contacts WHERE name LIKE 'chat_users\\_%' ESCAPE '\\'"):
+        parts = name.split("_")
+        try:
+            pair = {int(parts[2]), int(parts[3])} if len(parts) == 4 else set()
+        except ValueError:
+            pair = set()
+        if len(pair) != 2 or not pair <= user_ids:
+            logger.warning(f"Skipping chat contact {contact_id} ('{name}'): not a 1-on-1 chat between existing users")
+            continue
+        rows.extend((contact_id, user_id, created_at) for user_id in sorted(pair))
+    if rows:
+        conn.exec_driver_sql("INSERT OR IGNORE INTO chat_participants (contact_id, user_id, joined_at) VALUES (?, ?, ?)", rows)
+    logger.info(f"Backfilled {len(rows)} chat participants.")
+
+def _0007_chat_history_cursor_index(conn: Connection) -> None:
+    # Chat history is paged by message id within a contact (before_id / after_id)
+    create_indexes(conn, ["ix_chat_messages_contact_id"])
+
+def _0008_stored_files(conn: Connection) -> None:
+    # Content-addressed upload metadata with reference counts (file_storage.py)
+    create_tables(conn, ["stored_files"])
+
+def _0009_chat_file_index(conn: Connection) -> None:
+    # Download access check: is this file posted in this chat? (partial: only messages with files)
+    create_indexes(conn, ["ix_chat_messages_file_path"])
+
+def _0010_search_index(conn: Connection) -> None:
+    # FTS5 index behind /api/search, kept in sync by triggers; filled from the existing rows
+    search_index.install(conn)
+    search_index.rebuild(conn)
+
+def _0011_shared_otp_store(conn: Connection) -> None:
+    # Password-reset OTPs and issue throttles shared by every worker (otp_store.SQLOTPStore)
+    create_tables(conn, ["password_reset_otps", "otp_issue_throttles"])
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _0001_baseline),
+    Migration(2, "user_sessions", _0002_user_sessions),
+    Migration(3, "index_pack", _0003_index_pack),
+    Migration(4, "broadcast_notifications", _0004_broadcast_notifications),
+    Migration(5, "background_jobs", _0005_background_jobs),
+    Migration(6, "chat_participants", _0006_chat_participants),
+    Migration(7, "chat_history_cursor_index", _0007_chat_history_cursor_index),
+    Migration(8, "stored_files", _0008_stored_files),
+    Migration(9, "chat_file_index", _0009_chat_file_index),
+    Migration(10, "search_index", _0010_search_index),
+    Migration(11, "shared_otp_store", _0011_shared_otp_store),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# --- Version bookkeeping ---
+def _ensure_version_table(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TEXT NOT NULL)"
+    )
+
+def current_version(bind: Optional[Engine] = None) -> int:
+    """Highest applied migration, 0 for a database that has never been migrated."""
+    bind = bind or default_engine
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+            return 0
+        return conn.exec_driver_sql(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}").scalar()
+
+def applied_migrations(bind: Optional[Engine] = None) -> List[Dict]:
+    bind = bind or default_engine
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+            return []
+        rows = conn.exec_driver_sql(f"SELECT version, name, applied_at FROM {SCHEMA_VERSION_TABLE} ORDER BY version")
+        return [dict(row._mapping) for row in rows]
+
+@contextmanager
+def _write_locked(bind: Engine) -> Iterator[Connection]:
+    """
+    A transaction that holds the database write lock from its first statement (BEGIN IMMEDIATE on SQLite),
+    so workers migrating the same database at startup take turns instead of racing.
+    """
+    with bind.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            with conn.begin():
+                yield conn
+            return
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {DB_MIGRATION_LOCK_TIMEOUT_SECONDS * 1000}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+
+def upgrade(bind: Optional[Engine] = None, target: Optional[int] = None) -> List[int]:
+    """
+    Applies pending migrations up to target (default: latest), each in its own transaction.
+    Safe to run from several processes at once: each step takes the write lock and re-reads the
+    version inside it, so a step another process has just applied is skipped, not applied twice.
+    """
+    bind = bind or default_engine
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    start = current_version(bind)
+    for migration in MIGRATIONS:
+        if migration.version <= start or migration.version > target:
+            continue
+        with _write_locked(bind) as conn:
+            _ensure_version_table(conn)
+            version = conn.exec_driver_sql(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}").scalar()
+            if version >= migration.version:
+                logger.info(f"Migration {migration.version:04d}_{migration.name} was applied by another process.")
+                continue
+            logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+            migration.upgrade(conn)
+            conn.exec_driver_sql(
+                f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.utcnow().isoformat()),
+            )
+        applied.append(migration.version)
+    return applied
+
+def verify(bind: Optional[Engine] = None) -> List[str]:
+    """Returns a list of problems: pending migrations, and model tables/columns missing from the database."""
+    bind = bind or default_engine
+    problems = []
+    version = current_version(bind)
+    if version < LATEST_VERSION:
+        problems.append(f"schema_version is {version}, latest migration is {LATEST_VERSION}")
+    elif version > LATEST_VERSION:
+        problems.append(f"schema_version {version} is newer than this code ({LATEST_VERSION})")
+    with bind.connect() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for name, table in Base.metadata.tables.items():
+            if name not in existing_tables:
+                problems.append(f"missing table {name}")
+                continue
+            existing_columns = {col["name"] for col in inspector.get_columns(name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    problems.append(f"missing column {name}.{column.name}")
+        if version >= 10 and search_index.SEARCH_TABLE not in existing_tables:
+            problems.append(f"missing full-text table {search_index.SEARCH_TABLE}")
+    return problems
+
+
+# --- Startup hook ---
+def check_schema_version() -> int:
+    """
+    Called from startup: one read of schema_version instead of reflecting every table.
+    Applies pending migrations when DB_AUTO_MIGRATE is on; otherwise raises, so the app never
+    serves requests (or runs task workers) against tables that don't exist yet.
+    """
+    version = current_version()
+    if version == LATEST_VERSION:
+        logger.info(f"Database schema is at version {version}.")
+    elif version < LATEST_VERSION and DB_AUTO_MIGRATE:
+        applied = upgrade() # Serialized with any other worker doing the same
+        logger.info(f"Applied migrations {applied}; schema now at version {LATEST_VERSION}.")
+        version = LATEST_VERSION
+    elif version < LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version} but the code expects {LATEST_VERSION}. "
+            f"Run `python -m backend-exp.migrate upgrade` from explore/ (or start with DB_AUTO_MIGRATE=1)."
+        )
+    else:
+        raise RuntimeError(f"Database schema version {version} is newer than this code ({LATEST_VERSION}).")
+    return version
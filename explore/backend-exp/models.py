@@ -9,7 +9,8 @@ logger = logging.getLogger(__name__)
 from sqlalchemy import (
     create_engine, Column, Integer, Boolean, String, Date, Text, DateTime,
     func, ForeignKey, desc, Table, CheckConstraint, UniqueConstraint,
-    and_, or_, not_  # <<< ADD THESE HERE
+    and_, or_, not_,  # <<< ADD THESE HERE
+    Index, text
 )
 from sqlalchemy import (
     create_engine, Column, Integer, Boolean, String, Date, Text, DateTime,
@@ -18,23 +19,11 @@ from sqlalchemy import (
 from sqlalchemy.orm import sessionmaker, Session, relationship, declarative_base, selectinload
 from pydantic import EmailStr,BaseModel,ConfigDict,computed_field,field_validator
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'explore.db')}"
-
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Engine, session factory, Base and get_db live in database.py (re-exported here for existing imports)
+from .database import BASE_DIR, DATABASE_URL, engine, SessionLocal, Base, get_db
 
 # --- Database Models (Define ALL before Pydantic Schemas) ---
 
-def get_db():
-    """Dependency to get a DB session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -68,6 +57,14 @@ class User(Base):
     notifications = relationship("Notification", back_populates="user")
     applied_hackathons = relationship("AppliedHackathon", back_populates="user")
     search_history = relationship("SearchHistory", back_populates="user") # Add relationship
+    __table_args__ = (
+        # Leaderboard (alumni by score, gems) and top-liked / A-Z alumni lists
+        Index('ix_users_alumni_score_gems', 'is_alumni', 'activity_score', 'alumni_gems'),
+        Index('ix_users_alumni_likes', 'is_alumni', 'likes'),
+        Index('ix_users_alumni_username', 'is_alumni', 'username'),
+        # Partial: admin user list skips deactivated accounts by default
+        Index('ix_users_active_username', 'username', sqlite_where=text('is_active = 1')),
+    )
     # In class User(Base):
     sent_connection_requests = relationship(
     "UserConnection",
@@ -114,6 +111,7 @@ class CareerFair(Base):
     url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (Index('ix_career_fairs_start_date', 'start_date'),)
 
 class Internship(Base):
     __tablename__ = "internships"
@@ -140,6 +138,7 @@ class Hackathon(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     applications = relationship("AppliedHackathon", back_populates="hackathon")
+    __table_args__ = (Index('ix_hackathons_start_date', 'start_date'),)
 
 class Question(Base):
     __tablename__ = "questions"
@@ -151,6 +150,10 @@ class Question(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     expert_answers = relationship("ExpertQAAnswer", back_populates="question", cascade="all, delete-orphan")
     user = relationship("User", back_populates="questions")
+    __table_args__ = (
+        Index('ix_questions_likes_created', 'likes', 'created_at'),  # Popular / top-liked questions
+        Index('ix_questions_user_created', 'user_id', 'created_at'),  # A user's questions, newest first
+    )
 class ChatContact(Base):
     __tablename__ = "chat_contacts"
     id = Column(Integer, primary_key=True, index=True)
@@ -169,6 +172,34 @@ class ChatMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     contact = relationship("ChatContact", back_populates="messages")
+    __table_args__ = (
+        Index('ix_chat_messages_contact_timestamp', 'contact_id', 'timestamp'),
+        Index('ix_chat_messages_contact_id', 'contact_id', 'id'),  # History cursors (before_id / after_id)
+        Index('ix_chat_messages_file_path', 'file_path', 'contact_id', sqlite_where=file_path.isnot(None)),  # File download access check
+    )
+
+class StoredFile(Base):
+    """
+    One uploaded file's bytes, stored once under uploads/objects/ by SHA-256 (file_storage.py).
+    ChatMessage.file_path holds the digest; ref_count is the number of messages pointing at it.
+    """
+    __tablename__ = "stored_files"
+    sha256 = Column(String(64), primary_key=True) # Hex digest = storage key
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True) # As declared by the first uploader
+    original_name = Column(String, nullable=True) # First upload's filename
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_referenced_at = Column(DateTime, default=datetime.utcnow) # Unreferenced files are swept after a grace period
+    __table_args__ = (Index('ix_stored_files_refs_last_referenced', 'ref_count', 'last_referenced_at'),)
+
+class ChatParticipant(Base):
+    """Who takes part in a chat contact (two rows for a 1-on-1 chat); replaces parsing chat_users_<a>_<b> names."""
+    __tablename__ = "chat_participants"
+    contact_id = Column(Integer, ForeignKey("chat_contacts.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (Index('ix_chat_participants_user_contact', 'user_id', 'contact_id'),)  # "my chats"; the PK serves lookups by contact
 
 class DailySparkQuestion(Base):
     __tablename__ = "daily_spark_questions"
@@ -207,6 +238,7 @@ class DailySparkAnswer(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     question = relationship("DailySparkQuestion", back_populates="answers")
+    __table_args__ = (Index('idx_daily_spark_answers_question_id', 'question_id'),)  # Same name schema.sql used
 
 class Job(Base):
     __tablename__ = "jobs"
@@ -226,6 +258,7 @@ class Job(Base):
     url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (Index('ix_jobs_date_posted_created', 'date_posted', 'created_at'),)  # Newest-first job list
 
 class SearchHistory(Base):
     __tablename__ = "search_history"
@@ -234,6 +267,7 @@ class SearchHistory(Base):
     search_term = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="search_history") # Add back_populates
+    __table_args__ = (Index('ix_search_history_user_timestamp', 'user_id', 'timestamp'),)
 
 class Feature(Base):
     __tablename__ = "features"
@@ -256,6 +290,33 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user = relationship("User", back_populates="notifications")
+    __table_args__ = (
+        # All notifications / unread only, newest first
+        Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
+
+class BroadcastNotification(Base):
+    """One row per announcement every non-admin user sees (new job, internship, ...), merged in at read time."""
+    __tablename__ = "broadcast_notifications"
+    id = Column(Integer, primary_key=True)
+    message = Column(Text, nullable=False)
+    type = Column(String, nullable=False) # e.g., 'new_job', 'new_hackathon'
+    related_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class NotificationWatermark(Base):
+    """Per-user read position in broadcast_notifications: every broadcast with id <= last_read_broadcast_id is read."""
+    __tablename__ = "notification_watermarks"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_read_broadcast_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BroadcastRead(Base):
+    """Broadcasts read out of order (above the user's watermark); folded into the watermark once contiguous."""
+    __tablename__ = "broadcast_reads"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcast_notifications.id", ondelete="CASCADE"), primary_key=True)
 
 class AppliedHackathon(Base):
     __tablename__ = "applied_hackathons"
@@ -554,8 +615,8 @@ class ChatContactInfo(BaseModel): # Pydantic model for the new endpoint's respon
     contact_id: int
     other_user_username: str
     other_user_id: int # Good to have for frontend if needed
-    # last_message_preview: Optional[str] = None # Optional
-    # last_message_timestamp: Optional[datetime] = None # Optional
+    last_message_preview: Optional[str] = None
+    last_message_timestamp: Optional[datetime] = None
     # unread_count: int = 0 # Optional
 
     model_config = ConfigDict(from_attributes=True)
@@ -604,7 +665,7 @@ class FeatureOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 class NotificationOut(BaseModel):
-    id: int
+    id: int # Negative for broadcast notifications (see notification_feed.py)
     message: str
     type: str
     related_id: Optional[int] = None
@@ -763,6 +824,7 @@ class UnverifiedJob(Base):
 
     # Relationship to the user who submitted it
     submitter = relationship("User")
+    __table_args__ = (Index('ix_unverified_jobs_status_submitted', 'status', 'submitted_at'),)  # Admin pending queue, newest first
 
 class UnverifiedInternship(Base):
     __tablename__ = "unverified_internships"
@@ -780,6 +842,7 @@ class UnverifiedInternship(Base):
     url = Column(String, nullable=True)
 
     submitter = relationship("User")
+    __table_args__ = (Index('ix_unverified_internships_status_submitted', 'status', 'submitted_at'),)
 
 class UnverifiedCareerFair(Base):
     __tablename__ = "unverified_career_fairs"
@@ -796,6 +859,7 @@ class UnverifiedCareerFair(Base):
     url = Column(String, nullable=True)
 
     submitter = relationship("User")
+    __table_args__ = (Index('ix_unverified_career_fairs_status_submitted', 'status', 'submitted_at'),)
 
 class UnverifiedHackathon(Base):
     __tablename__ = "unverified_hackathons"
@@ -814,6 +878,7 @@ class UnverifiedHackathon(Base):
     url = Column(String, nullable=True)
 
     submitter = relationship("User")
+    __table_args__ = (Index('ix_unverified_hackathons_status_submitted', 'status', 'submitted_at'),)
 
 # --- Add near other SQLAlchemy model definitions ---
 
@@ -833,9 +898,53 @@ class QuestionLike(Base):
     # Unique constraint
     __table_args__ = (UniqueConstraint('user_id', 'question_id', name='uq_user_question_like'),)
 
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+    token = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True) # Swept by session_store once passed
+
+class PasswordResetOTP(Base):
+    """The live password-reset OTP per email (otp_store.SQLOTPStore), shared by every worker."""
+    __tablename__ = "password_reset_otps"
+    email = Column(String, primary_key=True)
+    otp = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True) # Also identifies this issue of the OTP (guards updates)
+    failed_attempts = Column(Integer, nullable=False, default=0)
+    verified = Column(Boolean, nullable=False, default=False)
+
+class OTPIssueThrottle(Base):
+    """Per-email OTP issue window (cooldown and max issues per window), shared by every worker."""
+    __tablename__ = "otp_issue_throttles"
+    email = Column(String, primary_key=True)
+    window_start = Column(DateTime, nullable=False, index=True) # Swept once the window has ended
+    issued = Column(Integer, nullable=False, default=0)
+    last_issued = Column(DateTime, nullable=True)
+
+class BackgroundJob(Base):
+    """Durable work item for task_queue.py (post-commit side effects: emails, announcements, ...)."""
+    __tablename__ = "background_jobs"
+    id = Column(Integer, primary_key=True)
+    task = Column(String, nullable=False) # Registered task name
+    payload = Column(Text, nullable=False, default='{}') # JSON
+    idempotency_key = Column(String, nullable=True, unique=True) # Enqueueing the same key again is a no-op
+    status = Column(String, nullable=False, default='pending') # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow) # Not claimed before this (retry backoff)
+    locked_at = Column(DateTime, nullable=True) # When a worker claimed it
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        # Claim query (next due pending job) and the done/failed pruning
+        Index('ix_background_jobs_status_run_after', 'status', 'run_after'),
+    )
+
 # --- Remember to create this table in your DB ---
-# --- IMPORTANT: Ensure this table is created in your database ---
-# (Run Base.metadata.create_all or use Alembic)
+# --- IMPORTANT: New tables/columns need a migration in migrations.py ---
 
 # --- Add these NEW Pydantic response models ---
 
@@ -945,9 +1054,8 @@ class UserActivityUpdate(BaseModel): # For activating/deactivating
 # ... (rest of the rebuilds) ...
 
 # --- IMPORTANT ---
-# Make sure Base.metadata.create_all(bind=engine) is called somewhere
-# AFTER these definitions are processed so the tables get created in your DB.
-# If you use Alembic, create migrations for these new tables.
+# Tables are created/altered by the versioned migrations in migrations.py
+# (`python -m backend-exp.migrate upgrade`), not at app startup.
 
 # (Keep other Pydantic models: UserBase, UserCreate, UserUpdate, UserResponse, AlumniResponse, Hackathon*, Internship*, CareerFair*, Chat*, Search*, Feature*, Notification*, Issue*, Password*)
 
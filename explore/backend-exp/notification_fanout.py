@@ -0,0 +1,134 @@
+# backend-exp/notification_fanout.py
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, String, Text, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import BroadcastNotification, CareerFair, Hackathon, Internship, Job, Notification, User
+from .notification_feed import publish_broadcast
+from .notification_stream import nudge_users
+from .task_queue import background_task, enqueue
+
+logger = logging.getLogger("exp.notifications")
+
+# --- Configuration ---
+# Recipients written per transaction. Each chunk is one INSERT ... SELECT, so the SQLite write lock is
+# held for one chunk at a time and other writers (logins, likes, chat) get in between chunks.
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.environ.get("NOTIFICATION_FANOUT_CHUNK_SIZE", 2000))
+
+_users = User.__table__
+_notifications = Notification.__table__
+
+
+def fan_out_notification(bind, message: str, type: str, related_id: Optional[int] = None,
+                         recipients=None, chunk_size: int = NOTIFICATION_FANOUT_CHUNK_SIZE,
+                         skip_existing: bool = False) -> int:
+    """
+    Inserts one notification per recipient user entirely in the database: INSERT INTO notifications
+    SELECT ... FROM users, in chunks of `chunk_size` user ids, each in its own short transaction.
+    No User or Notification objects are loaded. `recipients` is a WHERE clause on the users table
+    (default: every non-admin user). Returns the number of notifications written; each
+    committed chunk nudges its recipients' open notification streams.
+
+    Call it after the triggering change has been committed: chunks commit independently, and on SQLite
+    a session still holding its own write transaction would block them.
+
+    Because of that, a fan-out that fails part-way has already delivered its earlier chunks. Retried
+    callers (task-queue jobs) pass `skip_existing=True`: users who already have a notification with
+    this (type, related_id) are left out, so running it again only writes the missing rows.
+    """
+    if recipients is None:
+        recipients = _users.c.is_admin == False
+    if skip_existing:
+        # Anti-join per user through ix_notifications_user_created (user_id prefix)
+        recipients = recipients & ~exists().where(_notifications.c.user_id == _users.c.id,
+                                                  _notifications.c.type == type,
+                                                  _notifications.c.related_id.is_not_distinct_from(related_id))
+    now = datetime.utcnow()  # One timestamp for the whole fan-out, like a single ORM flush would have
+    started = time.perf_counter()
+    written = 0
+    chunks = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            # Upper user id of the next chunk (keyset over the primary key, no OFFSET)
+            chunk_ids = select(_users.c.id).where(recipients, _users.c.id > last_id)\
+                .order_by(_users.c.id).limit(chunk_size).subquery()
+            upper_id = conn.execute(select(func.max(chunk_ids.c.id))).scalar()
+            if upper_id is None:
+                break
+            rows = select(
+                _users.c.id,
+                literal(message, Text),
+                literal(type, String),
+                literal(related_id, Integer),
+                literal(now, DateTime),
+                literal(False, Boolean),
+                literal(now, DateTime),
+            ).where(recipients, _users.c.id > last_id, _users.c.id <= upper_id)
+            # RETURNING the recipients so their open notification streams can be nudged after the commit
+            user_ids = conn.execute(insert(_notifications).from_select(
+                ["user_id", "message", "type", "related_id", "created_at", "is_read", "updated_at"], rows)
+                .returning(_notifications.c.user_id)).scalars().all()
+            written += len(user_ids)
+        nudge_users(user_ids)
+        chunks += 1
+        last_id = upper_id
+    logger.info(f"Fan-out '{type}' (related_id={related_id}): {written} notifications in {chunks} chunks, "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms.")
+    return written
+
+
+# --- New-content notifications (call after the item is committed, so it has an id) ---
+# These go to every non-admin user, so they're published once as broadcasts (notification_feed.py)
+# instead of being fanned out; fan_out_notification is for audiences that really need their own rows.
+def create_new_job_notifications(db: Session, job: Job) -> Optional[BroadcastNotification]:
+    """Announces a new job to all non-admin users."""
+    return publish_broadcast(db, f"New Job Alert: '{job.title}' at {job.company or 'Unknown Company'}!", "new_job", job.id)
+
+def create_new_internship_notifications(db: Session, internship: Internship) -> Optional[BroadcastNotification]:
+    """Announces a new internship to all non-admin users."""
+    return publish_broadcast(db, f"New Internship Opportunity: '{internship.title}' at {internship.company or 'Unknown Company'}!",
+                             "new_internship", internship.id)
+
+def create_new_career_fair_notifications(db: Session, career_fair: CareerFair) -> Optional[BroadcastNotification]:
+    """Announces a new career fair to all non-admin users."""
+    return publish_broadcast(db, f"New Career Fair: '{career_fair.name}' is coming up!", "new_career_fair", career_fair.id)
+
+def create_new_hackathon_notifications(db: Session, hackathon: Hackathon) -> Optional[BroadcastNotification]:
+    """Announces a new hackathon to all non-admin users."""
+    return publish_broadcast(db, f"New Hackathon Alert: '{hackathon.name}' is now available!", "new_hackathon", hackathon.id)
+
+
+# --- Queued announcements ---
+_ANNOUNCERS = {
+    "job": (Job, "new_job", create_new_job_notifications),
+    "internship": (Internship, "new_internship", create_new_internship_notifications),
+    "career-fair": (CareerFair, "new_career_fair", create_new_career_fair_notifications),
+    "hackathon": (Hackathon, "new_hackathon", create_new_hackathon_notifications),
+}
+
+def enqueue_announcement(db: Session, item_type: str, item_id: int) -> None:
+    """Queues the new-item announcement in the caller's transaction (commit to send it)."""
+    enqueue(db, "announce_new_item", {"type": item_type, "id": item_id}, idempotency_key=f"announce:{item_type}:{item_id}")
+
+@background_task("announce_new_item")
+def announce_new_item(payload: Dict[str, Any]) -> None:
+    model, notification_type, announce = _ANNOUNCERS[payload["type"]]
+    with SessionLocal() as db:
+        item = db.get(model, payload["id"])
+        if item is None:
+            logger.warning(f"Skipping announcement: {payload['type']} ID {payload['id']} no longer exists.")
+            return
+        # A retry after a crash between publishing and marking the job done mustn't announce twice
+        if db.query(BroadcastNotification.id).filter(BroadcastNotification.type == notification_type,
+                                                     BroadcastNotification.related_id == item.id).first():
+            return
+        if announce(db, item) is None:
+            raise RuntimeError(f"Could not publish {notification_type} broadcast for ID {item.id}")
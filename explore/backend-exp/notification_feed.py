@@ -0,0 +1,156 @@
+# backend-exp/notification_feed.py
+
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, desc, exists, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .identity_cache import UserIdentity
+from .models import BroadcastNotification, BroadcastRead, Notification, NotificationOut, NotificationWatermark, User
+
+logger = logging.getLogger("exp.notifications")
+
+NOTIFICATIONS_LIMIT = 50  # Newest notifications returned by the list endpoint
+
+# Broadcasts share the notifications API with personal rows. Their ids are exposed negated
+# (broadcast 7 -> id -7) so the two id spaces never collide and mark-read can tell them apart.
+def public_broadcast_id(broadcast_id: int) -> int:
+    return -broadcast_id
+
+
+# --- Publishing ---
+def publish_broadcast(db: Session, message: str, type: str, related_id: Optional[int] = None) -> Optional[BroadcastNotification]:
+    """Stores one announcement for every non-admin user (one row, whatever the user count) and commits."""
+    try:
+        broadcast = BroadcastNotification(message=message, type=type, related_id=related_id)
+        db.add(broadcast)
+        db.commit()
+        logger.info(f"Published broadcast '{type}' (related_id={related_id}) as ID {broadcast.id}.")
+        return broadcast
+    except Exception as e:
+        # Log error but don't raise, as notification failure shouldn't undo the (already committed) item
+        db.rollback()
+        logger.error(f"Error publishing '{type}' broadcast for related_id {related_id}: {e}", exc_info=True)
+        return None
+
+
+# --- Visibility / read state ---
+def broadcast_visible_to(user_id: int):
+    """Broadcasts published since the user joined (a new account doesn't inherit the backlog)."""
+    joined = select(User.created_at).where(User.id == user_id).scalar_subquery()
+    return or_(joined.is_(None), BroadcastNotification.created_at >= joined)
+
+def _watermark(db: Session, user_id: int) -> int:
+    value = db.query(NotificationWatermark.last_read_broadcast_id).filter(NotificationWatermark.user_id == user_id).scalar()
+    return value or 0
+
+
+# --- Reads ---
+def list_notifications(db: Session, user: UserIdentity, only_unread: bool = False,
+                       limit: int = NOTIFICATIONS_LIMIT) -> List[NotificationOut]:
+    """Personal notifications and broadcasts merged newest first; broadcasts are read if at/below the watermark or in broadcast_reads."""
+    query = db.query(Notification).filter(Notification.user_id == user.id)
+    if only_unread:
+        query = query.filter(Notification.is_read == False)
+    items = [NotificationOut.model_validate(n) for n in query.order_by(desc(Notification.created_at)).limit(limit).all()]
+
+    if not user.is_admin:  # Admins never received the per-user copies either
+        watermark = _watermark(db, user.id)
+        query = db.query(BroadcastNotification, BroadcastRead.broadcast_id)\
+            .outerjoin(BroadcastRead, and_(BroadcastRead.user_id == user.id, BroadcastRead.broadcast_id == BroadcastNotification.id))\
+            .filter(broadcast_visible_to(user.id))
+        if only_unread:
+            query = query.filter(BroadcastNotification.id > watermark, BroadcastRead.broadcast_id.is_(None))
+        rows = query.order_by(desc(BroadcastNotification.created_at), desc(BroadcastNotification.id)).limit(limit).all()
+        items.extend(broadcast_out(broadcast, is_read=broadcast.id <= watermark or read_id is not None)
+                     for broadcast, read_id in rows)
+    items.sort(key=lambda item: item.created_at, reverse=True)
+    return items[:limit]
+
+def broadcast_out(broadcast: BroadcastNotification, is_read: bool = False) -> NotificationOut:
+    return NotificationOut(
+        id=public_broadcast_id(broadcast.id), message=broadcast.message, type=broadcast.type,
+        related_id=broadcast.related_id, created_at=broadcast.created_at, is_read=is_read,
+    )
+
+def latest_ids(db: Session, user: UserIdentity) -> Tuple[int, int]:
+    """(newest personal notification id, newest broadcast id) for the user: the starting position of a live stream."""
+    personal = db.query(func.max(Notification.id)).filter(Notification.user_id == user.id).scalar() or 0
+    broadcast = db.query(func.max(BroadcastNotification.id)).scalar() or 0
+    return personal, broadcast
+
+def notifications_since(db: Session, user: UserIdentity, personal_after: int, broadcast_after: int,
+                        limit: int = NOTIFICATIONS_LIMIT) -> List[NotificationOut]:
+    """Notifications newer than the given ids (both id spaces), oldest first, for stream catch-up."""
+    personal = db.query(Notification).filter(Notification.user_id == user.id, Notification.id > personal_after)\
+        .order_by(Notification.id).limit(limit).all()
+    items = [NotificationOut.model_validate(n) for n in personal]
+    if not user.is_admin:
+        watermark = _watermark(db, user.id)
+        broadcasts = db.query(BroadcastNotification)\
+            .filter(BroadcastNotification.id > broadcast_after, broadcast_visible_to(user.id))\
+            .order_by(BroadcastNotification.id).limit(limit).all()
+        items.extend(broadcast_out(b, is_read=b.id <= watermark) for b in broadcasts)
+    items.sort(key=lambda item: item.created_at)
+    return items[:limit]
+
+def unread_count(db: Session, user: UserIdentity) -> int:
+    count = db.query(func.count(Notification.id)).filter(Notification.user_id == user.id, Notification.is_read == False).scalar()
+    if not user.is_admin:
+        watermark = _watermark(db, user.id)
+        count += db.query(func.count(BroadcastNotification.id)).filter(
+            BroadcastNotification.id > watermark, broadcast_visible_to(user.id),
+            ~exists().where(BroadcastRead.user_id == user.id, BroadcastRead.broadcast_id == BroadcastNotification.id),
+        ).scalar()
+    return count
+
+
+# --- Writes ---
+def mark_read(db: Session, user: UserIdentity, notification_ids: List[int]) -> int:
+    """
+    Marks personal notifications (positive ids) and broadcasts (negative ids) read. Does not commit.
+    Broadcast reads above the watermark go to broadcast_reads; the watermark then advances to just below
+    the oldest still-unread broadcast and the rows it now covers are deleted, so the table stays small.
+    Returns the number of notifications that changed to read.
+    """
+    personal_ids = [i for i in notification_ids if i > 0]
+    broadcast_ids = sorted({-i for i in notification_ids if i < 0})
+    updated = 0
+    if personal_ids:
+        updated += db.query(Notification)\
+            .filter(
+                Notification.user_id == user.id,
+                Notification.id.in_(personal_ids),
+                Notification.is_read == False # Only update unread ones
+            )\
+            .update({"is_read": True, "updated_at": datetime.utcnow()}, synchronize_session=False)
+    if not broadcast_ids or user.is_admin:
+        return updated
+
+    watermark = _watermark(db, user.id)
+    readable = [row[0] for row in db.query(BroadcastNotification.id).filter(
+        BroadcastNotification.id.in_(broadcast_ids), BroadcastNotification.id > watermark, broadcast_visible_to(user.id)).all()]
+    if readable:
+        # INSERT OR IGNORE: a concurrent mark-read of the same broadcast isn't an error
+        result = db.execute(sqlite_insert(BroadcastRead.__table__).on_conflict_do_nothing(),
+                            [{"user_id": user.id, "broadcast_id": broadcast_id} for broadcast_id in readable])
+        updated += max(result.rowcount, 0)
+
+    # Advance the watermark over the contiguous read prefix
+    unread = and_(
+        BroadcastNotification.id > watermark, broadcast_visible_to(user.id),
+        ~exists().where(BroadcastRead.user_id == user.id, BroadcastRead.broadcast_id == BroadcastNotification.id),
+    )
+    first_unread = db.query(func.min(BroadcastNotification.id)).filter(unread).scalar()
+    new_watermark = first_unread - 1 if first_unread is not None else (db.query(func.max(BroadcastNotification.id)).scalar() or 0)
+    if new_watermark > watermark:
+        db.execute(sqlite_insert(NotificationWatermark).values(user_id=user.id, last_read_broadcast_id=0).on_conflict_do_nothing())
+        db.execute(update(NotificationWatermark).where(NotificationWatermark.user_id == user.id)
+                   .values(last_read_broadcast_id=func.max(NotificationWatermark.last_read_broadcast_id, new_watermark),
+                           updated_at=datetime.utcnow()))
+        db.query(BroadcastRead).filter(BroadcastRead.user_id == user.id, BroadcastRead.broadcast_id <= new_watermark)\
+            .delete(synchronize_session=False)
+    return updated
@@ -0,0 +1,137 @@
+# backend-exp/notification_stream.py
+
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+
+from .database import SessionLocal
+from .db_executor import run_db
+from .identity_cache import UserIdentity
+from .models import BroadcastNotification, Notification, NotificationOut
+from .notification_feed import broadcast_out, latest_ids, notifications_since, unread_count
+from .pubsub import hub
+
+logger = logging.getLogger("exp.notifications")
+
+# --- Configuration ---
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 20))  # Comment line that keeps proxies from closing idle streams
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 5000))  # Browser reconnect delay
+
+BROADCAST_TOPIC = "notifications:broadcast"
+_NUDGE = "nudge"  # Personal-topic message: "you have new rows", the stream reads them itself
+
+def user_topic(user_id: int) -> str:
+    return f"notifications:user:{user_id}"
+
+
+# --- Event ids ---
+# The stream position covers both id spaces: "<last personal notification id>.<last broadcast id>".
+# The browser sends it back as Last-Event-ID on reconnect and the stream replays what was missed.
+def encode_event_id(personal: int, broadcast: int) -> str:
+    return f"{personal}.{broadcast}"
+
+def decode_event_id(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    try:
+        personal, broadcast = (int(part) for part in (value or "").strip().split("."))
+        return (personal, broadcast) if personal >= 0 and broadcast >= 0 else None
+    except ValueError:
+        return None
+
+def _sse(event_name: str, data: Any, event_id: Optional[str] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# --- Publishing (SQLAlchemy session events) ---
+# Notifications are published only once their transaction commits. Personal ones send the user a nudge
+# (the stream reads the rows itself); broadcasts carry their payload, since every stream would read the same row.
+_PENDING_KEY = "exp_notification_push"
+
+def _after_flush(session, flush_context):
+    pending = None
+    for obj in session.new:
+        if isinstance(obj, Notification) and obj.user_id is not None:
+            pending = pending or session.info.setdefault(_PENDING_KEY, {"users": set(), "broadcasts": []})
+            pending["users"].add(obj.user_id)
+        elif isinstance(obj, BroadcastNotification):
+            pending = pending or session.info.setdefault(_PENDING_KEY, {"users": set(), "broadcasts": []})
+            pending["broadcasts"].append({"broadcast_id": obj.id, "notification": broadcast_out(obj).model_dump(mode="json")})
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        nudge_users(pending["users"])
+        for message in pending["broadcasts"]:
+            hub.publish(BROADCAST_TOPIC, message)
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def install_push(session_factory=SessionLocal) -> None:
+    """Publishes committed notifications to connected streams (call once at import)."""
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
+
+def nudge_users(user_ids: Iterable[int]) -> None:
+    """Tells the users' open streams to look for new personal notifications (for writes made outside the ORM)."""
+    for user_id in user_ids:
+        if hub.has_subscribers(user_topic(user_id)):
+            hub.publish(user_topic(user_id), _NUDGE)
+
+
+# --- Stream ---
+def _with_session(fn, *args):
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+async def notification_events(user: UserIdentity, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one user: replays what was missed since Last-Event-ID (or starts from now),
+    sends the unread count, then pushes new notifications as they commit, with heartbeats in between.
+    Idle streams cost a parked coroutine and a queue; the DB is only read when something arrives.
+    """
+    subscription = hub.subscribe(user_topic(user.id), BROADCAST_TOPIC)  # Before reading the DB, so nothing falls in between
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        cursor = decode_event_id(last_event_id)
+        if cursor is None:
+            personal, broadcast = await run_db(_with_session, latest_ids, user)
+            backlog = []
+        else:
+            personal, broadcast = cursor
+            backlog = await run_db(_with_session, notifications_since, user, personal, broadcast)
+        for item in backlog:
+            personal, broadcast = _advance(item, personal, broadcast)
+            yield _sse("notification", item.model_dump(mode="json"), encode_event_id(personal, broadcast))
+        count = await run_db(_with_session, unread_count, user)
+        yield _sse("unread", {"count": count}, encode_event_id(personal, broadcast))
+
+        while True:
+            message = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+            if message is None and not subscription.overflowed:
+                yield ": heartbeat\n\n"
+                continue
+            if message is not None and message != _NUDGE and not subscription.overflowed:
+                # Broadcast payload: no DB read needed (admins don't get broadcasts)
+                if user.is_admin or message["broadcast_id"] <= broadcast:
+                    continue
+                broadcast = message["broadcast_id"]
+                yield _sse("notification", message["notification"], encode_event_id(personal, broadcast))
+                continue
+            # Personal nudge or dropped messages: catch up from the database
+            subscription.overflowed = False
+            items = await run_db(_with_session, notifications_since, user, personal, broadcast)
+            for item in items:
+                personal, broadcast = _advance(item, personal, broadcast)
+                yield _sse("notification", item.model_dump(mode="json"), encode_event_id(personal, broadcast))
+    finally:
+        hub.unsubscribe(subscription)
+
+def _advance(item: NotificationOut, personal: int, broadcast: int) -> Tuple[int, int]:
+    if item.id < 0:
+        return personal, max(broadcast, -item.id)
+    return max(personal, item.id), broadcast
@@ -0,0 +1,455 @@
+# backend-exp/otp_store.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import SessionLocal
+from .db_executor import run_db
+from .models import OTPIssueThrottle, PasswordResetOTP
+
+logger = logging.getLogger("exp.otp")
+
+# --- Configuration ---
+OTP_BACKEND = os.environ.get("OTP_BACKEND", "sql").lower()  # "sql" (shared tables) or "memory" (single worker only)
+OTP_TTL_SECONDS = int(os.environ.get("OTP_TTL_SECONDS", 300))  # Matches the "valid for 5 minutes" email text
+OTP_MAX_VERIFY_ATTEMPTS = int(os.environ.get("OTP_MAX_VERIFY_ATTEMPTS", 5))  # Wrong guesses before the OTP is burned
+OTP_ISSUE_COOLDOWN_SECONDS = int(os.environ.get("OTP_ISSUE_COOLDOWN_SECONDS", 60))  # Min gap between OTP emails per address
+OTP_ISSUE_WINDOW_SECONDS = int(os.environ.get("OTP_ISSUE_WINDOW_SECONDS", 3600))
+OTP_MAX_ISSUES_PER_WINDOW = int(os.environ.get("OTP_MAX_ISSUES_PER_WINDOW", 5))
+OTP_MAX_ENTRIES = int(os.environ.get("OTP_MAX_ENTRIES", 50000))  # Memory backend: cap on OTPs and on throttled emails; soonest-to-expire evicted first
+OTP_SWEEP_INTERVAL_SECONDS = int(os.environ.get("OTP_SWEEP_INTERVAL_SECONDS", 30))
+
+# verify() results
+OTP_OK = "ok"
+OTP_MISSING = "missing"
+OTP_EXPIRED = "expired"
+OTP_INVALID = "invalid"
+OTP_LOCKED = "locked"
+
+
+@dataclass
+class _OTPEntry:
+    __slots__ = ("otp", "expires_at", "failed_attempts", "verified")
+    otp: str
+    expires_at: float  # time.monotonic() deadline
+    failed_attempts: int
+    verified: bool
+
+
+@dataclass
+class _IssueThrottle:
+    __slots__ = ("window_start", "issued", "last_issued")
+    window_start: float
+    issued: int
+    last_issued: float
+
+
+class MemoryOTPStore:
+    """
+    Process-local backend: only correct with a single worker (development), like MemorySessionBackend.
+    Password-reset OTPs keyed by email, with expiry driven by a min-heap of deadlines.
+
+    Every OTP and every per-email throttle window pushes one (deadline, seq, email) record.
+    The sweeper pops records whose deadline has passed; a record is stale (and simply dropped)
+    when the entry it points to has since been replaced, so replacement never needs a heap search.
+    """
+
+    def __init__(self, ttl_seconds: int = OTP_TTL_SECONDS, max_entries: int = OTP_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, _OTPEntry] = {}
+        self._throttles: Dict[str, _IssueThrottle] = {}
+        # (deadline, seq, email) min-heaps; OTP deadlines and throttle-window ends are kept apart
+        self._otp_heap: List[Tuple[float, int, str]] = []
+        self._throttle_heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        # Counters
+        self.issued = 0
+        self.verified = 0
+        self.expired = 0
+        self.evicted = 0
+        self.throttles_evicted = 0
+        self.locked_out = 0
+        self.issue_rejections = 0
+
+    # --- Heap helpers (call with the lock held) ---
+    def _pop_due(self, now: float) -> Tuple[int, int]:
+        expired_otps = expired_throttles = 0
+        while self._otp_heap and self._otp_heap[0][0] <= now:
+            deadline, _, email = heapq.heappop(self._otp_heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry.expires_at == deadline:
+                del self._entries[email]
+                expired_otps += 1
+        while self._throttle_heap and self._throttle_heap[0][0] <= now:
+            deadline, _, email = heapq.heappop(self._throttle_heap)
+            throttle = self._throttles.get(email)
+            if throttle is not None and throttle.window_start + OTP_ISSUE_WINDOW_SECONDS == deadline:
+                del self._throttles[email]
+                expired_throttles += 1
+        self.expired += expired_otps
+        return expired_otps, expired_throttles
+
+    def _evict_one(self) -> None:
+        # Drops the live OTP closest to expiry to make room
+        while self._otp_heap:
+            deadline, _, email = heapq.heappop(self._otp_heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry.expires_at == deadline:
+                del self._entries[email]
+                self.evicted += 1
+                return
+
+    def _evict_throttle(self) -> None:
+        # Drops the oldest throttle window (the one closest to ending) to make room
+        while self._throttle_heap:
+            deadline, _, email = heapq.heappop(self._throttle_heap)
+            throttle = self._throttles.get(email)
+            if throttle is not None and throttle.window_start + OTP_ISSUE_WINDOW_SECONDS == deadline:
+                del self._throttles[email]
+                self.throttles_evicted += 1
+                return
+
+    # --- Issuing ---
+    def reserve_issue(self, email: str) -> int:
+        """
+        Records an OTP request for the address and returns 0 if it may proceed,
+        otherwise the number of seconds the caller should wait.
+        Counted whether or not an account exists, so the limit can't be used to probe for accounts.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._pop_due(now)
+            throttle = self._throttles.get(email)
+            if throttle is None and len(self._throttles) >= self.max_entries:
+                self._evict_throttle()
+            if throttle is None or now >= throttle.window_start + OTP_ISSUE_WINDOW_SECONDS:
+                throttle = _IssueThrottle(window_start=now, issued=0, last_issued=0.0)
+                self._throttles[email] = throttle
+                heapq.heappush(self._throttle_heap, (now + OTP_ISSUE_WINDOW_SECONDS, next(self._seq), email))
+            elif throttle.issued and now - throttle.last_issued < OTP_ISSUE_COOLDOWN_SECONDS:
+                self.issue_rejections += 1
+                return int(OTP_ISSUE_COOLDOWN_SECONDS - (now - throttle.last_issued)) + 1
+            elif throttle.issued >= OTP_MAX_ISSUES_PER_WINDOW:
+                self.issue_rejections += 1
+                return int(throttle.window_start + OTP_ISSUE_WINDOW_SECONDS - now) + 1
+            throttle.issued += 1
+            throttle.last_issued = now
+            return 0
+
+    def issue(self, email: str) -> str:
+        """Creates (or replaces) the OTP for an email and returns it."""
+        otp = f"{secrets.randbelow(900000) + 100000}"
+        now = time.monotonic()
+        with self._lock:
+            self._pop_due(now)
+            if email not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict_one()
+            entry = _OTPEntry(otp=otp, expires_at=now + self.ttl_seconds, failed_attempts=0, verified=False)
+            self._entries[email] = entry
+            heapq.heappush(self._otp_heap, (entry.expires_at, next(self._seq), email))
+            self.issued += 1
+        return otp
+
+    # --- Verification ---
+    def verify(self, email: str, otp_attempt: str) -> str:
+        """Checks an attempt and returns one of OTP_OK / OTP_MISSING / OTP_EXPIRED / OTP_INVALID / OTP_LOCKED."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return OTP_MISSING
+            if now >= entry.expires_at:
+                del self._entries[email]
+                self.expired += 1
+                return OTP_EXPIRED
+            if not secrets.compare_digest(entry.otp.encode(), (otp_attempt or "").strip().encode()):
+                entry.failed_attempts += 1
+                if entry.failed_attempts >= OTP_MAX_VERIFY_ATTEMPTS:
+                    del self._entries[email]
+                    self.locked_out += 1
+                    return OTP_LOCKED
+                return OTP_INVALID
+            entry.verified = True
+            self.verified += 1
+            return OTP_OK
+
+    def is_verified(self, email: str) -> bool:
+        """True if the email passed OTP verification and the OTP hasn't expired (gates the reset step)."""
+        with self._lock:
+            entry = self._entries.get(email)
+            return entry is not None and entry.verified and time.monotonic() < entry.expires_at
+
+    def current_otp(self, email: str) -> Optional[str]:
+        """The live, not yet verified OTP for an email (what the email task sends), or None."""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry.verified or time.monotonic() >= entry.expires_at:
+                return None
+            return entry.otp
+
+    def discard(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    # --- Expiry ---
+    def sweep_expired(self) -> int:
+        with self._lock:
+            expired_otps, expired_throttles = self._pop_due(time.monotonic())
+        if expired_otps or expired_throttles:
+            logger.info(f"OTP sweep removed {expired_otps} expired OTPs and {expired_throttles} throttle windows.")
+        return expired_otps
+
+    async def run_sweeper(self, interval_seconds: int = OTP_SWEEP_INTERVAL_SECONDS) -> None:
+        """Background task: periodically drops expired OTPs until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.sweep_expired()
+            except Exception as e:
+                logger.error(f"OTP sweep failed: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            # Rough footprint: containers plus the objects they hold (keys are shared between dicts and heap)
+            footprint = sys.getsizeof(self._entries) + sys.getsizeof(self._throttles)
+            footprint += sys.getsizeof(self._otp_heap) + sys.getsizeof(self._throttle_heap)
+            footprint += sum(sys.getsizeof(k) + sys.getsizeof(v) + sys.getsizeof(v.otp) for k, v in self._entries.items())
+            footprint += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._throttles.items())
+            footprint += sum(sys.getsizeof(item) for item in self._otp_heap)
+            footprint += sum(sys.getsizeof(item) for item in self._throttle_heap)
+            return {
+                "backend": type(self).__name__,
+                "entries": len(self._entries),
+                "throttled_emails": len(self._throttles),
+                "heap_size": len(self._otp_heap) + len(self._throttle_heap),
+                "max_entries": self.max_entries,
+                "approx_memory_bytes": footprint,
+                "issued": self.issued,
+                "verified": self.verified,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "throttles_evicted": self.throttles_evicted,
+                "locked_out": self.locked_out,
+                "issue_rejections": self.issue_rejections,
+            }
+
+
+_otps = PasswordResetOTP.__table__
+_throttles = OTPIssueThrottle.__table__
+
+
+class SQLOTPStore:
+    """
+    Stores OTPs and issue throttles in shared tables (migration 0011), so /forgot-password, /verify-otp
+    and /reset-password may each land on a different worker and the per-email limits hold across all of them.
+    Each check-and-update is one conditional UPDATE, so concurrent requests can't both pass a limit.
+    Rows are bounded by the sweeper (expired OTPs, ended windows) rather than by max_entries.
+    Blocking: call through run_db from async handlers.
+    """
+
+    def __init__(self, session_factory=SessionLocal, ttl_seconds: int = OTP_TTL_SECONDS):
+        self._session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()  # Guards the counters (this worker's share)
+        self.issued = 0
+        self.verified = 0
+        self.expired = 0
+        self.locked_out = 0
+        self.issue_rejections = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # --- Issuing ---
+    def reserve_issue(self, email: str) -> int:
+        """Same contract as MemoryOTPStore.reserve_issue: 0 to proceed, else seconds to wait."""
+        now = datetime.utcnow()
+        window = timedelta(seconds=OTP_ISSUE_WINDOW_SECONDS)
+        cooldown = timedelta(seconds=OTP_ISSUE_COOLDOWN_SECONDS)
+        db = self._session_factory()
+        try:
+            # Opens a window on the first request, or restarts one that has ended
+            db.execute(sqlite_insert(_throttles).values(email=email, window_start=now, issued=0, last_issued=None)
+                       .on_conflict_do_update(index_elements=["email"],
+                                              set_={"window_start": now, "issued": 0, "last_issued": None},
+                                              where=_throttles.c.window_start <= now - window))
+            taken = db.execute(update(_throttles).where(
+                _throttles.c.email == email,
+                _throttles.c.issued < OTP_MAX_ISSUES_PER_WINDOW,
+                or_(_throttles.c.last_issued.is_(None), _throttles.c.last_issued <= now - cooldown),
+            ).values(issued=_throttles.c.issued + 1, last_issued=now)).rowcount
+            throttle = None if taken else db.execute(
+                select(_throttles.c.window_start, _throttles.c.last_issued).where(_throttles.c.email == email)).first()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if taken:
+            return 0
+        self._count("issue_rejections")
+        if throttle.last_issued is not None and now - throttle.last_issued < cooldown:
+            return int((cooldown - (now - throttle.last_issued)).total_seconds()) + 1
+        return int((throttle.window_start + window - now).total_seconds()) + 1
+
+    def issue(self, email: str) -> str:
+        """Creates (or replaces) the OTP for an email and returns it."""
+        otp = f"{secrets.randbelow(900000) + 100000}"
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        fresh = {"otp": otp, "expires_at": expires_at, "failed_attempts": 0, "verified": False}
+        db = self._session_factory()
+        try:
+            db.execute(sqlite_insert(_otps).values(email=email, **fresh)
+                       .on_conflict_do_update(index_elements=["email"], set_=fresh))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self._count("issued")
+        return otp
+
+    # --- Verification ---
+    def verify(self, email: str, otp_attempt: str) -> str:
+        """Checks an attempt and returns one of OTP_OK / OTP_MISSING / OTP_EXPIRED / OTP_INVALID / OTP_LOCKED."""
+        now = datetime.utcnow()
+        db = self._session_factory()
+        try:
+            row = db.execute(select(_otps.c.otp, _otps.c.expires_at).where(_otps.c.email == email)).first()
+            if row is None:
+                return OTP_MISSING
+            # Updates below apply to this issue of the OTP only (a re-issue changes expires_at)
+            this_otp = and_(_otps.c.email == email, _otps.c.expires_at == row.expires_at)
+            if now >= row.expires_at:
+                db.execute(delete(_otps).where(this_otp))
+                db.commit()
+                self._count("expired")
+                return OTP_EXPIRED
+            if secrets.compare_digest(row.otp.encode(), (otp_attempt or "").strip().encode()):
+                ok = db.execute(update(_otps).where(this_otp, _otps.c.failed_attempts < OTP_MAX_VERIFY_ATTEMPTS)
+                                .values(verified=True)).rowcount
+                db.commit()
+                if not ok:  # Locked out or replaced by a concurrent request
+                    return OTP_MISSING
+                self._count("verified")
+                return OTP_OK
+            # The increment and the check are one statement, so parallel guesses can't exceed the budget
+            failed = db.execute(update(_otps).where(this_otp).values(failed_attempts=_otps.c.failed_attempts + 1)
+                                .returning(_otps.c.failed_attempts)).scalar()
+            if failed is not None and failed >= OTP_MAX_VERIFY_ATTEMPTS:
+                db.execute(delete(_otps).where(this_otp))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if failed is None:
+            return OTP_MISSING
+        if failed >= OTP_MAX_VERIFY_ATTEMPTS:
+            self._count("locked_out")
+            return OTP_LOCKED
+        return OTP_INVALID
+
+    def is_verified(self, email: str) -> bool:
+        """True if the email passed OTP verification and the OTP hasn't expired (gates the reset step)."""
+        db = self._session_factory()
+        try:
+            return db.execute(select(_otps.c.email).where(
+                _otps.c.email == email, _otps.c.verified == True, _otps.c.expires_at > datetime.utcnow())).first() is not None
+        finally:
+            db.close()
+
+    def current_otp(self, email: str) -> Optional[str]:
+        """The live, not yet verified OTP for an email (what the email task sends), or None."""
+        db = self._session_factory()
+        try:
+            return db.execute(select(_otps.c.otp).where(
+                _otps.c.email == email, _otps.c.verified == False, _otps.c.expires_at > datetime.utcnow())).scalar()
+        finally:
+            db.close()
+
+    def discard(self, email: str) -> None:
+        db = self._session_factory()
+        try:
+            db.execute(delete(_otps).where(_otps.c.email == email))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # --- Expiry ---
+    def sweep_expired(self) -> int:
+        now = datetime.utcnow()
+        db = self._session_factory()
+        try:
+            expired_otps = db.execute(delete(_otps).where(_otps.c.expires_at <= now)).rowcount
+            expired_throttles = db.execute(delete(_throttles).where(
+                _throttles.c.window_start <= now - timedelta(seconds=OTP_ISSUE_WINDOW_SECONDS))).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            self.expired += expired_otps
+        if expired_otps or expired_throttles:
+            logger.info(f"OTP sweep removed {expired_otps} expired OTPs and {expired_throttles} throttle windows.")
+        return expired_otps
+
+    async def run_sweeper(self, interval_seconds: int = OTP_SWEEP_INTERVAL_SECONDS) -> None:
+        """Background task: periodically drops expired OTPs and ended throttle windows until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await run_db(self.sweep_expired)
+            except Exception as e:
+                logger.error(f"OTP sweep failed: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._session_factory()
+        try:
+            entries = db.execute(select(func.count()).select_from(_otps)).scalar()
+            throttled = db.execute(select(func.count()).select_from(_throttles)).scalar()
+        finally:
+            db.close()
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "entries": entries,
+                "throttled_emails": throttled,
+                # Counters below are this worker's only
+                "issued": self.issued,
+                "verified": self.verified,
+                "expired": self.expired,
+                "locked_out": self.locked_out,
+                "issue_rejections": self.issue_rejections,
+            }
+
+
+def build_otp_store():
+    if OTP_BACKEND == "memory":
+        logger.warning("Using in-memory OTP store; OTPs and throttles are NOT shared between workers.")
+        return MemoryOTPStore()
+    return SQLOTPStore()
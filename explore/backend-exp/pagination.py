@@ -0,0 +1,144 @@
+# backend-exp/pagination.py
+
+import base64
+import binascii
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import String, and_, false, literal, or_, type_coerce
+from sqlalchemy.orm import Query as ORMQuery
+
+logger = logging.getLogger("exp.pagination")
+
+# --- Configuration ---
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", 100))  # Page size when the caller doesn't pass a limit
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 500))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"  # List endpoints keep returning plain JSON arrays; the cursor rides in a header
+
+# A sort key: (ORM column attribute, descending?). The last key must be unique (normally the primary key).
+SortKey = Tuple[Any, bool]
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str]
+
+
+def page_params(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX, description="Page size"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
+) -> PageParams:
+    """
+    Dependency for cursor-paginated list endpoints. Every response is at most one page; clients
+    follow the cursor for more (the frontend's fetchAllPages in static/pagination.js).
+    """
+    return PageParams(limit=limit, cursor=cursor)
+
+
+# --- Cursor encoding ---
+# Cursors carry the key values exactly as stored (SQLite keeps dates/datetimes as text, and rows written by
+# seed.sql or CURRENT_TIMESTAMP don't use SQLAlchemy's format), so comparisons match the ORDER BY.
+# The key names are included so a cursor from one list (or sort order) is rejected by another.
+def _signature(keys: Sequence[SortKey]) -> str:
+    return ",".join(f"{column.key}{'-' if descending else '+'}" for column, descending in keys)
+
+def encode_cursor(keys: Sequence[SortKey], values: Sequence[Any]) -> str:
+    payload = {"s": _signature(keys), "v": list(values)}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(keys: Sequence[SortKey], cursor: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        if payload["s"] != _signature(keys) or len(values) != len(keys) \
+                or not all(v is None or isinstance(v, (str, int, float)) for v in values):
+            raise ValueError("cursor was issued for a different list")
+        return values
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        logger.info(f"Rejected pagination cursor: {e}")
+        raise HTTPException(status_code=400, detail="Invalid or expired cursor.")
+
+
+# --- Keyset conditions ---
+# SQLite sorts NULL before every value, so NULLs come first ascending and last descending.
+def _nullable(column) -> bool:
+    return getattr(getattr(column, "expression", column), "nullable", True)
+
+def _after(column, value, descending: bool):
+    value = _raw(value)
+    if value is None:
+        return false() if descending else column.isnot(None)
+    if descending:
+        return or_(column < value, column.is_(None)) if _nullable(column) else column < value
+    return column > value
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == _raw(value)
+
+def _raw(value):
+    # Bind with the value's own type (not the column's), so stored text is compared as-is
+    return value if value is None else literal(value)
+
+def keyset_after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """WHERE clause for rows strictly after `values` in the (k1, k2, ..., id) ordering."""
+    branches = []
+    for i, (column, descending) in enumerate(keys):
+        prefix = [_equal(keys[j][0], values[j]) for j in range(i)]
+        branches.append(and_(*prefix, _after(column, values[i], descending)))
+    return or_(*branches)
+
+def keyset_regions(keys: Sequence[SortKey], values: Sequence[Any]) -> list:
+    """
+    The rows after the cursor as a short list of WHERE clauses, in sort order, each with a plain
+    range or IS [NOT] NULL on the leading key so SQLite can seek the index instead of scanning from the
+    start. (A single OR-ed keyset_after() is correct but makes SQLite walk the index from the top.)
+    A nullable leading key splits into its non-NULL and NULL regions.
+    """
+    column, descending = keys[0]
+    value = _raw(values[0])
+    if len(keys) == 1:
+        tail = false()
+    else:
+        tail = keyset_after(keys[1:], values[1:])
+    if value is None:
+        regions = [and_(column.is_(None), tail)]
+        if not descending:
+            regions.append(column.isnot(None))
+        return regions
+    if descending:
+        regions = [and_(column <= value, or_(column < value, and_(column == value, tail)))]
+        if _nullable(column):
+            regions.append(column.is_(None))
+    else:
+        regions = [and_(column >= value, or_(column > value, and_(column == value, tail)))]
+    return regions
+
+
+def paginate(query: ORMQuery, keys: Sequence[SortKey], page: PageParams, response: Optional[Response] = None) -> list:
+    """
+    Applies ORDER BY keys, the cursor's keyset condition and limit+1 to a single-entity query.
+    Returns the page's rows and, if there is another page, sets the next cursor header on `response`.
+    """
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    # Fetch the raw stored key values alongside each row for the next cursor
+    query = query.add_columns(*[type_coerce(column, String) for column, _ in keys])
+    if page.cursor:
+        rows = []
+        for region in keyset_regions(keys, decode_cursor(keys, page.cursor)):
+            rows.extend(query.filter(region).order_by(*order).limit(page.limit + 1 - len(rows)).all())
+            if len(rows) > page.limit:
+                break
+    else:
+        rows = query.order_by(*order).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        if response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(keys, list(rows[-1][1:]))
+    return [row[0] for row in rows]
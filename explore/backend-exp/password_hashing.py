@@ -0,0 +1,163 @@
+# backend-exp/password_hashing.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+
+logger = logging.getLogger("exp.passwords")
+
+# --- Configuration ---
+# bcrypt is CPU bound (~200-300 ms per call), so it runs in worker processes instead of on the event loop.
+# PASSWORD_HASH_WORKERS=0 falls back to the default thread pool (useful where subprocesses aren't allowed).
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Calls allowed in flight (running + queued) before new ones fail fast with 503.
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", max(1, PASSWORD_HASH_WORKERS) * 8))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.environ.get("PASSWORD_HASH_RETRY_AFTER_SECONDS", 2))
+PASSWORD_HASH_LATENCY_WINDOW = 1000  # Recent samples kept per operation for percentiles
+
+# --- Password Hashing ---
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# --- Password Utils (plain functions; also what the worker processes run) ---
+def hash_password(password: str) -> str:
+    """Hashes a password using the configured context."""
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a plain password against a stored hash."""
+    if not plain_password or not hashed_password:
+        logger.debug("Verify password called with empty plain or hashed password.")
+        return False
+    try:
+        # Check if the hash format is recognized before attempting verification
+        if not pwd_context.identify(hashed_password):
+            logger.warning(f"Attempted to verify password with unrecognized hash format: {hashed_password[:10]}...")
+            return False
+        return pwd_context.verify(plain_password, hashed_password)
+    except UnknownHashError:
+        # This specific exception occurs if the hash format is known but invalid/corrupted
+        logger.warning(f"Verification failed due to UnknownHashError for hash: {hashed_password[:10]}...")
+        return False
+    except Exception as e:
+        # Catch other potential errors during verification
+        logger.error(f"Error verifying password: {e}", exc_info=True)
+        return False
+
+def _warm_up_worker() -> bool:
+    # Importing this module in the worker is the real work; this just makes the pool start its processes.
+    return True
+
+
+# --- Bounded Pool ---
+class PasswordHasherPool:
+    """
+    Runs hash/verify in a process pool with a cap on in-flight calls.
+    When the cap is reached new calls raise 503 right away instead of queueing behind a login storm.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self._latencies: Dict[str, Deque[float]] = {
+            "hash": deque(maxlen=PASSWORD_HASH_LATENCY_WINDOW),
+            "verify": deque(maxlen=PASSWORD_HASH_LATENCY_WINDOW),
+        }
+        self._counts: Dict[str, int] = {"hash": 0, "verify": 0}
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                logger.info(f"Password hashing pool started with {self.workers} worker processes.")
+            return self._executor
+
+    def start(self) -> None:
+        """Spawns the workers up front so the first login doesn't pay for process start-up."""
+        executor = self._get_executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(_warm_up_worker)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, op: str, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self.rejected += 1
+                logger.warning(f"Password hashing pool saturated ({self._in_flight} in flight); rejecting '{op}'.")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again shortly.",
+                    headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+                )
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._counts[op] += 1
+                self._latencies[op].append(elapsed_ms)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if not plain_password or not hashed_password:
+            return False
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        def summarize(samples):
+            if not samples:
+                return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+            ordered = sorted(samples)
+            return {
+                "p50_ms": round(ordered[len(ordered) // 2], 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "rejected": self.rejected,
+                "hash": {"count": self._counts["hash"], **summarize(list(self._latencies["hash"]))},
+                "verify": {"count": self._counts["verify"], **summarize(list(self._latencies["verify"]))},
+            }
+
+
+password_pool = PasswordHasherPool()
+
+async def hash_password_async(password: str) -> str:
+    """Hashes a password off the event loop. Raises 503 if the hashing pool is saturated."""
+    return await password_pool.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a password off the event loop. Raises 503 if the hashing pool is saturated."""
+    return await password_pool.verify(plain_password, hashed_password)
@@ -0,0 +1,115 @@
+# backend-exp/pubsub.py
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger("exp.pubsub")
+
+# --- Configuration ---
+PUBSUB_QUEUE_SIZE = int(os.environ.get("PUBSUB_QUEUE_SIZE", 100))  # Per subscriber; a slow consumer past this is marked overflowed
+
+
+class Subscription:
+    """One consumer's mailbox. `overflowed` is set when messages were dropped, so the consumer can resync from the DB."""
+
+    __slots__ = ("topics", "queue", "overflowed")
+
+    def __init__(self, topics: Iterable[str], maxsize: int = PUBSUB_QUEUE_SIZE):
+        self.topics = frozenset(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Next message, or None if `timeout` passes first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PubSubHub:
+    """
+    In-process topic fan-out for push transports (SSE, WebSocket).
+
+    Subscribers live on the event loop; publish() may be called from any thread (sync handlers run in
+    worker threads) and hops onto the loop with call_soon_threadsafe. Delivery is best-effort and
+    process-local: consumers treat messages as hints and the database stays the source of truth.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()  # Guards the counters (published from worker threads)
+        # Counters
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Binds the hub to the running loop (call from the app's startup event)."""
+        self._loop = asyncio.get_running_loop()
+
+    # --- Subscribing (event loop only) ---
+    def subscribe(self, *topics: str) -> Subscription:
+        subscription = Subscription(topics)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    # --- Publishing (any thread) ---
+    def publish(self, topic: str, message: Any) -> None:
+        with self._lock:
+            self.published += 1
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(topic, message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, topic, message)
+
+    def _deliver(self, topic: str, message: Any) -> None:
+        delivered = dropped = 0
+        for subscription in tuple(self._topics.get(topic, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                dropped += 1
+        with self._lock:
+            self.delivered += delivered
+            self.dropped += dropped
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._topics.get(topic))
+
+    def stats(self) -> Dict[str, Any]:
+        topics = dict(self._topics)
+        with self._lock:
+            return {
+                "topics": len(topics),
+                "subscriptions": len({id(s) for subscribers in topics.values() for s in subscribers}),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "queue_size": PUBSUB_QUEUE_SIZE,
+            }
+
+
+hub = PubSubHub()
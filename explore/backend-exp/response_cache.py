@@ -0,0 +1,259 @@
+# backend-exp/response_cache.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+
+logger = logging.getLogger("exp.response_cache")
+
+# --- Configuration ---
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 300))  # Backstop for writes made outside this process
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 512))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Public GET endpoints that are safe to share between users, and the tables each one reads.
+# A committed write to any of those tables drops every cached response tagged with it.
+CACHED_ROUTES: Dict[str, FrozenSet[str]] = {
+    "/api/jobs": frozenset({"jobs"}),
+    "/api/internships": frozenset({"internships"}),
+    "/api/hackathons": frozenset({"hackathons"}),
+    "/api/career_fairs": frozenset({"career_fairs"}),
+    "/api/features": frozenset({"features"}),
+    "/api/leaderboard": frozenset({"users"}),
+    "/api/feed/events": frozenset({"jobs", "internships", "hackathons"}),
+}
+
+# Response headers that describe this particular response rather than the content
+_UNCACHED_HEADERS = {b"server-timing", b"x-cache", b"date"}
+
+
+@dataclass
+class _CachedResponse:
+    __slots__ = ("status", "headers", "body", "tags", "expires_at")
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    tags: FrozenSet[str]
+    expires_at: float  # time.monotonic() deadline
+
+
+class ResponseCache:
+    """
+    LRU of serialized response bodies with a TTL, bounded by entry count and total bytes.
+
+    Entries are tagged with table names. invalidate_tags() drops every entry with a matching tag and bumps
+    the tag's generation; a response computed while a write committed is then not stored (its key's
+    generation snapshot is stale), so a slow miss can't put pre-write data back into the cache.
+    """
+
+    def __init__(self, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.stale_skips = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    # --- Internal (call with the lock held) ---
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    # --- Lookups ---
+    def get(self, key: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() >= entry.expires_at:
+                self._remove(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, tags: FrozenSet[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    def put(self, key: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+            tags: FrozenSet[str], generation: Tuple[int, ...]) -> bool:
+        if len(body) > self.max_bytes:
+            return False
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in sorted(tags)) != generation:
+                self.stale_skips += 1
+                return False
+            self._remove(key)
+            self._entries[key] = _CachedResponse(status, headers, body, tags, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(body)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            self.stores += 1
+            return True
+
+    # --- Invalidation ---
+    def invalidate_tags(self, tags) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in list(self._by_tag.pop(tag, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+            self.invalidations += 1
+        if removed:
+            logger.info(f"Response cache: dropped {removed} entries after writes to {sorted(tags)}.")
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            for tag in self._by_tag:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._entries.clear()
+            self._by_tag.clear()
+            self._bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "stale_skips": self.stale_skips,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "routes": {path: sorted(tags) for path, tags in CACHED_ROUTES.items()},
+            }
+
+
+response_cache = ResponseCache()
+
+
+# --- Write-driven invalidation (SQLAlchemy session events) ---
+_DIRTY_TABLES_KEY = "exp_response_cache_dirty_tables"
+
+def _mark_tables(session, tables) -> None:
+    session.info.setdefault(_DIRTY_TABLES_KEY, set()).update(tables)
+
+def _after_flush(session, flush_context):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+    if tables:
+        _mark_tables(session, tables)
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk query.update()/delete() bypass the flush, so catch them here
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        _mark_tables(orm_execute_state.session, {orm_execute_state.bind_mapper.local_table.name})
+
+def _after_commit(session):
+    tables = session.info.pop(_DIRTY_TABLES_KEY, None)
+    if tables:
+        response_cache.invalidate_tags(tables)
+
+def _after_rollback(session):
+    session.info.pop(_DIRTY_TABLES_KEY, None)
+
+def install_invalidation(session_factory) -> None:
+    """Invalidates cached responses whenever a session from this factory commits writes to a tagged table."""
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "do_orm_execute", _do_orm_execute)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
+
+
+# --- Middleware ---
+def _cache_key(path: str, query_string: bytes) -> str:
+    # Sorted params so ?a=1&b=2 and ?b=2&a=1 share an entry; today's date because several lists filter on it
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(params)}#{date.today().isoformat()}"
+
+class ResponseCacheMiddleware:
+    """
+    Plain ASGI middleware: serves cached bytes for GETs to CACHED_ROUTES, and on a miss records the
+    app's response and stores it if it's a 200 without cookies. Adds an X-Cache: HIT/MISS header.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        tags = CACHED_ROUTES.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if not RESPONSE_CACHE_ENABLED or tags is None or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        key = _cache_key(scope["path"], scope.get("query_string", b""))
+        cached = self.cache.get(key)
+        if cached is not None:
+            await send({"type": "http.response.start", "status": cached.status,
+                        "headers": cached.headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else cached.body})
+            return
+
+        generation = self.cache.generation(tags)
+        start_message: Dict[str, Any] = {}
+        body_parts: List[bytes] = []
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if not message.get("more_body", False) and scope["method"] == "GET":
+                    headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() not in _UNCACHED_HEADERS]
+                    if start_message.get("status") == 200 and not any(k.lower() == b"set-cookie" for k, _ in headers):
+                        self.cache.put(key, 200, headers, b"".join(body_parts), tags, generation)
+            await send(message)
+
+        await self.app(scope, receive, send_and_record)
@@ -0,0 +1,155 @@
+# backend-exp/search_index.py
+"""
+Full-text search over users, career fairs, hackathons, jobs and internships (GET /api/search).
+
+One SQLite FTS5 table holds the searchable text of every item: name/title, company and a body
+(descriptions, location, profession, ...). Triggers on the source tables keep it in sync on
+insert/update/delete, so every write path (API, admin approval, seed.sql, raw SQL) is covered.
+A search is a single MATCH ranked by bm25, whose cost follows the matches, not the catalog size.
+
+The FTS rowid encodes the item: rowid = id * 8 + type code, so a row is found (and deleted)
+by primary key and a result needs no join back to its table.
+
+Rebuild from scratch (e.g. after bulk-loading with triggers off):
+    python -m backend-exp.migrate rebuild-search          (run from explore/)
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import column, literal_column, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import SearchResult
+
+logger = logging.getLogger("exp.search")
+
+SEARCH_TABLE = "search_index"
+SEARCH_RESULTS_LIMIT = 25  # The old per-type search returned up to 5 of each of the 5 types
+SEARCH_MAX_TERMS = 8
+# bm25 column weights (name, company, body, url): a hit in the title outranks one in a description
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0, 0.0)
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    type: str                       # SearchResult.type
+    code: int                       # rowid = id * 8 + code
+    table: str
+    name: str                       # Column shown as the result name
+    company: Optional[str]
+    body: Tuple[str, ...]           # Searched, not shown
+    url: Optional[str] = None       # Column with the item's external link, if any
+    active_flag: Optional[str] = None  # Only rows where this column is true are searchable
+
+
+SOURCES: List[SearchSource] = [
+    SearchSource("user", 1, "users", "username", "current_company", ("profession", "department", "alma_mater"),
+                 active_flag="is_active"),
+    SearchSource("career_fair", 2, "career_fairs", "name", None, ("location", "description")),
+    SearchSource("hackathon", 3, "hackathons", "name", None, ("theme", "location", "description")),
+    SearchSource("job", 4, "jobs", "title", "company", ("location", "type", "description"), url="url"),
+    SearchSource("internship", 5, "internships", "title", "company", ("description",), url="url"),
+]
+_BY_CODE: Dict[int, SearchSource] = {source.code: source for source in SOURCES}
+
+
+# --- Schema (used by migration 0010 and the rebuild command) ---
+def _values(source: SearchSource, row: str) -> str:
+    """The (rowid, name, company, body, url) select list for one source row (`row` = NEW, OLD or the table name)."""
+    body = " || ' ' || ".join(f"coalesce({row}.{col}, '')" for col in source.body)
+    company = f"{row}.{source.company}" if source.company else "NULL"
+    url = f"{row}.{source.url}" if source.url else "NULL"
+    return f"{row}.id * 8 + {source.code}, {row}.{source.name}, {company}, {body}, {url}"
+
+def _searchable(source: SearchSource, row: str) -> str:
+    return f"{row}.{source.active_flag} = 1" if source.active_flag else "1"
+
+def _trigger_ddl(source: SearchSource) -> List[str]:
+    insert = f"INSERT INTO {SEARCH_TABLE} (rowid, name, company, body, url) SELECT {_values(source, 'NEW')} WHERE {_searchable(source, 'NEW')};"
+    delete = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * 8 + {source.code};"
+    # UPDATE OF the indexed columns only: counter updates (likes, scores, ...) don't touch the index
+    watched = ", ".join(dict.fromkeys(
+        col for col in (source.name, source.company, *source.body, source.url, source.active_flag) if col))
+    prefix = f"{SEARCH_TABLE}_{source.table}"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ai AFTER INSERT ON {source.table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_au AFTER UPDATE OF {watched} ON {source.table} BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ad AFTER DELETE ON {source.table} BEGIN {delete} END",
+    ]
+
+def install(conn: Connection) -> None:
+    """Creates the FTS5 table and the sync triggers (idempotent)."""
+    # Prefix indexes make the typeahead's "term*" queries index lookups; diacritics folded (é matches e)
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "name, company, body, url UNINDEXED, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    for source in SOURCES:
+        for ddl in _trigger_ddl(source):
+            conn.exec_driver_sql(ddl)
+
+def rebuild(conn: Connection) -> int:
+    """Repopulates the index from the source tables in the caller's transaction. Returns the rows indexed."""
+    conn.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    for source in SOURCES:
+        conn.exec_driver_sql(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, company, body, url) "
+            f"SELECT {_values(source, source.table)} FROM {source.table} WHERE {_searchable(source, source.table)}"
+        )
+    conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")  # Merge segments
+    indexed = conn.exec_driver_sql(f"SELECT count(*) FROM {SEARCH_TABLE}").scalar()
+    logger.info(f"Search index rebuilt: {indexed} rows.")
+    return indexed
+
+
+# --- Querying ---
+_index = table(SEARCH_TABLE, column("rowid"), column("name"), column("company"), column("url"))
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(term: str) -> Optional[str]:
+    """
+    FTS5 query for what the user typed: every word must match as a prefix ("pyth dev" -> "pyth"* "dev"*),
+    quoted so user input can't inject FTS syntax. None if there is nothing to search for.
+    """
+    tokens = _TOKEN.findall(term.lower())[:SEARCH_MAX_TERMS]
+    return " ".join(f'"{token}"*' for token in tokens) if tokens else None
+
+_RANK = f"bm25({', '.join(str(weight) for weight in SEARCH_WEIGHTS)})"
+
+def search_query(db: Session, match: str, limit: int = SEARCH_RESULTS_LIMIT):
+    # ORDER BY rank (with the weights given as a rank MATCH) is sorted inside FTS5, no temp B-tree
+    return db.query(_index.c.rowid, _index.c.name, _index.c.company, _index.c.url)\
+        .filter(text(f"{SEARCH_TABLE} MATCH :match AND rank MATCH :rank").bindparams(match=match, rank=_RANK))\
+        .order_by(literal_column("rank"))\
+        .limit(limit)
+
+def _result(rowid: int, name: str, company: Optional[str], url: Optional[str]) -> SearchResult:
+    source, item_id = _BY_CODE[rowid % 8], rowid // 8
+    if source.type == "user":
+        return SearchResult(type="user", id=item_id, name=name, url=f"/profile.html?username={name}")
+    if source.type == "career_fair":
+        return SearchResult(type="career_fair", id=item_id, name=name, url=f"/career-fairs.html#fair-{item_id}")
+    if source.type == "hackathon":
+        return SearchResult(type="hackathon", id=item_id, name=name, url=f"/explore-hackathons.html#hackathon-{item_id}")
+    if source.type == "job":
+        return SearchResult(type="job", id=item_id, name=f"{name} at {company or 'N/A'}", url=url or f"/explore.html#job-{item_id}")
+    return SearchResult(type="internship", id=item_id, name=f"{name} at {company or 'N/A'}",
+                        url=url or f"/intership.html#internship-{item_id}")
+
+def search(db: Session, term: str, limit: int = SEARCH_RESULTS_LIMIT) -> List[SearchResult]:
+    """Best matches across every searchable type, most relevant first."""
+    match = match_expression(term)
+    if match is None:
+        return []
+    return [_result(*row) for row in search_query(db, match, limit).all()]
+
+def index_stats(db: Session) -> Dict[str, int]:
+    counts = {source.type: 0 for source in SOURCES}
+    rows = db.execute(text(f"SELECT rowid % 8, count(*) FROM {SEARCH_TABLE} GROUP BY rowid % 8")).all()
+    for code, count in rows:
+        counts[_BY_CODE[code].type] = count
+    return {"rows": sum(counts.values()), **counts}
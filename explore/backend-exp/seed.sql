@@ -0,0 +1,120 @@
+-- backend-exp/seed.sql
+-- Sample data for a development database. Load with `python -m backend-exp.migrate seed`
+-- (from explore/) after `upgrade`; the schema itself lives in migrations.py.
+
+INSERT INTO users (username, email, hashed_password, is_student, is_alumni, is_admin, activity_score, achievements, alumni_gems, department, profession, alma_mater, interviews, internships, startups, current_company, milestones, advice, likes, badges, solved, links)
+VALUES
+    ('John Doe', 'john.doe@example.com', 'password123', FALSE, TRUE, FALSE, 100, 'Published a paper', 10, 'Computer Science', 'Software Engineer', 'University of Tech', 'Google, Amazon', 'Microsoft', 'MyStartup', 'TechCorp', 'Founded a company', 'Work hard!', 5, 2, 10, 3),
+    ('Jane Smith', 'jane.smith@example.com', 'securepass', TRUE, FALSE, FALSE, 120, 'Won a hackathon', 15, 'Electrical Engineering', 'Data Scientist', 'State College', 'Facebook', 'Tesla', NULL, 'DataCo', 'Led a project', 'Be curious!', 8, 3, 15, 5),
+    ('Bob Johnson', 'bob.johnson@example.com', 'test1234', FALSE, TRUE, TRUE, 80, 'Patent holder', 5, 'Mechanical Engineering', 'Product Manager', 'City University', 'Apple', NULL, 'GreenTech', 'InnovateX', 'Launched a product', 'Never give up!', 3, 1, 5, 1),
+    ('sri', 'sri@gmail.com', 'sripass', TRUE, FALSE, FALSE, 80, 'Patent holder', 5, 'Mechanical Engineering', 'Product Manager', 'City University', 'Apple', NULL, 'GreenTech', 'InnovateX', 'Launched a product', 'Never give up!', 3, 1, 5, 1);
+-- created_at is filled in by the ORM, not the database
+UPDATE users SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+
+
+INSERT INTO career_fairs (name, start_date, location, description, url)
+VALUES
+    ('Tech Career Fair', '2026-03-10', 'Tech Hall', 'Meet top tech companies', 'https://example.com/tech-career-fair'),
+    ('Engineering Expo', '2026-04-15', 'City Center', 'Explore engineering opportunities', 'https://example.com/engineering-expo');
+
+INSERT INTO internships (title, company, start_date, end_date, description, url)
+VALUES
+    ('Software Engineering Intern', 'Google', '2025-05-20', '2025-08-15', 'Work on a real-world project', 'https://careers.google.com/internships'),
+    ('Data Science Intern', 'Facebook', '2025-06-01', '2025-09-01', 'Analyze large datasets', 'https://www.metacareers.com/internships');
+
+INSERT INTO hackathons (name, start_date, location, description, theme, prize_pool, url)
+VALUES
+    ('Hackathon X', '2026-07-01', 'Online', 'Build innovative solutions', 'AI', '$10000', 'https://example.com/hackathon-x'),
+    ('CodeFest', '2026-08-01', 'University Campus', '24-hour coding challenge', 'Web Development', '$5000', 'https://example.com/codefest');
+
+INSERT INTO questions (user_id, question_text)
+VALUES
+    (1, 'What is the best programming language for beginners?'),
+    (2, 'How do I prepare for a data science interview?'),
+    (3, 'What are some good resources for learning web development?');
+
+INSERT INTO chat_contacts (name)
+VALUES
+    ('Alice'),
+    ('Bob'),
+    ('Charlie');
+
+INSERT INTO chat_messages (contact_id, sender, text, file_path)
+VALUES
+    (1, 'me', 'Hello Alice!', NULL),
+    (1, 'Alice', 'Hi John!', NULL),
+    (2, 'me', 'How is the project going?', NULL),
+    (2, 'Bob', 'It is going well', 'report.pdf');
+
+INSERT INTO daily_spark_questions (company, role, question, user_id, posted_date)
+VALUES
+    ('Google', 'Software Engineer', 'What is the most challenging bug you have ever faced?', 1, DATE('now')),
+    ('Amazon', 'Data Scientist', 'Describe a time you had to deal with messy data.', 2, DATE('now'));
+
+INSERT INTO daily_spark_answers (question_id, user, text, votes)
+VALUES
+    (1, 'Jane Smith', 'I once spent days debugging a memory leak...', 10),
+    (1, 'Bob Johnson', 'A tricky off-by-one error caused a lot of problems.', 5),
+    (2, 'John Doe', 'I had to clean a dataset with missing values and outliers.', 12);
+
+INSERT INTO jobs (title, company, location, description, salary, date_posted, type, experience, imageUrl, url)
+VALUES
+    ('Software Engineer', 'TechCorp', 'New York, NY', 'Develop cutting-edge applications', '$120,000 - $150,000', '2026-02-15', 'Full-time', '2+ years', 'https://example.com/techcorp.png', 'https://example.com/techcorp-jobs/123'),
+    ('Data Scientist', 'DataCo', 'San Francisco, CA', 'Build machine learning models', '$110,000 - $140,000', '2026-02-10', 'Full-time', '1+ years', 'https://example.com/dataco.png', 'https://example.com/dataco-careers/456'),
+    ('Web Developer', 'WebDev Solutions', 'Austin, TX', 'Create responsive web applications', '$80,000 - $100,000', '2026-02-01', 'Full-time', '1+ years', null, 'https://webdevsolutions.com/careers/789');
+
+INSERT INTO search_history (user_id, search_term)
+VALUES
+    (1, 'Software Engineer'),
+    (1, 'Data Science'),
+    (2, 'Web Development');
+
+INSERT INTO features (name, description, url, icon)
+VALUES
+    ('Profile', 'View and edit your profile', 'profile.html', 'person-circle'),
+    ('Connections', 'Manage your connections', 'connection.html', 'people'),
+    ('Jobs', 'Find job opportunities', 'career-fairs.html', 'briefcase'),
+    ('Events', 'See upcoming events', 'explore-hackathons.html', 'calendar');
+
+INSERT INTO notifications (user_id, message, type, related_id)
+VALUES
+    (1, 'Jane Smith connected with you!', 'connection', 2),
+    (2, 'New hackathon "AI Challenge" announced!', 'hackathon', 1);
+
+INSERT INTO applied_hackathons (user_id, hackathon_id)
+VALUES
+    (1, 1),
+    (2, 1);
+
+-- Insert Sample Data for expert_qa_answers
+-- Make sure user_id and question_id refer to existing users and questions
+
+-- User 1 (John Doe) answers Question 2 (Jane Smith's question)
+INSERT INTO expert_qa_answers (question_id, user_id, answer_text, is_alumni_answer, created_at, likes)
+VALUES
+    (2, 1, 'To prepare for a data science interview, focus on statistics, machine learning algorithms, coding (Python/R), and practice case studies. Also, be ready to discuss your projects in detail.', TRUE, STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW', '-2 days'), 5);
+
+-- User 2 (Jane Smith) answers Question 1 (John Doe's question)
+INSERT INTO expert_qa_answers (question_id, user_id, answer_text, is_alumni_answer, created_at, likes)
+VALUES
+    (1, 2, 'Python is often recommended for beginners due to its readability and large community. JavaScript is great for web development, and Java for enterprise applications.', FALSE, STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW', '-1 day'), 10);
+
+-- User 3 (Bob Johnson) answers Question 1 (John Doe's question)
+INSERT INTO expert_qa_answers (question_id, user_id, answer_text, is_alumni_answer, created_at, likes)
+VALUES
+    (1, 3, 'I agree, Python is excellent. Also consider C# if you are interested in game development with Unity or .NET applications.', TRUE, STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'), 7);
+
+-- Example of an answer for Question 3, by User 1
+INSERT INTO expert_qa_answers (question_id, user_id, answer_text, is_alumni_answer, created_at, likes)
+VALUES
+    (3, 1, 'For web development, check out freeCodeCamp, The Odin Project, and MDN Web Docs. They are fantastic resources.', TRUE, STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'), 12);
+
+-- Add an answer that might have a user_id problem if you were testing data integrity issues,
+-- For instance, if user with ID 4 ('sri') answers a question:
+INSERT INTO expert_qa_answers (question_id, user_id, answer_text, is_alumni_answer, created_at, likes)
+VALUES
+    (3, 4, 'Sri''s advice: Building full-stack projects is key to learning web development effectively. Use Node.js for backend if you like JavaScript.', FALSE, STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW', '-5 hours'), 3);
+
+INSERT INTO user_issues (user_id, name, email, message)
+VALUES
+    (3, 'Bob Johnson', 'bob.johnson@example.com', 'The job listings are not loading.');
\ No newline at end of file
@@ -0,0 +1,224 @@
+# backend-exp/session_store.py
+
+import asyncio
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from .database import SessionLocal
+from .models import UserSession
+
+logger = logging.getLogger("exp.sessions")
+
+# --- Configuration ---
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sql").lower()  # "sql" (shared table) or "memory" (single worker only)
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", 1800))  # Must match the session cookie max_age
+SESSION_LRU_SIZE = int(os.environ.get("SESSION_LRU_SIZE", 10000))
+SESSION_LRU_REVALIDATE_SECONDS = int(os.environ.get("SESSION_LRU_REVALIDATE_SECONDS", 30))  # Bounds how long a logout on another worker can go unnoticed
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.environ.get("SESSION_SWEEP_INTERVAL_SECONDS", 300))
+
+
+# --- Backends ---
+class MemorySessionBackend:
+    """Process-local backend. Only correct with a single worker (development)."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, token: str, user_id: int, expires_at: datetime) -> None:
+        with self._lock:
+            self._data[token] = (user_id, expires_at)
+
+    def get(self, token: str) -> Optional[Tuple[int, datetime]]:
+        with self._lock:
+            return self._data.get(token)
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._data.pop(token, None)
+
+    def delete_expired(self, now: datetime) -> int:
+        with self._lock:
+            expired = [t for t, (_, exp) in self._data.items() if exp <= now]
+            for t in expired:
+                del self._data[t]
+            return len(expired)
+
+
+class SQLSessionBackend:
+    """Stores sessions in the shared `user_sessions` table (migration 0002) so every worker sees every login."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+
+    def put(self, token: str, user_id: int, expires_at: datetime) -> None:
+        db = self._session_factory()
+        try:
+            db.add(UserSession(token=token, user_id=user_id, expires_at=expires_at))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get(self, token: str) -> Optional[Tuple[int, datetime]]:
+        db = self._session_factory()
+        try:
+            row = db.query(UserSession.user_id, UserSession.expires_at).filter(UserSession.token == token).first()
+            return (row.user_id, row.expires_at) if row else None
+        finally:
+            db.close()
+
+    def delete(self, token: str) -> None:
+        db = self._session_factory()
+        try:
+            db.query(UserSession).filter(UserSession.token == token).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def delete_expired(self, now: datetime) -> int:
+        db = self._session_factory()
+        try:
+            deleted = db.query(UserSession).filter(UserSession.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# --- Store (LRU in front of the backend) ---
+class SessionStore:
+    """
+    Session token -> user ID lookups with a bounded in-process LRU in front of a shared backend.
+    LRU entries are re-checked against the backend every SESSION_LRU_REVALIDATE_SECONDS so a
+    logout handled by another worker takes effect quickly.
+    """
+
+    def __init__(self, backend, ttl_seconds: int = SESSION_TTL_SECONDS, lru_size: int = SESSION_LRU_SIZE,
+                 revalidate_seconds: int = SESSION_LRU_REVALIDATE_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.lru_size = lru_size
+        self.revalidate_seconds = revalidate_seconds
+        # token -> (user_id, expires_at, cached_at monotonic)
+        self._lru: "OrderedDict[str, Tuple[int, datetime, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _remember(self, token: str, user_id: int, expires_at: datetime) -> None:
+        with self._lock:
+            self._lru[token] = (user_id, expires_at, time.monotonic())
+            self._lru.move_to_end(token)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+
+    def _forget(self, token: str) -> None:
+        with self._lock:
+            self._lru.pop(token, None)
+
+    def create(self, user_id: int) -> str:
+        """Creates a new session for the user and returns its token."""
+        token = secrets.token_urlsafe(32)
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        self.backend.put(token, user_id, expires_at)
+        self._remember(token, user_id, expires_at)
+        return token
+
+    def get_user_id(self, token: str) -> Optional[int]:
+        """Returns the user ID for a live session token, or None if unknown/expired."""
+        now = datetime.utcnow()
+        with self._lock:
+            cached = self._lru.get(token)
+            if cached is not None:
+                user_id, expires_at, cached_at = cached
+                if expires_at <= now:
+                    del self._lru[token]
+                    self.expired += 1
+                elif time.monotonic() - cached_at < self.revalidate_seconds:
+                    self._lru.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+            self.misses += 1
+
+        stored = self.backend.get(token)
+        if stored is None:
+            self._forget(token)
+            return None
+        user_id, expires_at = stored
+        if expires_at <= now:
+            self._forget(token)
+            self.backend.delete(token)
+            with self._lock:
+                self.expired += 1
+            return None
+        self._remember(token, user_id, expires_at)
+        return user_id
+
+    def delete(self, token: str) -> None:
+        """Removes a session (logout)."""
+        self._forget(token)
+        self.backend.delete(token)
+
+    def sweep_expired(self) -> int:
+        """Drops expired sessions from the LRU and the backend. Returns the backend row count removed."""
+        now = datetime.utcnow()
+        with self._lock:
+            stale = [t for t, (_, exp, _) in self._lru.items() if exp <= now]
+            for t in stale:
+                del self._lru[t]
+            self.expired += len(stale)
+        removed = self.backend.delete_expired(now)
+        if stale or removed:
+            logger.info(f"Session sweep removed {len(stale)} cached and {removed} stored expired sessions.")
+        return removed
+
+    async def run_sweeper(self, interval_seconds: int = SESSION_SWEEP_INTERVAL_SECONDS) -> None:
+        """Background task: periodically sweeps expired sessions until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.sweep_expired)
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "ttl_seconds": self.ttl_seconds,
+                "lru_size": len(self._lru),
+                "lru_capacity": self.lru_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+def build_session_store() -> SessionStore:
+    if SESSION_BACKEND == "memory":
+        logger.warning("Using in-memory session backend; sessions are NOT shared between workers.")
+        backend = MemorySessionBackend()
+    else:
+        backend = SQLSessionBackend()
+    return SessionStore(backend)
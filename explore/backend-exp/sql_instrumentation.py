@@ -0,0 +1,179 @@
+# backend-exp/sql_instrumentation.py
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("exp.sql")
+
+# --- Configuration ---
+SQL_INSTRUMENTATION = os.environ.get("SQL_INSTRUMENTATION", "1") == "1"
+# Same statement shape this many times in one request -> N+1 warning
+SQL_REPEAT_WARN_THRESHOLD = int(os.environ.get("SQL_REPEAT_WARN_THRESHOLD", 10))
+SQL_ROUTE_WINDOW = 500  # Recent requests per route kept for percentiles
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Collapses whitespace and expanded IN (?, ?, ...) lists so repeats of one query compare equal."""
+    return _IN_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestSQLStats:
+    """SQL counters for one request. Shared by reference with the worker threads the request's DB work runs in."""
+
+    __slots__ = ("statements", "db_seconds", "rows", "shapes", "_started")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0  # ORM objects loaded
+        self.shapes: Counter = Counter()
+        self._started: Dict[int, float] = {}  # id(cursor) -> start time
+
+    def repeated_shapes(self, threshold: int = SQL_REPEAT_WARN_THRESHOLD) -> List[Tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} queries, {self.rows} rows"'
+
+
+_current: ContextVar[Optional[RequestSQLStats]] = ContextVar("exp_sql_stats", default=None)
+
+
+# --- SQLAlchemy hooks ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats._started[id(cursor)] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = stats._started.pop(id(cursor), None)
+    if started is not None:
+        stats.db_seconds += time.perf_counter() - started
+    stats.statements += 1
+    stats.shapes[statement_shape(statement)] += 1
+
+def _on_orm_load(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+def install(engine, base) -> None:
+    """Hooks statement timing into the engine and ORM load counting into every model (call once at import)."""
+    if not SQL_INSTRUMENTATION:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(base, "load", _on_orm_load, propagate=True)
+    logger.info(f"SQL instrumentation enabled (N+1 warning above {SQL_REPEAT_WARN_THRESHOLD} repeats).")
+
+
+# --- Per-route rolling summary ---
+class RouteSQLSummary:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, route: str, stats: RequestSQLStats, repeated: bool) -> None:
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = {"requests": 0, "statements": 0, "db_ms": 0.0, "rows": 0, "max_statements": 0,
+                         "n_plus_one_warnings": 0, "recent": deque(maxlen=SQL_ROUTE_WINDOW)}
+                self._routes[route] = entry
+            db_ms = stats.db_seconds * 1000
+            entry["requests"] += 1
+            entry["statements"] += stats.statements
+            entry["db_ms"] += db_ms
+            entry["rows"] += stats.rows
+            entry["max_statements"] = max(entry["max_statements"], stats.statements)
+            entry["n_plus_one_warnings"] += int(repeated)
+            entry["recent"].append((stats.statements, db_ms))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Routes ordered by total DB time, with averages and recent p95s."""
+        def p95(values):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+
+        with self._lock:
+            items = [(route, dict(entry), list(entry["recent"])) for route, entry in self._routes.items()]
+        summary = []
+        for route, entry, recent in items:
+            requests = entry["requests"]
+            p95_db_ms = p95([ms for _, ms in recent])
+            summary.append({
+                "route": route,
+                "requests": requests,
+                "avg_statements": round(entry["statements"] / requests, 2),
+                "max_statements": entry["max_statements"],
+                "p95_statements": p95([n for n, _ in recent]),
+                "avg_db_ms": round(entry["db_ms"] / requests, 2),
+                "p95_db_ms": round(p95_db_ms, 2) if p95_db_ms is not None else None,
+                "total_db_ms": round(entry["db_ms"], 2),
+                "avg_rows": round(entry["rows"] / requests, 2),
+                "n_plus_one_warnings": entry["n_plus_one_warnings"],
+            })
+        summary.sort(key=lambda item: item["total_db_ms"], reverse=True)
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+route_summary = RouteSQLSummary()
+
+
+# --- Middleware ---
+def _route_name(scope) -> str:
+    route = scope.get("route")  # Set by FastAPI's router once the request has been matched
+    path = getattr(route, "path", None) or "<unmatched>"
+    return f"{scope.get('method', '')} {path}"
+
+class SQLInstrumentationMiddleware:
+    """
+    Plain ASGI middleware: gives each HTTP request its own RequestSQLStats, adds a Server-Timing
+    header, and folds the numbers into the per-route summary when the request finishes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+        stats = RequestSQLStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = _route_name(scope)
+            repeated = stats.repeated_shapes()
+            for shape, count in repeated:
+                logger.warning(f"Possible N+1 in {route}: same statement ran {count} times in one request: {shape[:200]}")
+            if scope.get("route") is not None:  # Don't let 404 probes grow the summary
+                route_summary.record(route, stats, bool(repeated))
@@ -0,0 +1,303 @@
+# backend-exp/task_queue.py
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, engine
+from .models import BackgroundJob
+
+logger = logging.getLogger("exp.tasks")
+
+# --- Configuration ---
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", 2))
+TASK_POLL_INTERVAL_SECONDS = float(os.environ.get("TASK_POLL_INTERVAL_SECONDS", 5))  # Idle re-check; enqueue wakes workers sooner
+TASK_MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", 5))
+TASK_RETRY_BASE_SECONDS = float(os.environ.get("TASK_RETRY_BASE_SECONDS", 5))  # Backoff: base * 2^(attempt-1), jittered
+TASK_RETRY_MAX_SECONDS = float(os.environ.get("TASK_RETRY_MAX_SECONDS", 900))
+TASK_LEASE_SECONDS = int(os.environ.get("TASK_LEASE_SECONDS", 600))  # A 'running' job older than this is assumed lost and requeued
+TASK_RETENTION_HOURS = int(os.environ.get("TASK_RETENTION_HOURS", 72))  # Done jobs (and their idempotency keys) kept this long
+TASK_MAINTENANCE_INTERVAL_SECONDS = 60
+
+_jobs = BackgroundJob.__table__
+
+
+@dataclass
+class TaskSpec:
+    name: str
+    handler: Callable[[Dict[str, Any]], Any]  # Sync handlers run in a worker thread, async ones on the loop
+    max_attempts: int
+
+
+TASKS: Dict[str, TaskSpec] = {}
+
+def background_task(name: str, max_attempts: int = TASK_MAX_ATTEMPTS):
+    """Registers a handler for jobs of this task name. It gets the JSON payload; raising means retry."""
+    def decorator(handler):
+        TASKS[name] = TaskSpec(name, handler, max_attempts)
+        return handler
+    return decorator
+
+
+# --- Enqueueing ---
+_WAKE_KEY = "exp_task_queue_wake"
+
+def enqueue(db: Session, task: str, payload: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None,
+            delay_seconds: float = 0) -> None:
+    """
+    Adds a job to the session's transaction (does not commit). The job becomes visible to the workers
+    only when the caller commits, so it runs if and only if the change that triggered it was saved.
+    A job whose idempotency_key already exists is silently skipped.
+    """
+    if task not in TASKS:
+        raise ValueError(f"Unknown background task '{task}'")
+    now = datetime.utcnow()
+    db.execute(sqlite_insert(_jobs).values(
+        task=task,
+        payload=json.dumps(payload or {}),
+        idempotency_key=idempotency_key,
+        status="pending",
+        attempts=0,
+        max_attempts=TASKS[task].max_attempts,
+        run_after=now + timedelta(seconds=delay_seconds),
+        created_at=now,
+        updated_at=now,
+    ).on_conflict_do_nothing(index_elements=["idempotency_key"]))
+    db.info[_WAKE_KEY] = True
+
+def _wake_after_commit(session):
+    if session.info.pop(_WAKE_KEY, False):
+        task_queue.wake()
+
+def _drop_wake_on_rollback(session):
+    session.info.pop(_WAKE_KEY, None)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, so a failing dependency isn't hammered in lockstep."""
+    delay = min(TASK_RETRY_MAX_SECONDS, TASK_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class TaskQueue:
+    """
+    SQLite-backed job queue drained by a small pool of asyncio workers.
+
+    Workers claim the oldest due job with a single UPDATE ... RETURNING (so two workers never get the same
+    job), run its handler, then mark it done, or reschedule it with backoff until max_attempts, after
+    which it stays 'failed' for an admin to inspect or retry.
+    """
+
+    def __init__(self, bind=engine, workers: int = TASK_WORKERS):
+        self.bind = bind
+        self.workers = workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self._last_maintenance = 0.0
+        # Counters
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.run_ms_total = 0.0
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        """Starts the workers on the running loop (call from the app's startup event)."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Task queue started with {self.workers} workers ({len(TASKS)} registered tasks).")
+
+    async def stop(self) -> None:
+        for worker in self._tasks:
+            worker.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # A job interrupted mid-run stays 'running' and is requeued once its lease expires
+
+    def wake(self) -> None:
+        """Thread-safe nudge so idle workers look for new jobs now instead of at the next poll."""
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # --- Worker loop ---
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                if index == 0 and time.monotonic() - self._last_maintenance >= TASK_MAINTENANCE_INTERVAL_SECONDS:
+                    self._last_maintenance = time.monotonic()
+                    await asyncio.to_thread(self.maintenance)
+                self._wake.clear()  # Before claiming, so a job committed during the claim still wakes us
+                job = await asyncio.to_thread(self.claim)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=TASK_POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task worker {index} error: {e}", exc_info=True)
+                await asyncio.sleep(TASK_POLL_INTERVAL_SECONDS)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        next_due = select(_jobs.c.id).where(_jobs.c.status == "pending", _jobs.c.run_after <= now)\
+            .order_by(_jobs.c.run_after, _jobs.c.id).limit(1).scalar_subquery()
+        with self.bind.begin() as conn:
+            row = conn.execute(
+                update(_jobs).where(_jobs.c.id == next_due, _jobs.c.status == "pending")
+                .values(status="running", locked_at=now, attempts=_jobs.c.attempts + 1, updated_at=now)
+                .returning(_jobs.c.id, _jobs.c.task, _jobs.c.payload, _jobs.c.attempts, _jobs.c.max_attempts, _jobs.c.created_at)
+            ).first()
+        return dict(row._mapping) if row is not None else None
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        spec = TASKS.get(job["task"])
+        started = time.perf_counter()
+        try:
+            if spec is None:
+                raise LookupError(f"No handler registered for task '{job['task']}'")
+            payload = json.loads(job["payload"])
+            if inspect.iscoroutinefunction(spec.handler):
+                await spec.handler(payload)
+            else:
+                await asyncio.to_thread(spec.handler, payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            delay = await asyncio.to_thread(self._record_failure, job, e)
+            if delay is not None and delay < TASK_POLL_INTERVAL_SECONDS:
+                self._loop.call_later(delay, self._wake.set)  # Retry on time rather than at the next poll
+            return
+        run_ms = (time.perf_counter() - started) * 1000
+        await asyncio.to_thread(self._finish, job["id"])
+        with self._lock:
+            self.succeeded += 1
+            self.run_ms_total += run_ms
+        logger.info(f"Task '{job['task']}' (job {job['id']}) done in {run_ms:.1f} ms, "
+                    f"{(datetime.utcnow() - job['created_at']).total_seconds():.2f}s after enqueue.")
+
+    def _finish(self, job_id: int) -> None:
+        now = datetime.utcnow()
+        with self.bind.begin() as conn:
+            conn.execute(update(_jobs).where(_jobs.c.id == job_id)
+                         .values(status="done", finished_at=now, updated_at=now, last_error=None))
+
+    def _record_failure(self, job: Dict[str, Any], error: Exception) -> Optional[float]:
+        """Reschedules the job with backoff, or marks it failed. Returns the retry delay (None if it won't be retried)."""
+        now = datetime.utcnow()
+        delay = None
+        message = f"{type(error).__name__}: {error}"[:2000]
+        if job["attempts"] >= job["max_attempts"]:
+            values = {"status": "failed", "finished_at": now}
+            with self._lock:
+                self.dead += 1
+            logger.error(f"Task '{job['task']}' (job {job['id']}) failed permanently after {job['attempts']} attempts: {message}")
+        else:
+            delay = retry_delay(job["attempts"])
+            values = {"status": "pending", "run_after": now + timedelta(seconds=delay)}
+            with self._lock:
+                self.retried += 1
+            logger.warning(f"Task '{job['task']}' (job {job['id']}) attempt {job['attempts']} failed, retrying in {delay:.0f}s: {message}")
+        with self.bind.begin() as conn:
+            conn.execute(update(_jobs).where(_jobs.c.id == job["id"])
+                         .values(last_error=message, locked_at=None, updated_at=now, **values))
+        return delay
+
+    # --- Maintenance ---
+    def maintenance(self) -> None:
+        """Requeues jobs whose worker died (lease expired) and prunes old done jobs."""
+        now = datetime.utcnow()
+        with self.bind.begin() as conn:
+            requeued = conn.execute(
+                update(_jobs).where(_jobs.c.status == "running", _jobs.c.locked_at < now - timedelta(seconds=TASK_LEASE_SECONDS))
+                .values(status="pending", run_after=now, locked_at=None, updated_at=now)
+            ).rowcount
+            pruned = conn.execute(
+                _jobs.delete().where(_jobs.c.status == "done", _jobs.c.finished_at < now - timedelta(hours=TASK_RETENTION_HOURS))
+            ).rowcount
+        if requeued or pruned:
+            logger.info(f"Task queue maintenance: requeued {requeued} stale jobs, pruned {pruned} done jobs.")
+
+    def retry(self, job_id: int) -> bool:
+        """Puts a failed job back in the queue with a fresh attempt budget (admin action)."""
+        now = datetime.utcnow()
+        with self.bind.begin() as conn:
+            updated = conn.execute(
+                update(_jobs).where(_jobs.c.id == job_id, _jobs.c.status == "failed")
+                .values(status="pending", attempts=0, run_after=now, finished_at=None, updated_at=now)
+            ).rowcount
+        if updated:
+            self.wake()
+        return bool(updated)
+
+    # --- Stats ---
+    def stats(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        with self.bind.connect() as conn:
+            by_status = {status: count for status, count in conn.execute(
+                select(_jobs.c.status, func.count()).group_by(_jobs.c.status))}
+            by_task: Dict[str, Dict[str, int]] = {}
+            for task, status, count in conn.execute(
+                    select(_jobs.c.task, _jobs.c.status, func.count()).where(_jobs.c.status.in_(("pending", "running", "failed")))
+                    .group_by(_jobs.c.task, _jobs.c.status)):
+                by_task.setdefault(task, {})[status] = count
+            oldest_due = conn.execute(select(func.min(_jobs.c.run_after))
+                                      .where(_jobs.c.status == "pending", _jobs.c.run_after <= now)).scalar()
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running_workers": sum(1 for worker in self._tasks if not worker.done()),
+                "registered_tasks": sorted(TASKS),
+                "depth": by_status.get("pending", 0),
+                "by_status": by_status,
+                "by_task": by_task,
+                # How long the oldest due job has been waiting for a worker
+                "lag_seconds": round((now - oldest_due).total_seconds(), 3) if oldest_due is not None else 0.0,
+                "succeeded": self.succeeded,
+                "retried": self.retried,
+                "dead": self.dead,
+                "avg_run_ms": round(self.run_ms_total / self.succeeded, 2) if self.succeeded else None,
+            }
+
+    def failed_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self.bind.connect() as conn:
+            rows = conn.execute(
+                select(_jobs.c.id, _jobs.c.task, _jobs.c.payload, _jobs.c.attempts, _jobs.c.last_error,
+                       _jobs.c.created_at, _jobs.c.finished_at)
+                .where(_jobs.c.status == "failed").order_by(_jobs.c.id.desc()).limit(limit))
+            return [dict(row._mapping) for row in rows]
+
+
+task_queue = TaskQueue()
+
+
+def submit(task: str, payload: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None,
+           delay_seconds: float = 0) -> None:
+    """enqueue() in its own short transaction, for callers with no write of their own to attach the job to."""
+    with SessionLocal() as db:
+        enqueue(db, task, payload, idempotency_key, delay_seconds)
+        db.commit()
+
+
+def install_wakeup(session_factory=SessionLocal) -> None:
+    """Wakes the workers when a session that enqueued jobs commits (call once at import)."""
+    event.listen(session_factory, "after_commit", _wake_after_commit)
+    event.listen(session_factory, "after_rollback", _drop_wake_on_rollback)
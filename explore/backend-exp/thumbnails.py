@@ -0,0 +1,338 @@
+# backend-exp/thumbnails.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+
+from .database import BASE_DIR, SessionLocal
+from .db_executor import run_db
+from .file_storage import (
+    FILE_CACHE_CONTROL, StoredFileResponse, StoredUpload, etag_matches, object_path, stored_file_response, thumbnail_path,
+)
+from .models import Job, StoredFile
+from .task_queue import background_task, enqueue
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Optional dependency: without Pillow every size is served as the original
+    Image = ImageOps = None
+
+logger = logging.getLogger("exp.thumbnails")
+
+# --- Configuration ---
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", min(2, os.cpu_count() or 1)))  # Processes; 0 = render in a thread
+THUMBNAIL_MAX_PENDING = int(os.environ.get("THUMBNAIL_MAX_PENDING", 16))  # Past this, requests get the original instead of waiting
+THUMBNAIL_QUALITY = int(os.environ.get("THUMBNAIL_QUALITY", 80))  # WebP quality
+THUMBNAIL_MAX_SOURCE_PIXELS = int(os.environ.get("THUMBNAIL_MAX_SOURCE_PIXELS", 50_000_000))  # Bigger images aren't decoded (decompression bombs)
+THUMBNAILS_ENABLED = Image is not None and os.environ.get("THUMBNAILS_ENABLED", "1") != "0"
+
+# Longest edge in pixels; images are never upscaled. "original" (or no size) is the uploaded file itself.
+THUMBNAIL_SIZES = {"sm": 160, "md": 480, "lg": 1024}
+THUMBNAIL_SOURCE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+THUMBNAIL_CONTENT_TYPE = "image/webp"
+
+# Job images: an imageUrl under /static/ is a local file we can resize; anything else (external URLs) is redirected to as-is
+STATIC_DIR = os.path.join(os.path.dirname(BASE_DIR), "frontend-exp", "static")  # Same directory exp.py mounts at /static
+LOCAL_IMAGE_PREFIX = "/static/"
+LOCAL_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+JOB_IMAGE_CACHE_CONTROL = "public, max-age=3600"  # The file behind a job's image can change; the ETag makes revalidation cheap
+FALLBACK_CACHE_CONTROL = "private, no-cache"  # Original served because no preview was ready: don't let the browser keep it for good
+
+
+# --- Rendering (runs in the worker processes) ---
+def _render_variants(source_path: str, targets: Dict[str, Tuple[int, str]], quality: int, max_pixels: int) -> Dict[str, int]:
+    """
+    Decodes the image once and writes every variant, largest first, each downsampled from the previous one.
+    Returns {size: bytes written}; empty if the file isn't an image Pillow can (or should) decode.
+    """
+    try:
+        with Image.open(source_path) as image:
+            if image.width * image.height > max_pixels:
+                return {}
+            image.draft("RGB", (max(edge for edge, _ in targets.values()),) * 2)  # JPEG: decode at reduced scale when possible
+            image = ImageOps.exif_transpose(image)  # Phone photos: apply the orientation tag before it's stripped
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+    except Exception:
+        return {}
+    written = {}
+    for size, (edge, dest) in sorted(targets.items(), key=lambda item: item[1][0], reverse=True):
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        temp_path = f"{dest}.{secrets.token_hex(4)}.tmp"
+        image.save(temp_path, "WEBP", quality=quality, method=4)
+        os.replace(temp_path, dest)  # Readers see the whole variant or none
+        written[size] = os.path.getsize(dest)
+    return written
+
+def _warm_up_worker() -> None:
+    Image.init()  # Loads the format plugins once per process
+
+
+class ThumbnailPool:
+    """
+    Renders previews in a process pool, so resizing (CPU-bound, holds the GIL) never stalls the
+    event loop or the request threads. Upload-time renders come from the task queue; a request for a
+    missing variant renders it on demand unless the pool is saturated, in which case the original is served.
+    """
+
+    def __init__(self, workers: int = THUMBNAIL_WORKERS, max_pending: int = THUMBNAIL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._undecodable: Set[str] = set()  # Digests that aren't images after all: not retried on every request
+        # Counters
+        self.rendered = 0
+        self.undecodable = 0
+        self.failed = 0
+        self.saturated = 0
+        self.render_ms_total = 0.0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0 or not THUMBNAILS_ENABLED:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                logger.info(f"Thumbnail pool started with {self.workers} worker processes.")
+            return self._executor
+
+    def start(self) -> None:
+        if not THUMBNAILS_ENABLED:
+            logger.warning("Pillow is not installed (or THUMBNAILS_ENABLED=0): image previews are disabled, originals are served.")
+            return
+        executor = self._get_executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(_warm_up_worker)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self.saturated += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _finish(self, digest: str, written: Optional[Dict[str, int]], started: float) -> None:
+        """written: what the render produced ({} = not an image), or None if it failed (worker died, disk full...)."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._in_flight -= 1
+            self.render_ms_total += elapsed_ms
+            if written:
+                self.rendered += 1
+            elif written is None:
+                self.failed += 1
+            else:
+                self.undecodable += 1
+                if len(self._undecodable) < 10_000:
+                    self._undecodable.add(digest)
+        if written:
+            logger.info(f"Rendered previews for {digest[:12]}… in {elapsed_ms:.0f} ms: {written}")
+        elif written is not None:
+            logger.warning(f"Could not render previews for {digest[:12]}… (not a decodable image, or too large).")
+
+    @staticmethod
+    def _targets(digest: str) -> Dict[str, Tuple[int, str]]:
+        return {size: (edge, thumbnail_path(digest, size)) for size, edge in THUMBNAIL_SIZES.items()}
+
+    def render(self, digest: str, source_path: str) -> bool:
+        """Blocking render of every size (for task-queue worker threads). Raises if saturated, so the job retries."""
+        if not self._acquire():
+            raise RuntimeError("Thumbnail pool saturated")
+        started = time.perf_counter()
+        written = None
+        try:
+            args = (source_path, self._targets(digest), THUMBNAIL_QUALITY, THUMBNAIL_MAX_SOURCE_PIXELS)
+            executor = self._get_executor()
+            written = executor.submit(_render_variants, *args).result() if executor else _render_variants(*args)
+        finally:
+            self._finish(digest, written, started)
+        return bool(written)
+
+    async def render_async(self, digest: str, source_path: str) -> bool:
+        """Renders every size off the event loop; False (without waiting) if the pool is saturated or the image is undecodable."""
+        if digest in self._undecodable or not self._acquire():
+            return False
+        started = time.perf_counter()
+        written = None
+        try:
+            loop = asyncio.get_running_loop()
+            written = await loop.run_in_executor(self._get_executor(), _render_variants, source_path, self._targets(digest),
+                                                 THUMBNAIL_QUALITY, THUMBNAIL_MAX_SOURCE_PIXELS)
+        except Exception as e:
+            logger.error(f"Preview render for {digest[:12]}… failed: {e}", exc_info=True)
+        finally:
+            self._finish(digest, written, started)
+        return bool(written)
+
+    def is_undecodable(self, digest: str) -> bool:
+        return digest in self._undecodable
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            renders = self.rendered + self.undecodable + self.failed
+            return {
+                "enabled": THUMBNAILS_ENABLED,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "rendered": self.rendered,
+                "undecodable": self.undecodable,
+                "failed": self.failed,
+                "saturated": self.saturated,
+                "avg_render_ms": round(self.render_ms_total / renders, 2) if renders else None,
+                "sizes": THUMBNAIL_SIZES,
+            }
+
+
+thumbnail_pool = ThumbnailPool()
+
+
+# --- Source files ---
+def has_all_variants(digest: str) -> bool:
+    return all(os.path.isfile(thumbnail_path(digest, size)) for size in THUMBNAIL_SIZES)
+
+def local_image_path(image_url: Optional[str]) -> Optional[str]:
+    """The file behind a /static/ image URL, or None for external/missing images (never a path outside STATIC_DIR)."""
+    if not image_url or not image_url.startswith(LOCAL_IMAGE_PREFIX):
+        return None
+    root = os.path.realpath(STATIC_DIR)
+    path = os.path.realpath(os.path.join(root, image_url[len(LOCAL_IMAGE_PREFIX):].split("?", 1)[0]))
+    if not path.startswith(root + os.sep) or os.path.splitext(path)[1].lower() not in LOCAL_IMAGE_EXTENSIONS:
+        return None
+    return path if os.path.isfile(path) else None
+
+_static_digests: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, sha256): hashed again only when the file changes
+_static_digests_lock = threading.Lock()
+
+def static_image_digest(path: str) -> str:
+    """Content hash of a local image, the cache key of its previews (same key space as uploads)."""
+    stat_result = os.stat(path)
+    with _static_digests_lock:
+        cached = _static_digests.get(path)
+    if cached and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+        return cached[2]
+    hasher = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _static_digests_lock:
+        _static_digests[path] = (stat_result.st_mtime_ns, stat_result.st_size, digest)
+    return digest
+
+
+# --- Background generation (queued in the transaction that stores the upload / publishes the job) ---
+def enqueue_upload_thumbnails(db: Session, upload: StoredUpload) -> None:
+    """Queues previews for an uploaded image (does not commit). No-op for other files, or without Pillow."""
+    if THUMBNAILS_ENABLED and upload.content_type in THUMBNAIL_SOURCE_TYPES:
+        enqueue(db, "generate_upload_thumbnails", {"sha256": upload.sha256}, idempotency_key=f"thumbnails:{upload.sha256}")
+
+def enqueue_job_image_thumbnails(db: Session, job: Job) -> None:
+    """Queues previews for a job whose imageUrl is a local /static/ image (does not commit)."""
+    if THUMBNAILS_ENABLED and local_image_path(job.imageUrl):
+        enqueue(db, "generate_job_image_thumbnails", {"job_id": job.id}, idempotency_key=f"thumbnails:job:{job.id}")
+
+@background_task("generate_upload_thumbnails", max_attempts=3)
+def generate_upload_thumbnails(payload: Dict[str, Any]) -> None:
+    digest = payload["sha256"]
+    if os.path.isfile(object_path(digest)) and not has_all_variants(digest):  # Swept meanwhile, or already rendered on demand
+        thumbnail_pool.render(digest, object_path(digest))
+
+@background_task("generate_job_image_thumbnails", max_attempts=3)
+def generate_job_image_thumbnails(payload: Dict[str, Any]) -> None:
+    with SessionLocal() as db:
+        image_url = db.query(Job.imageUrl).filter(Job.id == payload["job_id"]).scalar()
+    path = local_image_path(image_url)
+    if path is None:
+        return
+    digest = static_image_digest(path)
+    if not has_all_variants(digest):
+        thumbnail_pool.render(digest, path)
+
+
+# --- Serving ---
+def check_size(size: Optional[str]) -> Optional[str]:
+    """The requested variant, None for the original; 400 for an unknown size."""
+    if size is None or size == "original":
+        return None
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown size '{size}'. Use one of: original, {', '.join(THUMBNAIL_SIZES)}.")
+    return size
+
+async def _variant(digest: str, source_path: str, size: str) -> Tuple[Optional[str], bool]:
+    """
+    (variant path, settled): the cached preview, rendered now if missing. None means serve the original;
+    settled says whether that's final (the preview isn't smaller, or the file isn't an image) or just for now.
+    """
+    path = thumbnail_path(digest, size)
+    if not os.path.isfile(path) and not await thumbnail_pool.render_async(digest, source_path):
+        return None, thumbnail_pool.is_undecodable(digest)
+    try:
+        if os.path.getsize(path) >= os.path.getsize(source_path):
+            return None, True  # Already small (e.g. an icon): re-encoding didn't save anything
+    except FileNotFoundError:
+        return None, False
+    return path, True
+
+def _variant_response(path: str, etag: str, filename: str, cache_control: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control, "X-Content-Type-Options": "nosniff"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return StoredFileResponse(path, etag, THUMBNAIL_CONTENT_TYPE, filename, headers)
+
+async def stored_file_variant_response(stored: StoredFile, size: Optional[str], if_none_match: Optional[str] = None) -> Response:
+    """An uploaded file at the requested size: its cached preview for images, else (or without Pillow) the file itself."""
+    size = check_size(size)
+    if size is None or not THUMBNAILS_ENABLED or stored.content_type not in THUMBNAIL_SOURCE_TYPES:
+        return stored_file_response(stored, if_none_match)
+    path, settled = await _variant(stored.sha256, object_path(stored.sha256), size)
+    if path is None:
+        return stored_file_response(stored, if_none_match, cache_control=FILE_CACHE_CONTROL if settled else FALLBACK_CACHE_CONTROL)
+    stem = os.path.splitext(stored.original_name or stored.sha256)[0]
+    return _variant_response(path, f'"{stored.sha256}-{size}"', f"{stem}_{size}.webp", FILE_CACHE_CONTROL, if_none_match)
+
+def is_redirectable_image_url(image_url: str) -> bool:
+    """Our own /static/ images and absolute http(s) URLs; anything else a poster typed (javascript:,
+    data:, //host, ...) must not become a redirect from our domain."""
+    if image_url.startswith(LOCAL_IMAGE_PREFIX):
+        return True
+    parts = urlsplit(image_url)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+async def job_image_response(job: Job, size: Optional[str], if_none_match: Optional[str] = None) -> Response:
+    """A job's image at the requested size. External images (and the original) are redirects to imageUrl."""
+    size = check_size(size)
+    if not job.imageUrl or not is_redirectable_image_url(job.imageUrl):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job has no image")
+    path = local_image_path(job.imageUrl)
+    if size is None or path is None or not THUMBNAILS_ENABLED:
+        return RedirectResponse(job.imageUrl, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    # Hashing a changed file is blocking I/O: same bounded worker threads as the DB work
+    digest = await run_db(static_image_digest, path)
+    variant, _ = await _variant(digest, path, size)
+    if variant is None:
+        return RedirectResponse(job.imageUrl, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    return _variant_response(variant, f'"{digest}-{size}"', f"job-{job.id}_{size}.webp", JOB_IMAGE_CACHE_CONTROL, if_none_match)
@@ -0,0 +1,204 @@
+# backend-exp/username_index.py
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .db_executor import run_db
+from .models import ConnectionUser, User, UserConnection
+
+logger = logging.getLogger("exp.usernames")
+
+# --- Configuration ---
+USERNAME_SEARCH_LIMIT = 10
+EXCLUSION_CACHE_TTL_SECONDS = int(os.environ.get("EXCLUSION_CACHE_TTL_SECONDS", 300))  # Safety net; commits invalidate sooner
+EXCLUSION_CACHE_MAX_ENTRIES = int(os.environ.get("EXCLUSION_CACHE_MAX_ENTRIES", 10000))
+USERNAME_INDEX_RELOAD_SECONDS = int(os.environ.get("USERNAME_INDEX_RELOAD_SECONDS", 60))  # Picks up other workers' user changes
+
+
+class UsernameIndex:
+    """
+    Active users' usernames in a sorted array for prefix lookups (bisect), with the fields the
+    connection typeahead shows, held in memory. Built at startup and kept current by the session
+    hooks below (registration, renames, deactivation), so a keystroke never touches the database.
+
+    Also caches each user's "not suggestable" set (themselves plus everyone they have a connection
+    or pending request with), invalidated when either side's connections change.
+    Each worker holds its own copy: its own commits apply at once, other workers' user changes
+    show up at the next periodic reload and their connection changes within the exclusion TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = EXCLUSION_CACHE_TTL_SECONDS, max_entries: int = EXCLUSION_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._keys: List[Tuple[str, int]] = []  # (lowercased username, id), sorted
+        self._users: Dict[int, Tuple[str, ConnectionUser]] = {}  # id -> (key, display row)
+        self._exclusions: "OrderedDict[int, Tuple[FrozenSet[int], float]]" = OrderedDict()
+        # Bumped by invalidate_exclusions so a query that started before it doesn't cache its stale result.
+        # Bounded like the cache: when it outgrows max_entries it's cleared and the epoch moves on instead.
+        self._generations: Dict[int, int] = {}
+        self._generation_epoch = 0
+        self._lock = threading.Lock()
+        self.loaded = False
+        # Counters
+        self.lookups = 0
+        self.exclusion_hits = 0
+        self.exclusion_misses = 0
+
+    # --- Index ---
+    def load(self, db: Session) -> int:
+        """(Re)builds the index from the users table. Returns the number of users indexed."""
+        rows = db.query(User.id, User.username, User.profession).filter(User.is_active == True).all()
+        users = {user_id: (username.lower(), ConnectionUser(id=user_id, username=username, profession=profession))
+                 for user_id, username, profession in rows}
+        keys = sorted((key, user_id) for user_id, (key, _) in users.items())
+        with self._lock:
+            self._users, self._keys = users, keys
+            self._exclusions.clear()
+            self.loaded = True
+        logger.info(f"Username index loaded: {len(keys)} active users.")
+        return len(keys)
+
+    def _remove_locked(self, user_id: int) -> None:
+        entry = self._users.pop(user_id, None)
+        if entry is not None:
+            position = bisect.bisect_left(self._keys, (entry[0], user_id))
+            if position < len(self._keys) and self._keys[position] == (entry[0], user_id):
+                del self._keys[position]
+
+    def put(self, user_id: int, username: str, profession: Optional[str], is_active: bool = True) -> None:
+        """Adds or updates a user; an inactive user is removed (deactivated accounts aren't suggested)."""
+        with self._lock:
+            self._remove_locked(user_id)
+            if is_active and username:
+                key = username.lower()
+                self._users[user_id] = (key, ConnectionUser(id=user_id, username=username, profession=profession))
+                bisect.insort(self._keys, (key, user_id))
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def search(self, prefix: str, exclude: FrozenSet[int] = frozenset(), limit: int = USERNAME_SEARCH_LIMIT) -> List[ConnectionUser]:
+        """Users whose username starts with `prefix` (case-insensitive), alphabetically, skipping `exclude`."""
+        prefix = prefix.lower()
+        results = []
+        with self._lock:
+            self.lookups += 1
+            position = bisect.bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                key, user_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if user_id not in exclude:
+                    results.append(self._users[user_id][1])
+                position += 1
+        return results
+
+    # --- Per-user exclusion sets ---
+    def exclusions(self, db: Session, user_id: int) -> FrozenSet[int]:
+        """The user and everyone they share a connection row with (any status); one query on a cache miss."""
+        with self._lock:
+            entry = self._exclusions.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._exclusions.move_to_end(user_id)
+                self.exclusion_hits += 1
+                return entry[0]
+            self.exclusion_misses += 1
+            generation = (self._generation_epoch, self._generations.get(user_id, 0))
+        rows = exclusions_query(db, user_id).all()
+        excluded = frozenset({user_id, *(other for pair in rows for other in pair)})
+        with self._lock:
+            if generation != (self._generation_epoch, self._generations.get(user_id, 0)):
+                return excluded  # Invalidated while querying: use it for this request, don't cache it
+            self._exclusions[user_id] = (excluded, time.monotonic() + self.ttl_seconds)
+            self._exclusions.move_to_end(user_id)
+            while len(self._exclusions) > self.max_entries:
+                self._exclusions.popitem(last=False)
+        return excluded
+
+    def invalidate_exclusions(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._exclusions.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            if len(self._generations) > self.max_entries:
+                self._generations.clear()
+                self._generation_epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exclusion_hits + self.exclusion_misses
+            return {
+                "loaded": self.loaded,
+                "users": len(self._keys),
+                "lookups": self.lookups,
+                "exclusion_entries": len(self._exclusions),
+                "exclusion_hits": self.exclusion_hits,
+                "exclusion_misses": self.exclusion_misses,
+                "exclusion_hit_ratio": round(self.exclusion_hits / lookups, 4) if lookups else None,
+            }
+
+
+username_index = UsernameIndex()
+
+def exclusions_query(db: Session, user_id: int):
+    """Both ends of every connection row the user is on (either index on user_connections serves one side)."""
+    return db.query(UserConnection.requester_id, UserConnection.receiver_id)\
+        .filter(or_(UserConnection.requester_id == user_id, UserConnection.receiver_id == user_id))
+
+
+# --- Keeping it current (SQLAlchemy session events) ---
+# User and connection changes are collected at flush and applied only once the transaction commits.
+_PENDING_KEY = "exp_username_index"
+
+def _after_flush(session, flush_context):
+    pending = None
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            pending = pending or session.info.setdefault(_PENDING_KEY, {"users": {}, "connections": set()})
+            if obj in session.deleted:
+                pending["users"][obj.id] = (None, None, False)
+            else:
+                pending["users"][obj.id] = (obj.username, obj.profession, obj.is_active is not False)
+        elif isinstance(obj, UserConnection):
+            pending = pending or session.info.setdefault(_PENDING_KEY, {"users": {}, "connections": set()})
+            pending["connections"].update((obj.requester_id, obj.receiver_id))
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        for user_id, (username, profession, active) in pending["users"].items():
+            username_index.put(user_id, username, profession, active)
+        username_index.invalidate_exclusions(pending["connections"])
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def install_sync(session_factory=SessionLocal) -> None:
+    """Applies committed user/connection changes to the index (call once at import)."""
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
+
+def load_username_index() -> int:
+    with SessionLocal() as db:
+        return username_index.load(db)
+
+async def run_reloader(interval_seconds: int = USERNAME_INDEX_RELOAD_SECONDS) -> None:
+    """Background task: rebuilds the index periodically (changes committed by other workers) until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_db(load_username_index)
+        except Exception as e:
+            logger.error(f"Username index reload failed: {e}", exc_info=True)
@@ -65,6 +65,18 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // List endpoints return one page at a time; fetchAllPages (static/pagination.js) follows X-Next-Cursor
+    async function apiCallAllPages(url) {
+        const { response, items } = await fetchAllPages(url, { credentials: 'include' });
+        if (!response.ok) {
+            const responseData = await response.json().catch(() => ({ detail: "Non-JSON response or empty response from server" }));
+            console.error(`API Error (GET ${url}): Status ${response.status}`, responseData);
+            alert(`An API error occurred: ${responseData.detail || response.status}`);
+            throw new Error(responseData.detail || `Request failed: ${response.status}`);
+        }
+        return items;
+    }
+
     function renderSubmissionCard(item, type) {
         const card = document.createElement('div');
         card.classList.add('submission-card');
@@ -98,7 +110,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (!searchTerm && allUnverifiedItemsCache[itemType] && allUnverifiedItemsCache[itemType].length > 0) {
                 itemsToDisplay = allUnverifiedItemsCache[itemType];
             } else {
-                const fetchedItems = await apiCall(`/api/admin/unverified-items?type=${itemType}`);
+                const fetchedItems = await apiCallAllPages(`/api/admin/unverified-items?type=${itemType}`);
                 if (Array.isArray(fetchedItems)) {
                     allUnverifiedItemsCache[itemType] = fetchedItems;
                     itemsToDisplay = fetchedItems;
@@ -71,12 +71,11 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log("Fetching ALL alumni data for Roadmaps...");
         if (!roadmapsContainer) return [];
         try {
-            const response = await fetch("/api/alumni");
+            const { response, items: data } = await fetchAllPages("/api/alumni"); // Every page
             if (!response.ok) {
                 const errorText = await response.text();
                 throw new Error(`HTTP error ${response.status}: ${errorText}`);
             }
-            const data = await response.json();
             if (!Array.isArray(data)) throw new Error("Invalid data format received.");
             console.log(`Fetched ${data.length} total alumni.`);
             return data;
@@ -73,14 +73,13 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!careerFairsListContainer) { console.error("Career fairs list container not found!"); return; }
         careerFairsListContainer.innerHTML = '<li>Loading career fairs...</li>';
         try {
-            const response = await fetch('/api/career_fairs?upcoming_only=false'); // Fetch verified fairs
+            const { response, items: fairs } = await fetchAllPages('/api/career_fairs?upcoming_only=false'); // Fetch verified fairs (every page)
             console.log("Career Fairs API Response Status:", response.status);
             if (!response.ok) {
                 let errorDetail = `HTTP error! status: ${response.status}`;
                 try { const errorData = await response.json(); errorDetail = errorData.detail || errorDetail; } catch (e) {}
                 throw new Error(errorDetail);
             }
-            const fairs = await response.json();
             console.log("Fetched career fairs data:", fairs);
             if (!Array.isArray(fairs)) { throw new Error("Invalid data format for fairs."); }
             allFairsData = fairs;
@@ -96,14 +95,13 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!jobListContainer) { console.error("Job listings container not found!"); return; }
         jobListContainer.innerHTML = '<li>Loading job listings...</li>';
         try {
-            const response = await fetch('/api/jobs'); // Fetch verified jobs
+            const { response, items: jobs } = await fetchAllPages('/api/jobs'); // Fetch verified jobs (every page)
              console.log("Jobs API Response Status:", response.status);
             if (!response.ok) {
                 let errorDetail = `HTTP error! status: ${response.status}`;
                 try { const errorData = await response.json(); errorDetail = errorData.detail || errorDetail; } catch (e) {}
                 throw new Error(errorDetail);
             }
-            const jobs = await response.json();
             console.log("Fetched jobs data:", jobs);
             if (!Array.isArray(jobs)) { throw new Error("Invalid data format for jobs."); }
             allJobsData = jobs;
@@ -30,6 +30,12 @@ document.addEventListener('DOMContentLoaded', async () => {
     let loggedInUsername = null;
     let loggedInUserId = null;
     let contactsMap = new Map(); // To store contact_id -> {other_user_username, etc.}
+    let chatSocket = null; // Live connection for the active chat (new messages are pushed, no polling)
+    const CHAT_PAGE_SIZE = 50; // Matches the server's default page; a shorter page means no more in that direction
+    let oldestLoadedMessageId = null; // Cursor for paging back (before_id)
+    let newestLoadedMessageId = null; // Cursor for catching up (after_id)
+    let reachedChatStart = false;
+    let loadingOlderMessages = false;
 
     // --- Check Core Elements ---
     const essentialElements = {
@@ -176,6 +182,38 @@ document.addEventListener('DOMContentLoaded', async () => {
         messageInput.focus();
 
         loadMessages(activeChatContactId);
+        connectChatSocket(activeChatContactId);
+    }
+
+    // --- Live updates (WebSocket per open chat) ---
+    function connectChatSocket(contactId) {
+        if (chatSocket) {
+            chatSocket.onclose = null; // Switching chats: don't reconnect the old one
+            chatSocket.close();
+            chatSocket = null;
+        }
+        if (!window.WebSocket) return; // Sending falls back to the REST endpoint
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/api/chat/${contactId}/ws`);
+        socket.onmessage = (event) => {
+            const frame = JSON.parse(event.data);
+            if (frame.type === 'message' && frame.message.contact_id === activeChatContactId) {
+                displayMessage(frame.message);
+            } else if (frame.type === 'resync') {
+                syncNewMessages(contactId); // Some messages were dropped; fetch what's missing
+            } else if (frame.type === 'error') {
+                alert(`Could not send message: ${escapeHtml(frame.detail)}`);
+            }
+        };
+        socket.onopen = () => syncNewMessages(contactId); // Catch up on anything sent while (re)connecting
+        socket.onclose = (event) => {
+            if (chatSocket !== socket) return;
+            chatSocket = null;
+            if (event.code !== 1008 && activeChatContactId === contactId) { // 1008: not logged in / not a participant
+                setTimeout(() => { if (activeChatContactId === contactId && !chatSocket) connectChatSocket(contactId); }, 3000);
+            }
+        };
+        chatSocket = socket;
     }
 
 
@@ -187,13 +225,19 @@ document.addEventListener('DOMContentLoaded', async () => {
             return;
         }
         messagesContainer.innerHTML = '<p class="loading" style="padding:15px;text-align:center;">Loading messages...</p>';
+        oldestLoadedMessageId = null;
+        newestLoadedMessageId = null;
+        reachedChatStart = false;
         try {
-            const messages = await apiCall(`/api/chat/${chatId}`);
+            const messages = await apiCall(`/api/chat/${chatId}?limit=${CHAT_PAGE_SIZE}`); // Newest page only
+            if (chatId !== activeChatContactId) return; // Switched chats meanwhile
             messagesContainer.innerHTML = '';
+            reachedChatStart = !Array.isArray(messages) || messages.length < CHAT_PAGE_SIZE;
             if (Array.isArray(messages) && messages.length > 0) {
                 messages.forEach(msg => displayMessage(msg));
             } else {
                 messagesContainer.innerHTML = '<p class="no-data" style="padding:15px;text-align:center;">No messages in this chat yet.</p>';
+                newestLoadedMessageId = 0; // Empty chat: sync from the start
             }
             scrollToBottom();
         } catch (error) {
@@ -202,14 +246,67 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     }
 
+    // --- Incremental sync: only messages newer than the last one shown ---
+    async function syncNewMessages(chatId) {
+        if (chatId !== activeChatContactId || newestLoadedMessageId === null) return; // Initial load not done yet
+        try {
+            let page;
+            do {
+                page = await apiCall(`/api/chat/${chatId}?after_id=${newestLoadedMessageId}&limit=${CHAT_PAGE_SIZE}`);
+                if (chatId !== activeChatContactId || !Array.isArray(page)) return;
+                page.forEach(msg => displayMessage(msg));
+            } while (page.length === CHAT_PAGE_SIZE);
+        } catch (error) {
+            console.error("[CHAT_PAGE] Error syncing new messages:", error);
+        }
+    }
+
+    // --- Older history, fetched when scrolled to the top ---
+    async function loadOlderMessages() {
+        const chatId = activeChatContactId;
+        if (loadingOlderMessages || reachedChatStart || oldestLoadedMessageId === null) return;
+        loadingOlderMessages = true;
+        try {
+            const page = await apiCall(`/api/chat/${chatId}?before_id=${oldestLoadedMessageId}&limit=${CHAT_PAGE_SIZE}`);
+            if (chatId !== activeChatContactId || !Array.isArray(page)) return;
+            reachedChatStart = page.length < CHAT_PAGE_SIZE;
+            const previousHeight = messagesContainer.scrollHeight;
+            const firstShown = messagesContainer.querySelector('.chat-message');
+            page.forEach(msg => {
+                const element = buildMessageElement(msg);
+                if (element) messagesContainer.insertBefore(element, firstShown);
+            });
+            if (page.length > 0) oldestLoadedMessageId = page[0].id;
+            messagesContainer.scrollTop += messagesContainer.scrollHeight - previousHeight; // Keep the view where it was
+        } catch (error) {
+            console.error("[CHAT_PAGE] Error loading older messages:", error);
+        } finally {
+            loadingOlderMessages = false;
+        }
+    }
+    messagesContainer.addEventListener('scroll', () => {
+        if (messagesContainer.scrollTop < 40) loadOlderMessages();
+    });
+
     // --- Display Message ---
     function displayMessage(message) {
-        if (!message || typeof message.text !== 'string') return;
+        const messageDiv = buildMessageElement(message);
+        if (!messageDiv) return;
         const noDataOrLoading = messagesContainer.querySelector('.no-data, .loading');
         if (noDataOrLoading) noDataOrLoading.remove();
+        if (message.id && (newestLoadedMessageId === null || message.id > newestLoadedMessageId)) newestLoadedMessageId = message.id;
+        if (message.id && (oldestLoadedMessageId === null || message.id < oldestLoadedMessageId)) oldestLoadedMessageId = message.id;
+        messagesContainer.appendChild(messageDiv);
+        scrollToBottom();
+    }
+
+    function buildMessageElement(message) {
+        if (!message || typeof message.text !== 'string') return null;
+        if (message.id && messagesContainer.querySelector(`[data-message-id="${message.id}"]`)) return null; // Already shown
 
         const messageDiv = document.createElement('div');
         messageDiv.classList.add('chat-message');
+        if (message.id) messageDiv.dataset.messageId = message.id;
         const senderSpan = document.createElement('span');
         senderSpan.classList.add('sender-name');
 
@@ -221,9 +318,29 @@ document.addEventListener('DOMContentLoaded', async () => {
             senderSpan.textContent = escapeHtml(message.sender || 'Unknown');
         }
         messageDiv.appendChild(senderSpan);
-        messageDiv.appendChild(document.createTextNode(message.text));
-        messagesContainer.appendChild(messageDiv);
-        scrollToBottom();
+        if (message.file_path && /^[0-9a-f]{64}$/.test(message.file_path)) {
+            // Uploaded file (file_path is its content digest): link to the participant-only download
+            const fileLink = document.createElement('a');
+            fileLink.href = `/api/chat/${message.contact_id}/files/${message.file_path}`;
+            fileLink.target = '_blank';
+            fileLink.rel = 'noopener';
+            if (/\.(png|jpe?g|gif|webp)$/i.test(message.text)) {
+                // Image: show the resized preview inline, the link still opens the full-size original
+                const preview = document.createElement('img');
+                preview.src = `${fileLink.href}?size=md`;
+                preview.alt = message.text;
+                preview.loading = 'lazy';
+                preview.classList.add('chat-image-preview');
+                fileLink.appendChild(preview);
+            } else {
+                fileLink.innerHTML = '<i class="fas fa-paperclip"></i> ';
+                fileLink.appendChild(document.createTextNode(message.text));
+            }
+            messageDiv.appendChild(fileLink);
+        } else {
+            messageDiv.appendChild(document.createTextNode(message.text));
+        }
+        return messageDiv;
     }
 
     // --- Send Message ---
@@ -239,8 +356,13 @@ document.addEventListener('DOMContentLoaded', async () => {
         sendMessageButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
 
         try {
-            const newMessage = await apiCall('/api/send-message', 'POST', { contact_id: activeChatContactId, text: text });
-            displayMessage(newMessage);
+            if (chatSocket && chatSocket.readyState === WebSocket.OPEN) {
+                // The server echoes the stored message back over the socket, which displays it
+                chatSocket.send(JSON.stringify({ text: text }));
+            } else {
+                const newMessage = await apiCall('/api/send-message', 'POST', { contact_id: activeChatContactId, text: text });
+                displayMessage(newMessage);
+            }
             messageInput.value = '';
             // Potentially update last message preview in sidebar (more advanced)
         } catch (error) {
@@ -3,11 +3,10 @@
 // Function to fetch and display Career Fair data
 async function displayCareerFairs(url, elementId) {
     try {
-        const response = await fetch(url);
+        const { response, items: careerFairs } = await fetchAllPages(url); // Every page
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const careerFairs = await response.json();
         const element = document.getElementById(elementId);
 
         if (element) {
@@ -32,11 +31,10 @@ async function displayCareerFairs(url, elementId) {
 // Function to fetch and display Internships data
 async function displayInternships(url, elementId) {
     try {
-        const response = await fetch(url);
+        const { response, items: internships } = await fetchAllPages(url); // Every page
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const internships = await response.json();
         const element = document.getElementById(elementId);
 
         if (element) {
@@ -62,11 +60,10 @@ async function displayInternships(url, elementId) {
 // Function to fetch and display Hackathons data
 async function displayHackathons(url, elementId) {
     try {
-        const response = await fetch(url);
+        const { response, items: hackathons } = await fetchAllPages(url); // Every page
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const hackathons = await response.json();
         const element = document.getElementById(elementId);
 
         if (element) {
@@ -156,9 +156,8 @@ document.addEventListener('DOMContentLoaded', async () => {
          console.log(`Loading questions for user: ${currentUser.username}`);
          myQuestionsContainer.innerHTML = `<p class="loading">Loading your questions...</p>`;
          try {
-            const response = await fetch(`/api/users/${encodeURIComponent(currentUser.username)}/questions`);
+            const { response, items: myQuestions } = await fetchAllPages(`/api/users/${encodeURIComponent(currentUser.username)}/questions`);
             if (!response.ok) throw new Error(`HTTP error ${response.status}`);
-            const myQuestions = await response.json();
             if (!Array.isArray(myQuestions)) throw new Error("Invalid data format for user questions.");
             displayQuestions(myQuestions, myQuestionsContainer, true, false); // Display in user's section
          } catch (error) {
@@ -61,12 +61,12 @@ document.addEventListener('DOMContentLoaded', () => {
         currentHackathonsList.innerHTML = '<p class="loading">Loading hackathons...</p>';
         try {
             // Fetch only upcoming verified hackathons for display
-            const response = await fetch('/api/hackathons?upcoming_only=true'); // Fetches from *verified* table
+            const { response, items } = await fetchAllPages('/api/hackathons?upcoming_only=true'); // Fetches from *verified* table (every page)
             if (!response.ok) {
                 const errorText = await response.text();
                 throw new Error(`Failed to fetch hackathons: ${response.status} - ${errorText}`);
             }
-            allHackathons = await response.json();
+            allHackathons = items;
             if (!Array.isArray(allHackathons)) throw new Error("Invalid data format received for hackathons.");
 
             console.log("Fetched hackathons:", allHackathons);
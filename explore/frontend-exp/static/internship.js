@@ -49,13 +49,12 @@ document.addEventListener('DOMContentLoaded', () => {
         internshipsListContainer.innerHTML = '<p class="loading">Loading internships...</p>';
         try {
             // Fetch the *verified* internships list
-            const response = await fetch("/api/internships?upcoming_only=true"); // Fetch upcoming by default
+            const { response, items: internships } = await fetchAllPages("/api/internships?upcoming_only=true"); // Fetch upcoming by default (every page)
             console.log("API Response Status:", response.status);
             if (!response.ok) {
                 const errorText = await response.text();
                 throw new Error(`Failed to fetch internships: ${response.status} ${errorText}`);
             }
-            const internships = await response.json();
             console.log("Received Internships Data:", internships);
 
             internshipsListContainer.innerHTML = ""; // Clear loading/previous
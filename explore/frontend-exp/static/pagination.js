@@ -0,0 +1,26 @@
+// static/pagination.js
+
+// List endpoints (jobs, internships, hackathons, career fairs, alumni, questions, admin lists) return
+// one page at a time; the next page's cursor comes back in the X-Next-Cursor header.
+// fetchAllPages follows it until the last page and returns the rows of every page, plus the last
+// response so callers keep their usual `if (!response.ok)` error handling.
+async function fetchAllPages(url, options = {}) {
+    let items = [];
+    let cursor = null;
+    let response;
+    do {
+        const separator = url.includes('?') ? '&' : '?';
+        const pageUrl = cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url;
+        response = await fetch(pageUrl, options);
+        if (!response.ok) {
+            return { response, items };
+        }
+        const page = await response.json();
+        if (!Array.isArray(page)) {
+            throw new Error("Invalid data format: expected a list.");
+        }
+        items = items.concat(page);
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return { response, items };
+}